@@ -1,7 +1,27 @@
-from .schools import SchoolCrawler
-from .majors import MajorCrawler
-from .scores import ScoreCrawler
-from .plans import PlanCrawler
-from .school_scores import SchoolScoreCrawler
+import importlib
 
-__all__ = ['SchoolCrawler', 'MajorCrawler', 'ScoreCrawler', 'PlanCrawler', 'SchoolScoreCrawler']
+# 按需导入：只有用到某个爬虫时才加载对应模块（以及 requests），命令行工具启动更快
+_LAZY = {
+    'SchoolCrawler': '.schools',
+    'MajorCrawler': '.majors',
+    'ScoreCrawler': '.scores',
+    'PlanCrawler': '.plans',
+    'SchoolScoreCrawler': '.school_scores',
+    'SectionCrawler': '.sections',
+    'GaokaoClient': '.client',
+}
+
+__all__ = ['SchoolCrawler', 'MajorCrawler', 'ScoreCrawler', 'PlanCrawler', 'SchoolScoreCrawler', 'SectionCrawler', 'GaokaoClient']
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,265 @@
+"""统一命令行入口
+
+    python -m crawlers <命令> [选项]
+
+爬虫命令：schools / majors / scores / watch / plans / school-scores / sections
+工具命令：quality / views / join / index / search / serve / archive / snapshot / transport / equal-rank / partitions / volunteer / bench / client
+分片合并：merge <数据集>
+
+爬虫命令共用的选项会写入对应的环境变量，因此原有的环境变量配置方式仍然有效。
+爬虫命令加 --dry-run 时只估算请求数、下载量、耗时和建议分片数（见 crawlers.planner），不发出请求。
+只有选中的命令对应的模块会被导入，工具命令和 --help 不会加载 requests 和其他爬虫。
+"""
+import argparse
+import os
+import runpy
+import sys
+
+# 工具命令 -> 模块（参数原样交给模块自己的命令行）
+TOOLS = {
+    'quality': ('crawlers.quality', '数据质量检查与规范化'),
+    'views': ('crawlers.views', '从已有数据重新生成聚合表'),
+    'join': ('crawlers.join', '合并分数线、招生计划和专业数据'),
+    'index': ('crawlers.score_index', '编译分数线二进制索引'),
+    'search': ('crawlers.search', '学校/专业全文检索'),
+    'serve': ('crawlers.server', '本地查询服务'),
+    'archive': ('crawlers.archive', '查看响应归档'),
+    'snapshot': ('crawlers.storage', '查看当前数据快照'),
+    'transport': ('crawlers.transport', '传输后端压测'),
+    'equal-rank': ('crawlers.equal_rank', '补全位次并计算等位分'),
+    'partitions': ('crawlers.partitions', '查看分区输出清单'),
+    'volunteer': ('crawlers.volunteer', '生成志愿填报方案'),
+    'bench': ('crawlers.bench', 'CPU热点基准测试'),
+    'client': ('crawlers.client', '按需查询单个学校的分数线/招生计划/详情'),
+}
+
+# 共用选项 -> 环境变量
+SHARED_OPTIONS = {
+    'sample': 'SAMPLE_SCHOOLS',
+    'concurrency': 'STATIC_CONCURRENCY',
+    'transport': 'CRAWL_TRANSPORT',
+    'parse_workers': 'PARSE_WORKERS',
+    'cache': 'CRAWL_ARCHIVE',
+    'cache_mode': 'CRAWL_ARCHIVE_MODE',
+    'format': 'OUTPUT_FORMAT',
+    'layout': 'OUTPUT_LAYOUT',
+    'shard': 'CRAWL_SHARD',
+    'budget': 'PLAN_BUDGET_MINUTES',
+    'deadline': 'CRAWL_DEADLINE',
+}
+
+DEFAULT_CACHE = 'data/cache/responses.tar'
+
+
+def split_list(value):
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+
+def parse_years(value):
+    """'2025,2024' 或 '2021-2025'（区间两端顺序不限，按年份降序展开）；不是年份时报错"""
+    if not value:
+        return None
+    if '-' in value:
+        bounds = [b.strip() for b in value.split('-')]
+        if len(bounds) != 2 or not all(b.isdigit() for b in bounds):
+            raise argparse.ArgumentTypeError(f"无效的年份区间: {value}（应为如 2021-2025）")
+        low, high = sorted(int(b) for b in bounds)
+        return [str(y) for y in range(high, low - 1, -1)]
+    years = split_list(value)
+    invalid = [y for y in years if not y.isdigit()]
+    if invalid:
+        raise argparse.ArgumentTypeError(f"无效的年份: {', '.join(invalid)}")
+    return years
+
+
+def run_schools(args):
+    from .schools import SchoolCrawler
+    SchoolCrawler().crawl(max_pages=args.max_pages, fetch_complete_info=not args.no_detail)
+
+
+def run_majors(args):
+    from .majors import MajorCrawler
+    crawler = MajorCrawler()
+    if args.details_only:
+        crawler.crawl_details_only()
+    else:
+        crawler.crawl(fetch_details=True if args.details else None)
+
+
+def run_scores(args):
+    from .scores import ScoreCrawler
+    ScoreCrawler().crawl(years=args.years, province_ids=split_list(args.provinces))
+
+
+def run_watch(args):
+    from .scores import ScoreCrawler
+    ScoreCrawler().watch(
+        year=args.year,
+        province_ids=split_list(args.provinces),
+        cycles=args.cycles,
+        interval=args.interval,
+        max_requests=args.max_requests,
+    )
+
+
+def run_plans(args):
+    from .plans import PlanCrawler
+    PlanCrawler().crawl(years=args.years, province_ids=split_list(args.provinces))
+
+
+def run_school_scores(args):
+    from .school_scores import SchoolScoreCrawler
+    SchoolScoreCrawler().crawl()
+
+
+def run_sections(args):
+    from .sections import SectionCrawler
+    SectionCrawler().crawl(years=args.years, province_ids=split_list(args.provinces))
+
+
+def run_merge(args):
+    """把各分片的输出合并成完整的数据文件，并重新生成聚合表"""
+    import glob
+    from .base import BaseCrawler
+    from .partitions import PartitionStore
+    from .quality import RecordReader
+
+    paths = sorted(glob.glob(f'data/{args.dataset}.shard-*-of-*.json') + glob.glob(f'data/{args.dataset}.shard-*-of-*.jsonl'))
+    # 分区布局的分片输出是目录 data/{数据集}.shard-i-of-n/
+    paths += sorted(os.path.dirname(p) for p in glob.glob(f'data/{args.dataset}.shard-*-of-*/manifest.json'))
+    if not paths:
+        print(f"⚠️  未找到 data/{args.dataset}.shard-*-of-* 分片文件")
+        sys.exit(1)
+
+    records = []
+    for path in paths:
+        count = len(records)
+        if os.path.isdir(path):
+            records.extend(PartitionStore(args.dataset, 'data', os.path.basename(path)).read())
+        else:
+            records.extend(RecordReader(path))
+        print(f"   {path}: {len(records) - count} 条")
+
+    crawler = BaseCrawler()
+    crawler.output_layout = args.layout or crawler.output_layout
+    crawler.save_records(records, f'{args.dataset}.json')
+    if args.dataset in ('scores', 'plans'):
+        from .views import plan_views, score_views
+        crawler.save_views((score_views if args.dataset == 'scores' else plan_views)(records))
+    print(f"✓ 已合并 {len(paths)} 个分片，共 {len(records)} 条")
+
+
+def build_parser():
+    shared = argparse.ArgumentParser(add_help=False)
+    group = shared.add_argument_group('共用选项')
+    group.add_argument('--sample', type=int, metavar='N', help='从 schools.json 取前 N 所学校（SAMPLE_SCHOOLS）')
+    group.add_argument('--concurrency', type=int, metavar='N', help='静态文件并发预取数（STATIC_CONCURRENCY）')
+    group.add_argument('--transport', choices=('requests', 'http2'), help='静态文件传输后端（CRAWL_TRANSPORT）')
+    group.add_argument('--parse-workers', type=int, metavar='N', help='解析进程数（PARSE_WORKERS）')
+    group.add_argument('--cache', metavar='PATH', help='响应归档文件（CRAWL_ARCHIVE）')
+    group.add_argument('--cache-mode', choices=('record', 'replay', 'resume'), help='归档模式（CRAWL_ARCHIVE_MODE）')
+    group.add_argument('--resume', action='store_true', help=f'中断后续爬：已抓取的响应从归档回放（默认归档 {DEFAULT_CACHE}）')
+    group.add_argument('--format', choices=('json', 'jsonl'), help='输出格式（OUTPUT_FORMAT）')
+    group.add_argument('--layout', choices=('file', 'partitioned', 'both'), help='分数线/招生计划输出布局（OUTPUT_LAYOUT）')
+    group.add_argument('--shard', metavar='I/N', help='按学校分片，只爬第 I 片（CRAWL_SHARD）')
+    group.add_argument('--deadline', type=float, metavar='MIN', help='scores/plans 截止时间模式：MIN 分钟内按价值顺序爬取并保存进度（CRAWL_DEADLINE）')
+    group.add_argument('--dry-run', action='store_true', help='只估算请求数、下载量、耗时和建议分片数，不发出请求')
+    group.add_argument('--budget', type=float, metavar='MIN', help='--dry-run 的单个作业时限，分钟（PLAN_BUDGET_MINUTES，默认330）')
+    group.add_argument('--profile', action='store_true', help='打印阶段耗时汇总（另支持 --profile-stats=PATH / --profile-stacks=PATH）')
+
+    parser = argparse.ArgumentParser(prog='python -m crawlers', description='高考数据爬虫')
+    commands = parser.add_subparsers(dest='command', metavar='<命令>')
+    commands.required = True
+
+    p = commands.add_parser('schools', parents=[shared], help='爬取学校列表和详情')
+    p.add_argument('--max-pages', type=int, help='列表页数（MAX_PAGES，默认10）')
+    p.add_argument('--no-detail', action='store_true', help='不请求学校详情')
+    p.set_defaults(run=run_schools)
+
+    p = commands.add_parser('majors', parents=[shared], help='爬取专业信息')
+    p.add_argument('--details', action='store_true', help='同时获取专业详情（MAJOR_DETAILS=true）')
+    p.add_argument('--details-only', action='store_true', help='只为已有的 majors.json 补充专业详情')
+    p.set_defaults(run=run_majors)
+
+    p = commands.add_parser('scores', parents=[shared], help='爬取专业分数线')
+    p.add_argument('--years', type=parse_years, help='年份，如 2025,2024 或 2020-2025')
+    p.add_argument('--provinces', help='省份ID，逗号分隔（默认全部）')
+    p.set_defaults(run=run_scores)
+
+    p = commands.add_parser('watch', parents=[shared], help='监视当年分数线')
+    p.add_argument('--year', help='年份（WATCH_YEAR，默认今年）')
+    p.add_argument('--provinces', help='省份ID，逗号分隔（默认全部）')
+    p.add_argument('--cycles', type=int, help='轮数（WATCH_CYCLES）')
+    p.add_argument('--interval', type=float, help='每轮间隔秒数（WATCH_INTERVAL）')
+    p.add_argument('--max-requests', type=int, help='每轮最多请求数（WATCH_MAX_REQUESTS）')
+    p.set_defaults(run=run_watch)
+
+    p = commands.add_parser('plans', parents=[shared], help='爬取招生计划')
+    p.add_argument('--years', type=parse_years, help='年份（PLAN_YEARS），如 2025,2024 或 2023-2025')
+    p.add_argument('--provinces', help='省份ID，逗号分隔（默认全部）')
+    p.set_defaults(run=run_plans)
+
+    p = commands.add_parser('school-scores', parents=[shared], help='爬取各校各省最低分')
+    p.set_defaults(run=run_school_scores)
+
+    p = commands.add_parser('sections', parents=[shared], help='爬取各省一分一段表')
+    p.add_argument('--years', type=parse_years, help='年份（SECTION_YEARS），如 2025,2024 或 2023-2025')
+    p.add_argument('--provinces', help='省份ID，逗号分隔（默认全部）')
+    p.set_defaults(run=run_sections)
+
+    p = commands.add_parser('merge', help='合并分片输出')
+    p.add_argument('dataset', choices=('schools', 'scores', 'plans', 'school_scores'))
+    p.add_argument('--layout', choices=('file', 'partitioned', 'both'), help='合并结果的输出布局（OUTPUT_LAYOUT）')
+    p.set_defaults(run=run_merge)
+
+    for name, (module, help_text) in TOOLS.items():
+        commands.add_parser(name, help=f'{help_text}（参数见 python -m {module}）', add_help=False)
+
+    return parser
+
+
+def apply_shared_options(args):
+    # --cache 默认按缓存使用（已归档的回放，其余实时抓取并写入），即 resume 模式
+    if getattr(args, 'resume', False):
+        args.cache = args.cache or os.getenv('CRAWL_ARCHIVE') or DEFAULT_CACHE
+        args.cache_mode = 'resume'
+    elif getattr(args, 'cache', None) and not getattr(args, 'cache_mode', None):
+        args.cache_mode = 'resume'
+
+    for option, env in SHARED_OPTIONS.items():
+        value = getattr(args, option, None)
+        if value is not None:
+            os.environ[env] = str(value)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # 工具命令：直接运行对应模块，参数原样传递
+    if argv and argv[0] in TOOLS:
+        module = TOOLS[argv[0]][0]
+        sys.argv = [f'python -m {module}'] + argv[1:]
+        runpy.run_module(module, run_name='__main__', alter_sys=True)
+        return
+
+    from .profiler import parse_profile_args, profile_run
+
+    argv, profile_options = parse_profile_args(argv)
+    args = build_parser().parse_args(argv)
+    apply_shared_options(args)
+    if getattr(args, 'profile', False):
+        profile_options['enabled'] = True
+
+    if getattr(args, 'dry_run', False):
+        from .planner import run_plan
+        if hasattr(args, 'provinces'):
+            args.provinces = split_list(args.provinces)
+        run_plan(args)
+        return
+
+    with profile_run(profile_options):
+        args.run(args)
+
+
+if __name__ == "__main__":
+    main()
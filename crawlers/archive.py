@@ -0,0 +1,142 @@
+import atexit
+import hashlib
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+
+
+class ArchiveMiss(LookupError):
+    """回放模式下归档中没有对应的响应"""
+
+
+def request_key(method, url, payload=None):
+    """生成响应在归档中的键：GET 为 URL，POST 附带排序后的 payload"""
+    if payload is None:
+        return f"{method} {url}"
+    return f"{method} {url} {json.dumps(payload, ensure_ascii=False, sort_keys=True)}"
+
+
+class ResponseArchive:
+    """原始响应归档（tar格式）
+
+    每个响应是一个 tar 成员，成员名为键的 sha1，键和状态码记录在 pax 头里：
+        url    = 请求键（见 request_key）
+        status = HTTP 状态码
+    mode='record' 追加写入实时抓取的响应；mode='replay' 只从归档读取，不访问网络；
+    mode='resume' 用于中断后续爬：已归档的请求直接回放，其余实时抓取并追加写入。
+    同一个键出现多次时以最后写入的为准。
+    """
+
+    def __init__(self, path, mode='replay'):
+        if mode not in ('record', 'replay', 'resume'):
+            raise ValueError(f"未知的归档模式: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index = {}
+        self._tar = None
+        self._reader = None
+
+        if mode != 'record' and (mode == 'replay' or os.path.exists(path)):
+            self._reader = tarfile.open(path, 'r')
+            for member in self._reader.getmembers():
+                key = member.pax_headers.get('url')
+                if key is not None:
+                    self._index[key] = member
+        if mode != 'replay':
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._tar = tarfile.open(path, 'a' if os.path.exists(path) else 'w', format=tarfile.PAX_FORMAT)
+            atexit.register(self.close)
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    @property
+    def recording(self):
+        return self.mode in ('record', 'resume')
+
+    @property
+    def resuming(self):
+        return self.mode == 'resume'
+
+    def replays(self, key):
+        """该请求是否应从归档回放（回放模式下总是；续爬模式下已归档的请求）"""
+        return self.mode == 'replay' or (self.mode == 'resume' and key in self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def lookup(self, key):
+        """返回 (状态码, 原始字节)，不存在时抛出 ArchiveMiss"""
+        member = self._index.get(key)
+        if member is None:
+            raise ArchiveMiss(key)
+
+        with self._lock:
+            content = self._reader.extractfile(member).read()
+        return int(member.pax_headers.get('status', '200')), content
+
+    def record(self, key, status_code, content):
+        """写入一个原始响应"""
+        info = tarfile.TarInfo(f"responses/{hashlib.sha1(key.encode('utf-8')).hexdigest()}")
+        info.size = len(content)
+        info.mtime = int(time.time())
+        info.pax_headers = {'url': key, 'status': str(status_code)}
+
+        with self._lock:
+            self._tar.addfile(info, io.BytesIO(content))
+            if self.mode == 'record':
+                self._index[key] = info
+
+    def close(self):
+        with self._lock:
+            for tar in (self._tar, self._reader):
+                if tar is not None:
+                    tar.close()
+            self._tar = self._reader = None
+
+
+_archives = {}
+
+
+def open_archive(path=None, mode=None):
+    """按环境变量 CRAWL_ARCHIVE / CRAWL_ARCHIVE_MODE 打开归档，同一进程内共享同一实例"""
+    path = path or os.getenv('CRAWL_ARCHIVE')
+    if not path:
+        return None
+    mode = mode or os.getenv('CRAWL_ARCHIVE_MODE', 'replay')
+
+    archive = _archives.get((path, mode))
+    if archive is None:
+        archive = ResponseArchive(path, mode)
+        _archives[(path, mode)] = archive
+    return archive
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("用法: python -m crawlers.archive <archive.tar>")
+        sys.exit(1)
+
+    archive = ResponseArchive(sys.argv[1], 'replay')
+    status_counts = {}
+    for key, member in archive._index.items():
+        kind = key.split('/')[5] if key.startswith('GET https://static-data') else key.split(' ')[0]
+        status = member.pax_headers.get('status')
+        status_counts[(kind, status)] = status_counts.get((kind, status), 0) + 1
+
+    print(f"归档: {sys.argv[1]}")
+    print(f"响应数: {len(archive)}")
+    for (kind, status), count in sorted(status_counts.items()):
+        print(f"   {kind:25} {status}: {count}")
@@ -2,9 +2,22 @@ import requests
 import json
 import time
 import random
-from datetime import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from .archive import open_archive, request_key, ArchiveMiss
+from .profiler import phase
+from .quality import RecordReader
+from .retry import RetryPolicy, host_guard
+from .schema import load_projection
+from .partitions import PARTITIONED, PartitionStore
+from .storage import SnapshotStore
+from .throughput import kind_of, throughput
+from .transport import make_transport
 
 class BaseCrawler:
+    # 数据集名称（对应 schema.SCHEMAS 的键），用于读取字段投影配置
+    dataset = None
+    
     def __init__(self):
         self.base_url = "https://api.zjzw.cn/web/api/"
         self.headers = {
@@ -18,20 +31,66 @@ class BaseCrawler:
         self.session = requests.Session()
         self.session.headers.update(self.headers)
         self.rate_limit_sleep = 3  # 增加初始延迟从1秒到3秒
+        
+        # 响应归档（CRAWL_ARCHIVE）：record 模式录制实时响应，replay 模式离线回放，resume 模式续爬
+        self.archive = open_archive()
+        self._replayed = False  # 上一个请求来自归档，随后的限速可以跳过
+        
+        # 静态数据文件的重试策略；最终仍失败的URL记录在 failed_urls 中
+        self.retry_policy = RetryPolicy(attempts=3, base_delay=1.0)
+        self.failed_urls = []
+        
+        # 静态文件GET的传输后端（CRAWL_TRANSPORT=requests|http2）和并发预取数（STATIC_CONCURRENCY）
+        self.transport = make_transport(self.session)
+        self.static_concurrency = int(os.getenv('STATIC_CONCURRENCY', '1'))
+        self._prefetched = {}
+        
+        # 输出格式（OUTPUT_FORMAT=json|jsonl）；按学校分片（CRAWL_SHARD=序号/总数）时输出文件名带分片后缀
+        self.output_format = os.getenv('OUTPUT_FORMAT', 'json').lower()
+        self.shard = None
+        # 分数线/招生计划的输出布局（OUTPUT_LAYOUT=file|partitioned|both）：单个文件，或按 年份/省份 分区
+        self.output_layout = os.getenv('OUTPUT_LAYOUT', 'file').lower()
+        
+        # 字段投影（FIELDS_<DATASET> / CRAWL_FIELDS_CONFIG），默认保存全部字段
+        self.projection = load_projection(self.dataset) if self.dataset else None
     
     def make_request(self, payload, retry=3, delay=2):
         """统一的请求方法，支持限流处理"""
+        key = request_key('POST', self.base_url, payload)
+        if self.archive is not None and self.archive.replays(key):
+            self._replayed = True
+            try:
+                with phase('fetch'):
+                    status_code, content = self.archive.lookup(key)
+            except ArchiveMiss:
+                print(f"⚠️  归档中无此请求: {payload.get('uri')} page={payload.get('page')}")
+                return None
+            with phase('decode'):
+                return json.loads(content) if status_code == 200 else None
+        
+        self._replayed = False
+        policy = RetryPolicy(attempts=retry, base_delay=delay)
+        breaker, budget = host_guard(self.base_url)
+        budget.deposit()
+        
         for attempt in range(retry):
+            breaker.wait()
+            wait_floor = 0
             try:
-                response = self.session.post(
-                    self.base_url,
-                    json=payload,
-                    timeout=15
-                )
+                started = time.perf_counter()
+                with phase('fetch'):
+                    response = self.session.post(
+                        self.base_url,
+                        json=payload,
+                        timeout=15
+                    )
+                throughput.record(kind_of(self.base_url, payload), response.status_code, len(response.content),
+                                  time.perf_counter() - started)
                 
                 if response.status_code == 200:
                     try:
-                        result = response.json()
+                        with phase('decode'):
+                            result = response.json()
                         
                         # 检查业务错误码
                         code = result.get('code')
@@ -41,54 +100,274 @@ class BaseCrawler:
                             message = result.get('message', '访问太过频繁')
                             print(f"⚠️  限流警告: {message}")
                             
-                            # 指数退避：增加延迟时间
+                            # 加大后续请求的间隔，本次重试至少等待 rate_limit_sleep 秒
                             self.rate_limit_sleep = min(self.rate_limit_sleep * 2, 60)  # 最大60秒
-                            print(f"   等待 {self.rate_limit_sleep:.1f} 秒后重试...")
-                            time.sleep(self.rate_limit_sleep)
+                            wait_floor = self.rate_limit_sleep
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
                             
-                            # 重试当前请求
-                            if attempt < retry - 1:
-                                continue
-                            return None
-                        
-                        # 成功请求，逐渐减少延迟（但不低于3秒）
-                        if code == '0000' or code == 0:
-                            self.rate_limit_sleep = max(self.rate_limit_sleep * 0.9, 3)
-                        
-                        return result
+                            # 成功请求，逐渐减少延迟（但不低于3秒）
+                            if code == '0000' or code == 0:
+                                self.rate_limit_sleep = max(self.rate_limit_sleep * 0.9, 3)
+                            
+                            if self.archive is not None and self.archive.recording:
+                                self.archive.record(key, response.status_code, response.content)
+                            
+                            return result
                         
                     except json.JSONDecodeError as e:
+                        breaker.record_success()
                         print(f"⚠️  JSON解析失败: {str(e)}")
                         print(f"   响应内容类型: {response.headers.get('content-type')}")
                         print(f"   响应前200字符: {response.text[:200]}")
                         return None
                 else:
                     print(f"⚠️  请求失败，状态码: {response.status_code}")
+                    breaker.record_failure()
                     
             except requests.exceptions.Timeout:
                 print(f"⚠️  请求超时 (尝试 {attempt + 1}/{retry})")
+                breaker.record_failure()
             except requests.exceptions.RequestException as e:
                 print(f"⚠️  请求出错 (尝试 {attempt + 1}/{retry}): {str(e)}")
+                breaker.record_failure()
             
             if attempt < retry - 1:
-                time.sleep(delay * (attempt + 1))
+                if not budget.withdraw():
+                    print(f"⚠️  重试预算已耗尽，放弃本次请求")
+                    break
+                wait = policy.backoff(attempt, floor=wait_floor)
+                print(f"   等待 {wait:.1f} 秒后重试...")
+                with phase('sleep'):
+                    time.sleep(wait)
         
         return None
     
+    def _get(self, url, timeout=10, headers=None):
+        """带重试和熔断的GET请求，返回 requests.Response
+        
+        网络异常和 5xx/429 按重试策略重试；最终失败时抛出最后一次的异常
+        （或返回最后一次的响应），并记入 self.failed_urls。
+        """
+        self._replayed = False
+        breaker, budget = host_guard(url)
+        budget.deposit()
+        
+        retry = self.retry_policy.attempts
+        error = None
+        for attempt in range(retry):
+            breaker.wait()
+            started = time.perf_counter()
+            try:
+                with phase('fetch'):
+                    response = self.transport.get(url, timeout=timeout, headers=headers)
+                    response.content  # 读取响应体也计入请求时间
+                throughput.record(kind_of(url), response.status_code, len(response.content), time.perf_counter() - started)
+            except self.transport.errors as e:
+                error = e
+                breaker.record_failure()
+            else:
+                error = None
+                if not self.retry_policy.retryable(response.status_code):
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+            
+            if attempt == retry - 1 or not budget.withdraw():
+                break
+            with phase('sleep'):
+                time.sleep(self.retry_policy.backoff(attempt))
+        
+        self.failed_urls.append(url)
+        if error is not None:
+            raise error
+        return response
+    
+    def fetch_static(self, url, timeout=10):
+        """获取静态数据文件的原始响应，返回 (状态码, 原始字节)"""
+        with phase('fetch'):
+            if self.archive is not None and self.archive.replays(request_key('GET', url)):
+                self._replayed = True
+                return self.archive.lookup(request_key('GET', url))
+        
+        raw = self._prefetched.pop(url, None)
+        if raw is not None:
+            return raw
+        
+        response = self._get(url, timeout=timeout)
+        if self.archive is not None and self.archive.recording and response.status_code in (200, 404):
+            self.archive.record(request_key('GET', url), response.status_code, response.content)
+        return response.status_code, response.content
+    
+    def prefetch_static(self, urls, concurrency=None, sleep=True):
+        """并发预取一批静态文件，之后对这些URL的 fetch_static 直接返回预取结果
+        
+        并发数默认取 STATIC_CONCURRENCY（默认1，即不预取）；归档中可回放的URL不预取。
+        预取失败的URL不保存，之后的 fetch_static 会照常重新请求。整批预取完成后限速一次。
+        返回是否进行了预取。
+        """
+        concurrency = concurrency or self.static_concurrency
+        if self.archive is not None:
+            urls = [url for url in urls if not self.archive.replays(request_key('GET', url))]
+        if concurrency <= 1 or len(urls) < 2:
+            return False
+        
+        def fetch(url):
+            try:
+                return url, self.fetch_static(url)
+            except Exception:
+                return url, None
+        
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(urls))) as pool:
+            for url, raw in pool.map(fetch, urls):
+                if raw is not None:
+                    self._prefetched[url] = raw
+        
+        if sleep:
+            self.polite_sleep(1.5, 3.0)
+        return True
+    
+    def fetch_conditional(self, url, validators=None, timeout=10):
+        """条件请求静态数据文件，返回 (状态码, 原始字节, 新的校验信息)
+        
+        validators 为上次响应的 {'etag', 'last_modified'}；文件未变化时返回 (304, b'', validators)。
+        回放模式下归档中没有该请求时返回 (None, b'', validators)。
+        """
+        validators = validators or {}
+        with phase('fetch'):
+            if self.archive is not None and self.archive.replaying:
+                try:
+                    status_code, content = self.archive.lookup(request_key('GET', url))
+                except ArchiveMiss:
+                    print(f"⚠️  归档中无此请求: {url}")
+                    return None, b'', validators
+                return status_code, content, validators
+        
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        response = self._get(url, timeout=timeout, headers=headers)
+        if response.status_code == 200:
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+        if self.archive is not None and self.archive.recording and response.status_code in (200, 404):
+            self.archive.record(request_key('GET', url), response.status_code, response.content)
+        return response.status_code, response.content, validators
+    
+    def load_school_ids(self, sample_count=None):
+        """从 schools.json 读取学校ID列表（最多 sample_count 所），读取失败返回空列表"""
+        try:
+            with open('data/schools.json', 'r', encoding='utf-8') as f:
+                schools_data = json.load(f)
+        except FileNotFoundError:
+            print("⚠️  未找到 schools.json，请先运行学校爬虫")
+            return []
+        except Exception as e:
+            print(f"⚠️  读取 schools.json 失败: {e}")
+            return []
+        
+        schools = schools_data.get('data', []) if isinstance(schools_data, dict) else schools_data
+        if not isinstance(schools, list):
+            print(f"⚠️  schools.json 数据格式错误: {type(schools_data)}")
+            return []
+        
+        school_ids = [s['school_id'] for s in schools[:sample_count] if isinstance(s, dict) and s.get('school_id')]
+        
+        shard = parse_shard(os.getenv('CRAWL_SHARD'))
+        if shard:
+            index, count = shard
+            school_ids = school_ids[index - 1::count]
+            self.shard = shard
+            print(f"分片 {index}/{count}: {len(school_ids)} 所学校")
+        return school_ids
+    
     def polite_sleep(self, min_delay=3.0, max_delay=6.0):
         """随机延迟，模拟人类行为，考虑限流因素"""
+        if self._replayed or (self.archive is not None and self.archive.replaying):
+            self._replayed = False
+            return  # 离线回放无需限速
+        
         base_delay = random.uniform(min_delay, max_delay)
         # 如果有限流警告，使用更长的延迟
         total_delay = base_delay * (self.rate_limit_sleep / 3.0)
-        time.sleep(min(total_delay, 20))  # 最多20秒
+        with phase('sleep'):
+            time.sleep(min(total_delay, 20))  # 最多20秒
+        throughput.record_sleep(min(total_delay, 20), (min_delay + max_delay) / 2)
+    
+    def output_name(self, filename):
+        """按分片和输出格式调整文件名，如 scores.json -> scores.shard-1-of-4.jsonl（聚合表总是JSON）"""
+        stem, ext = os.path.splitext(filename)
+        if self.shard:
+            stem = f'{stem}.shard-{self.shard[0]}-of-{self.shard[1]}'
+        if self.output_format == 'jsonl' and not filename.startswith('views/'):
+            ext = '.jsonl'
+        return stem + ext
     
     def save_to_json(self, data, filename):
-        """保存数据到JSON文件"""
+        """保存数据到JSON文件（原子写入并记录版本快照，内容未变化时不重写）"""
+        filename = self.output_name(filename)
         filepath = f'data/{filename}'
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'count': len(data),
-                'data': data
-            }, f, ensure_ascii=False, indent=2)
-        print(f"✓ 数据已保存到 {filepath}")
+        with phase('serialize'):
+            written = SnapshotStore('data').save(data, filename)
+        if written:
+            print(f"✓ 数据已保存到 {filepath}")
+        else:
+            print(f"✓ 数据未变化，保留 {filepath}")
+    
+    def save_records(self, data, filename, replace=True):
+        """保存分数线/招生计划等记录：按 OUTPUT_LAYOUT 写单个文件和/或 data/{数据集}/ 下的分区
+
+        replace=False 时只替换 data 涉及的分区（单个文件布局总是整体重写）。
+        """
+        dataset = filename.split('.')[0]
+        if self.output_layout in ('partitioned', 'both') and dataset in PARTITIONED:
+            name = os.path.splitext(self.output_name(filename))[0]
+            with phase('serialize'):
+                written, removed = PartitionStore(dataset, 'data', name).write(data, replace=replace)
+            print(f"✓ 分区已保存到 data/{name}/（重写 {written} 个分区，删除 {removed} 个）")
+            if self.output_layout == 'partitioned':
+                return
+        self.save_to_json(data, filename)
+    
+    def read_output(self, filename):
+        """读取之前保存的记录（与 save_records 使用同样的布局、分片和格式），没有时返回空列表"""
+        name = self.output_name(filename)
+        store = PartitionStore(filename.split('.')[0], 'data', os.path.splitext(name)[0])
+        if self.output_layout in ('partitioned', 'both') and store.exists():
+            return list(store.read())
+        path = f'data/{name}'
+        return list(RecordReader(path)) if os.path.exists(path) else []
+    
+    def save_views(self, views):
+        """保存聚合表到 data/views/ 目录"""
+        os.makedirs('data/views', exist_ok=True)
+        for name, rows in views.items():
+            self.save_to_json(rows, f'views/{name}.json')
+
+
+def parse_shard(value):
+    """解析分片参数 '2/4' -> (2, 4)（第2片，共4片，序号从1开始）；为空返回None"""
+    if not value:
+        return None
+    index, count = (int(x) for x in value.split('/'))
+    if not 1 <= index <= count:
+        raise ValueError(f"分片参数无效: {value}（应为 序号/总数，如 1/4）")
+    return index, count
+
+
+def decode_static(status_code, content):
+    """解析静态数据文件响应：成功返回data，404返回'no_data'，其余返回None"""
+    if status_code == 200:
+        with phase('decode'):
+            result = json.loads(content)
+        if isinstance(result, dict) and result.get('code') == '0000' and 'data' in result:
+            return result['data']
+    elif status_code == 404:
+        return 'no_data'  # 该省份无招生
+    return None
@@ -0,0 +1,424 @@
+"""CPU 热点基准测试
+
+在不访问网络的情况下测量爬虫中的 CPU 热点，输入由 data/*.json 中的真实记录反推为接口响应后
+循环放大到指定规模：
+
+    score_records   build_score_records：分数线响应 -> 记录（ScoreCrawler.crawl 的逐条构建）
+    plan_records    build_plan_records：招生计划响应 -> 记录（PlanCrawler.crawl 的逐条构建）
+    school_detail   build_school_info + apply_school_detail（SchoolCrawler 的字段提取与 label_list）
+    save_json       SnapshotStore.save：save_to_json 的 json.dumps(indent=2) 与写文件
+    load_json       json.load 整个 schools.json
+    load_stream     RecordReader 流式读取同一个 schools.json（对照）
+
+后三项的耗时与内存都随单个文件的大小增长（save_to_json 和 json.load 需要整个文件的内容在内存中），
+100 万、1000 万条的单个文件在普通机器上放不下。因此规模超过 CHUNK 时按每个文件 CHUNK 条分批处理，
+总共处理 n 条：耗时反映同一段序列化/解析代码在 n 条记录上的总开销，峰值内存为单个文件的峰值。
+
+每项记录单次运行耗时和峰值内存（tracemalloc，只统计被测代码新分配的内存）。小规模的项目一次只需
+十几毫秒，容易受抖动影响，因此每个样本循环运行到至少 MIN_SAMPLE_SECONDS 秒再取平均，
+耗时取多个样本的中位数。基线保存在 benchmarks/baseline.json，同时记录一个固定纯 Python 负载的耗时
+作为机器速度标定，在其他机器上比较时按标定值换算；标定无法抵消不同 Python 版本在各项上的差异，
+因此版本与基线不同时会给出提示（CI 使用与基线相同的版本）。
+
+    python -m crawlers.bench                      运行 10k 规模并与基线比较
+    python -m crawlers.bench --size=10k,1m        指定规模（10k / 1m / 10m）
+    python -m crawlers.bench --case=save_json     只运行某几项（逗号分隔）
+    python -m crawlers.bench --check              超出阈值（默认 25%，--threshold=0.25）时退出码为 1
+    python -m crawlers.bench --update             把本次结果写入基线
+
+输入放大后超出可用内存或磁盘的项目会跳过并注明；--check 时，基线中有数据而本次被跳过的项目算作退化。
+"""
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from .plans import build_plan_records
+from .quality import RecordReader
+from .schools import apply_school_detail, build_school_info
+from .scores import build_score_records
+from .storage import SnapshotStore
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+BASELINE_PATH = 'benchmarks/baseline.json'
+THRESHOLD = 0.25
+MIN_SAMPLE_SECONDS = 0.2
+CHUNK = 10_000           # 文件类项目每个文件的记录数
+ITEMS_PER_RESPONSE = 20
+
+# 列表接口字段 <- 记录字段（反推 schools.json 的原始响应）
+SCHOOL_LIST_SOURCE = {
+    'school_id': 'school_id', 'name': 'name', 'province_name': 'province', 'city_name': 'city',
+    'county_name': 'county', 'type_name': 'type', 'level_name': 'level', 'nature_name': 'nature',
+    'belong': 'belong', 'rank': 'rank', 'f985': 'f985', 'f211': 'f211',
+    'dual_class_name': 'dual_class', 'dual_class': 'is_dual_class', 'view_total': 'view_total',
+}
+# 详情接口中与记录字段同名的字段
+SCHOOL_DETAIL_SAME = (
+    'content', 'motto', 'old_name', 'email', 'school_email', 'phone', 'school_phone', 'address',
+    'postcode', 'site', 'school_site', 'create_date', 'area', 'num_doctor', 'num_master',
+    'num_subject', 'num_academician', 'num_library', 'recommend_master_rate',
+    'recommend_master_level', 'upgrading_rate', 'ruanke_rank', 'xyh_rank', 'wsl_rank', 'qs_rank',
+    'us_rank', 'qs_world', 'attr_list', 'dualclass', 'special', 'province_score_min',
+)
+
+
+def load_fixture(filename, data_dir='data'):
+    path = os.path.join(data_dir, filename)
+    return list(RecordReader(path)) if os.path.exists(path) else []
+
+
+def score_item(record):
+    """把一条 scores 记录还原为接口中的 item"""
+    return {
+        'local_batch_name': record.get('batch'), 'type': record.get('type'),
+        'zslx_name': record.get('recruit_type'), 'sp_name': record.get('major'),
+        'spcode': record.get('major_code'), 'sg_name': record.get('major_group'),
+        'sg_info': record.get('major_group_info'), 'level1_name': record.get('level1_name'),
+        'level2_name': record.get('level2_name'), 'level3_name': record.get('level3_name'),
+        'min': record.get('min_score'), 'max': record.get('max_score'),
+        'average': record.get('avg_score'), 'min_section': record.get('min_rank'),
+        'proscore': record.get('proscore'), 'lq_num': record.get('enrollment'),
+    }
+
+
+def plan_item(record):
+    """把一条 plans 记录还原为接口中的 item"""
+    return {
+        'local_batch_name': record.get('batch'), 'type': record.get('type'),
+        'sp_name': record.get('major'), 'spcode': record.get('major_code'),
+        'sg_name': record.get('major_group'), 'sg_code': record.get('major_group_code'),
+        'sg_info': record.get('major_group_info'), 'level1_name': record.get('level1_name'),
+        'level2_name': record.get('level2_name'), 'level3_name': record.get('level3_name'),
+        'num': record.get('plan_number'), 'length': record.get('years'),
+        'tuition': record.get('tuition'), 'note': record.get('note'),
+    }
+
+
+def to_responses(items, type_key):
+    """每 ITEMS_PER_RESPONSE 个 item 组成一个响应的 data：{招生类型: {'item': [...]}}"""
+    return [
+        {type_key: {'item': items[i:i + ITEMS_PER_RESPONSE]}}
+        for i in range(0, len(items), ITEMS_PER_RESPONSE)
+    ]
+
+
+def school_pairs(schools):
+    """把 schools 记录还原为 (列表接口 item, 详情接口 info.json)"""
+    pairs = []
+    for s in schools:
+        item = {key: s.get(field) for key, field in SCHOOL_LIST_SOURCE.items()}
+        info = {key: s.get(key) for key in SCHOOL_DETAIL_SAME}
+        info.update({'label_list': s.get('label_list_detail') or [], 'name': s.get('hightitle'), 'rank': s.get('rank_detail')})
+        pairs.append((item, info))
+    return pairs
+
+
+def build_case(responses, builder):
+    """循环调用记录构建函数直到产出 n 条记录（结果不保留，只测构建本身）"""
+    def run(n):
+        built = 0
+        while built < n:
+            for data in responses:
+                built += len(builder(data, 140, '2025', '13', '河北'))
+                if built >= n:
+                    break
+        return built
+    return run
+
+
+def chunk_sizes(n):
+    """把 n 条分成每批最多 CHUNK 条"""
+    return [CHUNK] * (n // CHUNK) + ([n % CHUNK] if n % CHUNK else [])
+
+
+def available_memory():
+    """可用内存字节数（读取 /proc/meminfo，无法获取时返回 None）"""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class Suite:
+    """各测试项：准备函数生成规模为 n 的输入（不计时）并返回 run()；内存或磁盘不够时跳过"""
+
+    def __init__(self, data_dir='data'):
+        scores = load_fixture('scores.json', data_dir)
+        plans = load_fixture('plans.json', data_dir)
+        schools = load_fixture('schools.json', data_dir)
+        if not scores or not schools:
+            raise SystemExit(f"⚠️  需要 {data_dir}/scores.json 和 {data_dir}/schools.json 作为样本")
+
+        self.scores = scores
+        self.schools = schools
+        self.score_responses = to_responses([score_item(r) for r in scores], '普通类')
+        # 没有 plans.json 样本时由分数线记录派生（字段结构相同，补上计划人数、学制、学费）
+        plan_source = plans or [dict(r, plan_number=r.get('enrollment') or 30, years='四年', tuition='5000', note=None) for r in scores]
+        self.plan_responses = to_responses([plan_item(r) for r in plan_source], '普通类')
+        self.school_pairs = school_pairs(schools)
+
+        self.score_bytes = len(json.dumps(scores, ensure_ascii=False, indent=2).encode('utf-8')) / len(scores)
+        self.school_bytes = len(json.dumps(schools, ensure_ascii=False, indent=2).encode('utf-8')) / len(schools)
+        self.tmp = tempfile.mkdtemp(prefix='gaokao-bench-')
+
+        # 名称 -> (准备函数, 预计内存字节数, 预计临时文件字节数)；文件类项目按 CHUNK 条一个文件估计
+        school_file = lambda n: self.school_bytes * min(n, CHUNK)
+        self.cases = {
+            'score_records': (self.prepare_scores, lambda n: 0, lambda n: 0),
+            'plan_records': (self.prepare_plans, lambda n: 0, lambda n: 0),
+            'school_detail': (self.prepare_schools, lambda n: 0, lambda n: 0),
+            # indent=2 时 json 模块不使用 C 编码器，先生成大量小字符串片段再拼接，实测约为输出的 8 倍
+            'save_json': (self.prepare_save, lambda n: self.score_bytes * min(n, CHUNK) * 10,
+                          lambda n: self.score_bytes * min(n, CHUNK)),
+            # json.load 生成的对象约为文本的 4 倍
+            'load_json': (self.prepare_load, lambda n: self.school_bytes * min(n, CHUNK) * 5, school_file),
+            'load_stream': (self.prepare_stream, lambda n: 0, school_file),
+        }
+
+    def prepare_scores(self, n):
+        run = build_case(self.score_responses, build_score_records)
+        return lambda: run(n)
+
+    def prepare_plans(self, n):
+        run = build_case(self.plan_responses, build_plan_records)
+        return lambda: run(n)
+
+    def prepare_schools(self, n):
+        pairs = self.school_pairs
+
+        def run():
+            for i in range(n):
+                item, info = pairs[i % len(pairs)]
+                apply_school_detail(build_school_info(item), info)
+            return n
+        return run
+
+    def prepare_save(self, n):
+        records = [self.scores[i % len(self.scores)] for i in range(min(n, CHUNK))]
+        store = SnapshotStore(self.tmp, keep=0)
+        path = os.path.join(self.tmp, 'scores.json')
+
+        def run():
+            for size in chunk_sizes(n):
+                # 每次都真正写出（删掉上次的文件，避免“内容未变化”直接返回）
+                if os.path.exists(path):
+                    os.remove(path)
+                store.save(records[:size], 'scores.json')
+            return n
+        return run
+
+    def _schools_file(self, n):
+        path = os.path.join(self.tmp, f'schools-{n}.json')
+        if not os.path.exists(path):
+            records = (self.schools[i % len(self.schools)] for i in range(n))
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('{\n  "update_time": "",\n  "count": %d,\n  "data": [\n' % n)
+                for i, record in enumerate(records):
+                    f.write(',\n' if i else '')
+                    f.write(json.dumps(record, ensure_ascii=False, indent=2))
+                f.write('\n  ]\n}\n')
+        return path
+
+    def prepare_load(self, n):
+        paths = {size: self._schools_file(size) for size in set(chunk_sizes(n))}
+
+        def run():
+            count = 0
+            for size in chunk_sizes(n):
+                with open(paths[size], 'r', encoding='utf-8') as f:
+                    count += len(json.load(f)['data'])
+            return count
+        return run
+
+    def prepare_stream(self, n):
+        paths = {size: self._schools_file(size) for size in set(chunk_sizes(n))}
+        return lambda: sum(1 for size in chunk_sizes(n) for _ in RecordReader(paths[size]))
+
+    def measure(self, name, n, repeat):
+        """返回 {'seconds', 'us_per_record', 'peak_mb'}，内存不足时返回 {'skipped': 原因}"""
+        prepare, memory, disk = self.cases[name]
+        needed = memory(n)
+        available = available_memory()
+        if available is not None and needed > available * 0.7:
+            return {'skipped': f'预计需要 {needed / 2**30:.1f} GB 内存，可用 {available / 2**30:.1f} GB'}
+        needed = disk(n)
+        free = shutil.disk_usage(self.tmp).free
+        if needed > free * 0.7:
+            return {'skipped': f'预计需要 {needed / 2**30:.1f} GB 临时文件，可用 {free / 2**30:.1f} GB'}
+
+        run = prepare(n)
+        # 先运行一次确定每个样本的循环次数，使样本至少持续 MIN_SAMPLE_SECONDS 秒
+        gc.collect()
+        started = time.perf_counter()
+        count = run()
+        first = time.perf_counter() - started
+        loops = max(1, int(MIN_SAMPLE_SECONDS / max(first, 1e-6)) + 1) if first < MIN_SAMPLE_SECONDS else 1
+
+        timings = [first] if loops == 1 else []
+        while len(timings) < repeat:
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(loops):
+                run()
+            timings.append((time.perf_counter() - started) / loops)
+
+        # 单独运行一次测内存（tracemalloc 会拖慢执行，不与计时混在一起）；
+        # 各项的峰值在超过 CHUNK 条后不再增长，只测 CHUNK 条
+        run = prepare(min(n, CHUNK))
+        gc.collect()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        seconds = statistics.median(timings)
+        return {
+            'seconds': round(seconds, 4),
+            'us_per_record': round(seconds * 1e6 / max(count, 1), 3),
+            'peak_mb': round(peak / 2**20, 2),
+        }
+
+    def close(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def calibrate():
+    """固定的纯 Python 负载（构建字典并序列化），返回最短耗时秒数，用于换算不同机器的速度
+
+    负载很小、重复次数多，取最短耗时可以去掉共享机器上的大部分抖动。标定时关闭垃圾回收：
+    此时被测数据已经载入，分代回收扫描整个堆的开销与负载本身无关，会使标定值忽大忽小。
+    """
+    best = None
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(15):
+            started = time.perf_counter()
+            rows = [{'id': i, 'name': f'学校{i}', 'score': i % 750, 'tags': ['985', '211']} for i in range(20_000)]
+            json.dumps(rows, ensure_ascii=False)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        gc.enable()
+    return round(best, 5)
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(result, base, scale, threshold):
+    """与基线比较，返回 (说明, 是否退化)；耗时按机器标定值换算，内存另加 1 MB 容差
+
+    基线中有数据而本次被跳过（如机器内存更小）的项目算作退化，不能当作通过。
+    """
+    if 'skipped' in result:
+        if base and 'skipped' not in base:
+            return '基线中有数据，本次被跳过', True
+        return '', False
+    if not base or 'skipped' in base:
+        return '', False
+    expected = base['seconds'] * scale
+    time_change = result['seconds'] / expected - 1 if expected else 0
+    memory_change = (result['peak_mb'] - base['peak_mb']) / max(base['peak_mb'], 1)
+    regressed = time_change > threshold or (memory_change > threshold and result['peak_mb'] - base['peak_mb'] > 1)
+    return f"耗时 {time_change:+.0%}  内存 {memory_change:+.0%}", regressed
+
+
+def python_version():
+    """主版本.次版本，如 3.11"""
+    return '.'.join(platform.python_version().split('.')[:2])
+
+
+if __name__ == "__main__":
+    import sys
+    from datetime import datetime
+
+    options = dict(a[2:].split('=', 1) if '=' in a else (a[2:], '1') for a in sys.argv[1:] if a.startswith('--'))
+    sizes = [s.strip().lower() for s in options.get('size', '10k').split(',')]
+    threshold = float(options.get('threshold', os.getenv('BENCH_THRESHOLD', THRESHOLD)))
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        print(f"⚠️  未知规模: {', '.join(unknown)}（可选: {', '.join(SIZES)}）")
+        sys.exit(1)
+
+    suite = Suite()
+    names = [c.strip() for c in options['case'].split(',')] if 'case' in options else list(suite.cases)
+    baseline = load_baseline()
+    calibration = calibrate()
+    scale = calibration / baseline['calibration'] if baseline and baseline.get('calibration') else 1.0
+
+    print(f"\n{'='*60}")
+    print(f"CPU 热点基准测试  标定 {calibration:.3f} 秒" + (f"（基线 {baseline['calibration']:.3f} 秒，换算系数 {scale:.2f}）" if baseline else "（无基线）"))
+    if baseline and baseline.get('python') and not baseline['python'].startswith(python_version() + '.'):
+        print(f"⚠️  当前 Python {platform.python_version()}，基线在 {baseline['python']} 上记录，各项耗时可能不可比")
+    print(f"{'='*60}")
+
+    results = {}
+    regressions = []
+    try:
+        for size in sizes:
+            n = SIZES[size]
+            repeat = 7 if n <= 10_000 else 1
+            results[size] = {}
+            print(f"\n规模 {size}（{n} 条）")
+            for name in names:
+                result = suite.measure(name, n, repeat)
+                results[size][name] = result
+                base = (baseline or {}).get('results', {}).get(size, {}).get(name)
+                note, regressed = compare(result, base, scale, threshold)
+                if regressed:
+                    regressions.append(f"{size}/{name}")
+                if 'skipped' in result:
+                    print(f"   {name:14} 跳过：{result['skipped']}{'  ⚠️ ' + note if regressed else ''}")
+                    continue
+                print(f"   {name:14} {result['seconds']:9.3f} 秒  {result['us_per_record']:9.2f} 微秒/条  "
+                      f"峰值 {result['peak_mb']:9.1f} MB  {note}{'  ⚠️ 退化' if regressed else ''}")
+    finally:
+        suite.close()
+
+    if 'update' in options:
+        baseline = baseline or {'results': {}}
+        baseline.update({
+            'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'calibration': calibration,
+        })
+        # 没有重新测量的项目按新的标定值换算，保持整份基线可比
+        for size, cases in baseline['results'].items():
+            for name, entry in cases.items():
+                if name not in results.get(size, {}) and 'seconds' in entry:
+                    entry['seconds'] = round(entry['seconds'] * scale, 4)
+                    entry['us_per_record'] = round(entry['us_per_record'] * scale, 3)
+        for size, cases in results.items():
+            baseline['results'].setdefault(size, {}).update(cases)
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"\n✓ 基线已更新: {BASELINE_PATH}")
+
+    print(f"\n{'='*60}")
+    if regressions:
+        print(f"⚠️  超出阈值 {threshold:.0%} 的项目: {', '.join(regressions)}")
+    else:
+        print(f"✅ 没有超出阈值 {threshold:.0%} 的退化")
+    print(f"{'='*60}\n")
+
+    if regressions and 'check' in options:
+        sys.exit(1)
@@ -0,0 +1,305 @@
+"""按需查询客户端：在 Web 后端等请求处理过程中查询单个学校的数据
+
+    from crawlers.client import GaokaoClient
+
+    client = GaokaoClient(timeout=3)
+    client.scores(102, 2024, '37')   # -> (ScoreRecord, ...)，该省无招生时为空元组
+    client.plans(102, 2025, '37')    # -> (PlanRecord, ...)
+    client.school(102)               # -> SchoolRecord，学校不存在时为 None
+
+与爬虫使用相同的接口地址（score_url / plan_url / info_url）和解析函数（decode_static 及各记录构建函数），
+但不写数据文件，也不做限速等待：
+
+    - 记录是按 schema 字段生成的 namedtuple，只读，可以在线程间共享
+    - 进程内 LRU 缓存（CLIENT_CACHE_SIZE 个文件，CLIENT_TTL 秒），命中时只需一次字典查找
+    - 磁盘缓存 data/cache/client/（CLIENT_DISK_TTL 秒，CLIENT_DISK_CACHE=off 关闭），保存原始响应，
+      404 也缓存；进程重启后仍然有效
+    - 多个线程同时查询同一个文件时只发出一次请求
+    - 每次查询有总超时（CLIENT_TIMEOUT 秒，包含重试），主机处于熔断状态时立即失败，不等待冷却
+    - 设置 CRAWL_ARCHIVE 时与爬虫一样可从响应归档回放
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from .archive import request_key
+from .base import decode_static
+from .discovery import info_url
+from .plans import build_plan_records, plan_url
+from .retry import RetryPolicy, host_guard
+from .schema import SCHEMAS
+from .schools import apply_school_detail, build_school_info
+from .scores import ScoreCrawler, build_score_records, score_url
+from .storage import atomic_write
+
+
+def record_type(name, dataset):
+    """按数据集的 schema 字段生成只读记录类型，缺少的字段为 None"""
+    fields = SCHEMAS[dataset]
+    return namedtuple(name, fields, defaults=(None,) * len(fields))
+
+
+ScoreRecord = record_type('ScoreRecord', 'scores')
+PlanRecord = record_type('PlanRecord', 'plans')
+SchoolRecord = record_type('SchoolRecord', 'schools')
+
+_MISS = object()
+
+
+class ClientError(Exception):
+    """查询失败：网络错误、主机熔断或响应格式错误"""
+
+
+class ClientTimeout(ClientError, TimeoutError):
+    """查询在超时时间内没有完成"""
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，条目 ttl 秒后过期"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISS
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return _MISS
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    """按 URL 哈希保存原始响应：{root}/{前两位}/{哈希}.json（200）或 .404（空文件），按修改时间过期"""
+
+    def __init__(self, root, ttl):
+        self.root = root
+        self.ttl = ttl
+
+    def _path(self, url):
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, url):
+        """返回 (状态码, 原始字节)，没有或已过期时返回 None"""
+        path = self._path(url)
+        for status_code, suffix in ((200, '.json'), (404, '.404')):
+            try:
+                if time.time() - os.path.getmtime(path + suffix) > self.ttl:
+                    return None
+                with open(path + suffix, 'rb') as f:
+                    return status_code, f.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def put(self, url, status_code, content):
+        path = self._path(url)
+        suffix, stale = ('.json', '.404') if status_code == 200 else ('.404', '.json')
+        atomic_write(path + suffix, content if status_code == 200 else b'')
+        if os.path.exists(path + stale):
+            os.remove(path + stale)
+
+
+class GaokaoClient:
+
+    def __init__(self, timeout=None, cache_size=None, ttl=None, cache_dir='data/cache/client', disk_ttl=None):
+        self.timeout = float(timeout if timeout is not None else os.getenv('CLIENT_TIMEOUT', '3'))
+        self.memory = LRUCache(
+            int(cache_size if cache_size is not None else os.getenv('CLIENT_CACHE_SIZE', '4096')),
+            float(ttl if ttl is not None else os.getenv('CLIENT_TTL', '21600')),
+        )
+        disk_enabled = os.getenv('CLIENT_DISK_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+        self.disk = DiskCache(cache_dir, float(disk_ttl if disk_ttl is not None else os.getenv('CLIENT_DISK_TTL', '604800'))) \
+            if cache_dir and disk_enabled else None
+
+        # 复用爬虫的传输后端、请求头、响应归档和省份名称
+        self._crawler = ScoreCrawler()
+        self.retry_policy = RetryPolicy(attempts=2, base_delay=0.2, max_delay=1.0)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(('memory', 'disk', 'fetch', 'coalesced'), 0)
+
+    def province_name(self, province_id):
+        return self._crawler.province_dict.get(str(province_id), f'省份{province_id}')
+
+    # ---- 查询接口 ----
+
+    def scores(self, school_id, year, province_id, timeout=None):
+        """某校某年在某省的专业分数线"""
+        school_id, year, province_id = int(school_id), str(year), str(province_id)
+
+        def build(data):
+            rows = build_score_records(data, school_id, year, province_id, self.province_name(province_id))
+            return tuple(ScoreRecord(**row) for row in rows)
+
+        return self._lookup(score_url(school_id, year, province_id), build, (), timeout)
+
+    def plans(self, school_id, year, province_id, timeout=None):
+        """某校某年在某省的招生计划"""
+        school_id, year, province_id = int(school_id), str(year), str(province_id)
+
+        def build(data):
+            rows = build_plan_records(data, school_id, year, province_id, self.province_name(province_id))
+            return tuple(PlanRecord(**row) for row in rows)
+
+        return self._lookup(plan_url(school_id, year, province_id), build, (), timeout)
+
+    def school(self, school_id, timeout=None):
+        """学校详情（info.json）；列表接口独有的字段（如 view_total）为 None"""
+        def build(data):
+            school = apply_school_detail(build_school_info(data), data)
+            school['school_id'] = school.get('school_id') or int(school_id)
+            return SchoolRecord(**{f: school.get(f) for f in SchoolRecord._fields})
+
+        return self._lookup(info_url(int(school_id)), build, None, timeout)
+
+    def stats(self):
+        """各层命中次数：memory / disk / fetch（网络请求） / coalesced（合并到他人请求）"""
+        return dict(self.counts, cached=len(self.memory))
+
+    # ---- 内部实现 ----
+
+    def _lookup(self, url, build, empty, timeout):
+        """内存缓存 → 合并进行中的同一查询 → 磁盘缓存 / 网络"""
+        value = self.memory.get(url)
+        if value is not _MISS:
+            self.counts['memory'] += 1
+            return value
+
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            future = self._inflight.get(url)
+            owner = future is None
+            if owner:
+                future = self._inflight[url] = Future()
+            else:
+                self.counts['coalesced'] += 1
+
+        if owner:
+            try:
+                value = self._load(url, build, empty, deadline)
+                self.memory.put(url, value)
+                future.set_result(value)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(url, None)
+
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            raise ClientTimeout(f"查询超时: {url}") from None
+
+    def _load(self, url, build, empty, deadline):
+        """读取并解析一个文件：磁盘缓存命中时不发请求，网络取到的有效响应写入磁盘缓存"""
+        raw = self.disk.get(url) if self.disk is not None else None
+        fetched = raw is None
+        if fetched:
+            raw = self._fetch(url, deadline)
+        else:
+            self.counts['disk'] += 1
+
+        try:
+            data = decode_static(*raw)
+        except ValueError as e:
+            raise ClientError(f"响应解析失败: {url}: {e}") from e
+        if data == 'no_data':
+            value = empty
+        elif isinstance(data, dict):
+            value = build(data)
+        else:
+            raise ClientError(f"响应格式错误: {url}（状态码 {raw[0]}）")
+
+        if fetched and self.disk is not None:
+            self.disk.put(url, *raw)
+        return value
+
+    def _fetch(self, url, deadline):
+        """发出请求（带有限的重试），返回 (状态码, 原始字节)"""
+        crawler = self._crawler
+        if crawler.archive is not None and crawler.archive.replays(request_key('GET', url)):
+            return crawler.archive.lookup(request_key('GET', url))
+
+        breaker, _ = host_guard(url)
+        if not breaker.ready():
+            raise ClientError(f"{breaker.host} 处于熔断状态，暂不请求")
+
+        self.counts['fetch'] += 1
+        error = None
+        for attempt in range(self.retry_policy.attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response = crawler.transport.get(url, timeout=remaining)
+            except crawler.transport.errors as e:
+                error = e
+                breaker.record_failure()
+            else:
+                if not self.retry_policy.retryable(response.status_code):
+                    breaker.record_success()
+                    return response.status_code, response.content
+                error = ClientError(f"状态码 {response.status_code}")
+                breaker.record_failure()
+
+            wait = self.retry_policy.backoff(attempt)
+            if attempt < self.retry_policy.attempts - 1 and time.monotonic() + wait < deadline:
+                time.sleep(wait)
+
+        if error is None or time.monotonic() >= deadline:
+            raise ClientTimeout(f"查询超时: {url}") from error
+        if isinstance(error, ClientError):
+            raise error
+        raise ClientError(f"请求失败: {url}: {error}") from error
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m crawlers.client scores|plans <学校ID> <年份> <省份ID>
+    # python -m crawlers.client school <学校ID>
+    if len(sys.argv) < 3 or sys.argv[1] not in ('scores', 'plans', 'school'):
+        print("用法: python -m crawlers.client scores|plans <学校ID> <年份> <省份ID> | school <学校ID>")
+        sys.exit(1)
+
+    client = GaokaoClient()
+    for attempt in ('首次', '再次'):
+        started = time.perf_counter()
+        result = getattr(client, sys.argv[1])(*sys.argv[2:])
+        elapsed = (time.perf_counter() - started) * 1e6
+        count = 0 if result is None else (1 if sys.argv[1] == 'school' else len(result))
+        print(f"{attempt}查询: {count} 条记录，{elapsed:.0f} 微秒")
+
+    if sys.argv[1] == 'school' and result is not None:
+        print(f"   {result.name}（{result.province} {result.city}）")
+    elif result:
+        for record in result[:10]:
+            print(f"   {record}")
+        if len(result) > 10:
+            print(f"   ... 共 {len(result)} 条")
+    print(f"   缓存统计: {client.stats()}")
@@ -0,0 +1,214 @@
+"""截止时间模式：在给定的时间预算内尽量多地完成分数线/招生计划爬取
+
+    python -m crawlers scores --deadline 330
+    CRAWL_DEADLINE=330 python -m crawlers.plans
+
+普通模式按学校顺序爬完全部 学校×年份 才保存，作业到时限被强制终止时全部输出都会丢失。
+截止时间模式下：
+
+    1. 工作单元为 (学校, 年份)，按价值排序：年份越新越优先，同一年份中已有输出里还没有数据的学校优先
+    2. 已在本轮完成的单元记录在 data/state/progress_{数据集}.json，下次运行从剩余的单元继续，
+       全部完成后开始新的一轮
+    3. 每个单元开始前检查剩余时间：剩余时间减去保存所需的预留（CRAWL_DEADLINE_RESERVE，默认10分钟）
+       不够再完成一个单元时停止领取新单元；收到 SIGTERM 时同样在当前单元完成后停止
+    4. 停止后把新结果合并进已有输出（只替换完成的单元中实际请求过的省份，其余保持不变），
+       保存进度并报告覆盖率
+"""
+import json
+import os
+import signal
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from .discovery import ProvinceDiscovery
+from .pipeline import ParsePipeline
+from .planner import format_duration
+from .storage import atomic_write
+
+
+class DeadlineClock:
+    """墙钟时间预算（从创建时开始计时）"""
+
+    def __init__(self, minutes, reserve_minutes=None):
+        self.deadline = time.monotonic() + float(minutes) * 60
+        self.reserve = float(reserve_minutes if reserve_minutes is not None
+                             else os.getenv('CRAWL_DEADLINE_RESERVE', '10')) * 60
+        self.interrupted = False
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def should_stop(self, next_cost):
+        """剩余时间（扣除预留）不足以再完成一个预计耗时 next_cost 秒的单元时停止"""
+        return self.interrupted or self.remaining() - self.reserve < next_cost * 1.5
+
+    @contextmanager
+    def trap_sigterm(self):
+        """收到 SIGTERM 时不立即退出，而是在当前单元完成后停止并保存"""
+        def handler(signum, frame):
+            print(f"\n⚠️  收到终止信号，完成当前单元后保存并退出")
+            self.interrupted = True
+
+        try:
+            previous = signal.signal(signal.SIGTERM, handler)
+        except ValueError:
+            # 不在主线程中时无法设置信号处理
+            yield
+            return
+        try:
+            yield
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+
+class ProgressState:
+    """跨运行的进度（data/state/progress_{名称}.json）
+
+    {'round': 第几轮, 'years': 本轮的年份, 'provinces': 本轮的省份, 'done': {'学校ID/年份': 完成日期}, 'update_time': ...}
+    年份或省份配置变化时开始新的一轮。
+    """
+
+    def __init__(self, name, years, provinces=(), data_dir='data'):
+        self.path = os.path.join(data_dir, 'state', f'progress_{name}.json')
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {'round': 1, 'years': list(years), 'provinces': list(provinces), 'done': {}}
+        if self.state['years'] != list(years) or self.state.get('provinces', []) != list(provinces):
+            self.state = {'round': self.state['round'] + 1, 'years': list(years), 'provinces': list(provinces),
+                          'done': {}}
+        self.done = self.state['done']
+
+    @staticmethod
+    def key(school_id, year):
+        return f'{school_id}/{year}'
+
+    def next_round(self):
+        self.state['round'] += 1
+        self.done.clear()
+
+    def mark(self, school_id, year):
+        self.done[self.key(school_id, year)] = datetime.now().strftime('%Y-%m-%d')
+
+    def save(self):
+        self.state['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        atomic_write(self.path, json.dumps(self.state, ensure_ascii=False).encode('utf-8'))
+
+
+def order_units(school_ids, years, covered):
+    """按价值排序的 (学校, 年份)：年份越新越优先，同一年份中没有数据的学校优先，其余保持原顺序"""
+    newest = sorted(years, key=lambda y: int(y) if str(y).isdigit() else 0, reverse=True)
+    return sorted(
+        ((school_id, year) for school_id in school_ids for year in years),
+        key=lambda unit: (newest.index(unit[1]), (str(unit[0]), str(unit[1])) in covered),
+    )
+
+
+def deadline_minutes(value=None):
+    """--deadline / CRAWL_DEADLINE（分钟），未设置返回 None"""
+    value = value if value is not None else os.getenv('CRAWL_DEADLINE')
+    return float(value) if value not in (None, '') else None
+
+
+def crawl_with_deadline(crawler, minutes, url_of, builder, filename, make_views, school_ids, years,
+                        province_ids, parse_workers=None):
+    """截止时间模式的爬取（ScoreCrawler / PlanCrawler 共用），返回合并后的全部记录"""
+    # 分片运行各自记录进度，如 progress_scores.shard-1-of-4.json
+    state = ProgressState(os.path.splitext(crawler.output_name(filename))[0], years, province_ids)
+    existing = crawler.read_output(filename)
+    covered = {(str(r.get('school_id')), str(r.get('year'))) for r in existing}
+
+    units = [u for u in order_units(school_ids, years, covered) if ProgressState.key(*u) not in state.done]
+    if not units:
+        state.next_round()
+        units = order_units(school_ids, years, covered)
+    total = len(school_ids) * len(years)
+
+    clock = DeadlineClock(minutes)
+    print(f"\n{'='*60}")
+    print(f"⏰ 截止时间模式: {format_duration(clock.remaining())}（预留 {format_duration(clock.reserve)} 保存）")
+    print(f"第 {state.state['round']} 轮 | 本轮已完成 {total - len(units)}/{total} 个 学校×年份 | 待完成 {len(units)} 个")
+    print(f"{'='*60}\n")
+
+    discovery = ProvinceDiscovery(crawler, province_ids)
+    school_provinces = {}
+    results = {}
+    crawled = set()  # 完成的单元中实际请求过的 (学校, 年份, 省份)，合并时只替换这些
+    costs = []
+    incomplete = 0
+    stopped = False
+
+    with ParsePipeline(builder, workers=parse_workers) as pipeline, clock.trap_sigterm():
+        for n, (school_id, year) in enumerate(units, 1):
+            # 预计耗时取最近单元中的最大值，留出余量
+            if clock.should_stop(max(costs[-20:], default=0)):
+                stopped = True
+                print(f"\n⏰ 剩余 {format_duration(max(clock.remaining(), 0))}，停止领取新单元")
+                break
+
+            started = time.monotonic()
+            if school_id not in school_provinces:
+                school_provinces[school_id] = discovery.provinces_for(school_id)[0]
+            provinces = school_provinces[school_id]
+
+            prefetched = crawler.prefetch_static([url_of(school_id, year, p) for p in provinces])
+            pending = []
+            for province_id in provinces:
+                try:
+                    raw = crawler.fetch_static(url_of(school_id, year, province_id))
+                except Exception as e:
+                    print(f"   ⚠️  请求异常: {str(e)}")
+                    raw = None
+                if raw is not None and raw[0] == 404:
+                    continue
+                province_name = crawler.province_dict.get(province_id, f'省份{province_id}')
+                pending.append((province_id, pipeline.submit(raw, school_id, year, province_id, province_name,
+                                                             crawler.projection.fields)))
+                if not prefetched:
+                    crawler.polite_sleep(1.5, 3.0)
+
+            records = []
+            failed = False
+            for province_id, future in pending:
+                status, rows = future.result()
+                failed = failed or status is None
+                if rows:
+                    discovery.observe(school_id, province_id)
+                records.extend(rows)
+
+            # 有请求失败的单元不替换已有数据，也不记为完成，下次运行重试
+            if failed:
+                incomplete += 1
+                print(f"[{n}/{len(units)}] 学校ID {school_id} {year}年: ⚠️  有请求失败，下次重试")
+            else:
+                results[(str(school_id), str(year))] = records
+                crawled.update((str(school_id), str(year), str(p)) for p in provinces)
+                state.mark(school_id, year)
+                print(f"[{n}/{len(units)}] 学校ID {school_id} {year}年: {len(records)} 条")
+
+            crawler.polite_sleep(4.0, 7.0)
+            costs.append(time.monotonic() - started)
+
+    # 合并：只替换本次完成的单元中请求过的省份，其他省份（如 --provinces 子集之外）的已有记录保留
+    merged = [r for r in existing
+              if (str(r.get('school_id')), str(r.get('year')), str(r.get('province_id'))) not in crawled]
+    merged.extend(r for rows in results.values() for r in rows)
+    discovery.save()
+    crawler.save_records(merged, filename)
+    crawler.save_views(make_views(merged))
+    state.save()
+
+    # 覆盖率
+    have = {(str(r.get('school_id')), str(r.get('year'))) for r in merged}
+    print(f"\n{'='*60}")
+    print(f"⏰ 截止时间模式{'提前停止' if stopped else '完成'}！")
+    print(f"   本次完成: {len(results)} 个 学校×年份（失败 {incomplete} 个），剩余 {len(units) - len(results)} 个留给下次运行")
+    print(f"   本轮进度: {len(state.done)}/{total}（第 {state.state['round']} 轮）")
+    for year in sorted(years, reverse=True):
+        count = sum(1 for sid in school_ids if (str(sid), str(year)) in have)
+        print(f"   {year}年: 有数据的学校 {count}/{len(school_ids)}")
+    print(f"   总计: {len(merged)} 条记录")
+    print(f"{'='*60}\n")
+
+    return merged
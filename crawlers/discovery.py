@@ -0,0 +1,146 @@
+"""按学校发现实际招生的省份
+
+逐年逐省请求 schoolspecialscore / schoolspecialplan 时，绝大多数 (学校, 省份) 组合是 404：
+地方院校往往只在少数几个省份招生。这里先确定每所学校的招生省份集合，只对这些省份逐年请求：
+
+    1. schools.json 中的 province_score_min（详情接口 info.json 已经给出各省最低分）
+    2. 已有的 scores.json / plans.json（或分区输出）中出现过的省份
+    3. 以往爬取中发现的省份（data/state/provinces_{dataset}.json）
+    4. 以上都没有时，预先请求一次 school/{id}/info.json
+
+每次运行有 1/sweep_every 的学校按学校ID轮换做一次全量省份扫描，用来发现新增的招生省份。
+"""
+import json
+import os
+import zlib
+from .base import decode_static
+from .partitions import read_dataset
+from .quality import RecordReader
+from .storage import atomic_write
+
+RESULT_FILES = ('scores.json', 'plans.json')
+
+
+def info_url(school_id):
+    return f"https://static-data.gaokao.cn/www/2.0/school/{school_id}/info.json"
+
+
+class ProvinceDiscovery:
+
+    def __init__(self, crawler, all_provinces, data_dir='data', sweep_every=None, enabled=None):
+        self.crawler = crawler
+        self.all_provinces = list(all_provinces)
+        self.data_dir = data_dir
+        self.sweep_every = int(sweep_every if sweep_every is not None else os.getenv('PROVINCE_SWEEP_EVERY', '10'))
+        if enabled is None:
+            enabled = os.getenv('PROVINCE_DISCOVERY', '1').lower() not in ('0', 'false', 'off', 'no')
+        self.enabled = enabled
+        self.state_path = os.path.join(data_dir, 'state', f'provinces_{crawler.dataset}.json')
+
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {'run': 0, 'schools': {}}
+
+        self.known = {sid: set(pids) for sid, pids in self.state['schools'].items()}
+        self.probes = 0
+        self.sweeps = 0
+        self.planned = 0
+        self.schools = 0
+        if self.enabled:
+            self._load_sources()
+
+    def _add(self, school_id, province_ids):
+        self.known.setdefault(str(school_id), set()).update(str(p) for p in province_ids)
+
+    def _load_sources(self):
+        path = os.path.join(self.data_dir, 'schools.json')
+        if os.path.exists(path):
+            for school in RecordReader(path):
+                if isinstance(school.get('province_score_min'), dict):
+                    self._add(school.get('school_id'), school['province_score_min'])
+
+        for filename in RESULT_FILES:
+            for record in read_dataset(filename, self.data_dir):
+                if record.get('province_id') is not None:
+                    self._add(record.get('school_id'), [record['province_id']])
+
+    def _probe(self, school_id):
+        """预先请求 info.json，取 province_score_min 中的省份"""
+        self.probes += 1
+        try:
+            data = decode_static(*self.crawler.fetch_static(info_url(school_id)))
+        except Exception as e:
+            print(f"   ⚠️  省份发现请求失败 (ID:{school_id}): {str(e)}")
+            return
+        finally:
+            self.crawler.polite_sleep(1.5, 3.0)
+
+        if isinstance(data, dict) and isinstance(data.get('province_score_min'), dict):
+            self._add(school_id, data['province_score_min'])
+
+    def full_sweep(self, school_id):
+        """本次运行是否对该学校做全量扫描（按学校ID错开，每 sweep_every 次运行轮到一次）"""
+        if self.sweep_every <= 1:
+            return True
+        return (self.state['run'] + zlib.crc32(str(school_id).encode())) % self.sweep_every == 0
+
+    def provinces_for(self, school_id):
+        """返回 (需要请求的省份列表, 说明)"""
+        self.schools += 1
+        school_id = str(school_id)
+
+        if not self.enabled:
+            provinces, reason = self.all_provinces, '全部省份'
+        elif self.full_sweep(school_id):
+            self.sweeps += 1
+            provinces, reason = self.all_provinces, '全量扫描'
+        else:
+            if not self.known.get(school_id):
+                self._probe(school_id)
+            known = self.known.get(school_id)
+            if known:
+                provinces = [p for p in self.all_provinces if p in known]
+                reason = f'已知招生省份 {len(provinces)}/{len(self.all_provinces)} 个'
+            else:
+                provinces, reason = self.all_provinces, '未发现招生省份，全部请求'
+
+        self.planned += len(provinces)
+        return provinces, reason
+
+    def plan(self, school_id):
+        """不发出请求地预测 provinces_for 的结果，返回 (省份列表, 是否需要预探测)
+
+        需要预探测的学校招生省份未知，按全部省份计（上限）。
+        """
+        school_id = str(school_id)
+        if not self.enabled or self.full_sweep(school_id):
+            return self.all_provinces, False
+        known = self.known.get(school_id)
+        if known:
+            return [p for p in self.all_provinces if p in known], False
+        return self.all_provinces, True
+
+    def observe(self, school_id, province_id):
+        """记录在该省份确实取到了数据"""
+        self._add(school_id, [province_id])
+
+    def save(self, advance=True):
+        """保存已知省份；advance=False 用于运行中途的保存，不计为一次运行（不推进全量扫描的轮换）"""
+        if not self.enabled:
+            return
+        self.state = {
+            'run': self.state['run'] + (1 if advance else 0),
+            'schools': {sid: sorted(pids) for sid, pids in sorted(self.known.items()) if pids},
+        }
+        atomic_write(self.state_path, json.dumps(self.state, ensure_ascii=False).encode('utf-8'))
+
+    def summary(self, years_count):
+        """打印请求量对比"""
+        if not self.schools:
+            return
+        full = self.schools * len(self.all_provinces) * years_count
+        planned = self.planned * years_count + self.probes
+        print(f"   省份发现: 请求 {planned} 个（全量需 {full} 个，减少 {100 - planned * 100 // max(full, 1)}%），"
+              f"预探测 {self.probes} 所，全量扫描 {self.sweeps} 所")
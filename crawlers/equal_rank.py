@@ -0,0 +1,179 @@
+"""一分一段表与等位分
+
+不同年份的分数不可直接比较（试题难度每年不同），可比较的是位次。这里用 sections.json 中的
+一分一段表：
+
+    1. 为缺少 min_rank 的记录按当年当省当科类的表估计位次（写入 min_rank_est，与公布的 min_rank 区分）
+    2. 把每条记录的位次换算成目标年份（默认该省该科类最新一年）的分数，即等位分 equal_score
+
+每张表存为两个紧凑的有序整数数组（array），同一张表的全部查询先排序，再与表做一次归并扫描，
+一次处理完所有记录。
+"""
+import os
+from array import array
+from .quality import RecordReader
+from .views import to_int
+
+
+class RankTable:
+    """一张一分一段表：scores 升序，ranks[i] 为分数不低于 scores[i] 的人数（随分数升高而减小）"""
+
+    __slots__ = ('scores', 'ranks')
+
+    def __init__(self, scores, ranks):
+        pairs = sorted(zip(scores, ranks))
+        self.scores = array('i', (s for s, _ in pairs))
+        self.ranks = array('l', (r for _, r in pairs))
+
+    @classmethod
+    def from_record(cls, record):
+        scores = [to_int(s) for s in record.get('scores') or []]
+        ranks = [to_int(r) for r in record.get('ranks') or []]
+        if not scores or len(scores) != len(ranks) or None in scores or None in ranks:
+            return None
+        return cls(scores, ranks)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def ranks_at(self, scores):
+        """批量查位次：对每个分数取表中不低于它的最低分数段的累计人数
+
+        高于表中最高分的按最高分段计，低于最低分的按最低分段计。返回与输入同序的列表。
+        """
+        order = sorted(range(len(scores)), key=scores.__getitem__)
+        result = [None] * len(scores)
+        table_scores, table_ranks, n = self.scores, self.ranks, len(self.scores)
+        i = 0
+        for q in order:
+            while i < n - 1 and table_scores[i] < scores[q]:
+                i += 1
+            result[q] = table_ranks[i]
+        return result
+
+    def scores_at(self, ranks):
+        """批量查分数：对每个位次取累计人数不小于它的最高分数（即该位次考生所在的分数段）
+
+        位次超出全省人数时取表中最低分。返回与输入同序的列表。
+        """
+        # 位次从大到小处理，对应分数从低到高扫描
+        order = sorted(range(len(ranks)), key=ranks.__getitem__, reverse=True)
+        result = [None] * len(ranks)
+        table_scores, table_ranks, n = self.scores, self.ranks, len(self.scores)
+        i = 0
+        for q in order:
+            while i < n - 1 and table_ranks[i + 1] >= ranks[q]:
+                i += 1
+            result[q] = table_scores[i]
+        return result
+
+
+def load_tables(path='data/sections.json'):
+    """读取一分一段表，返回 {(year, province_id, type): RankTable}"""
+    tables = {}
+    if not os.path.exists(path):
+        return tables
+    for record in RecordReader(path):
+        table = RankTable.from_record(record)
+        if table is not None:
+            tables[(str(record.get('year')), str(record.get('province_id')), str(record.get('type')))] = table
+    return tables
+
+
+def latest_years(tables):
+    """每个 (province_id, type) 的最新年份"""
+    latest = {}
+    for year, province_id, type_code in tables:
+        key = (province_id, type_code)
+        if key not in latest or int(year) > int(latest[key]):
+            latest[key] = year
+    return latest
+
+
+def positive(value):
+    """正整数，否则为 None（数据中 0 表示未知）"""
+    value = to_int(value)
+    return value if value is not None and value > 0 else None
+
+
+def fill_ranks(records, tables, target_year=None):
+    """原地为记录估计位次并计算 equal_score，返回 (估计位次数, 计算等位分数)
+
+    缺少公布位次 min_rank 的记录按一分一段表查出位次，写入 min_rank_est（不覆盖 min_rank，
+    下游可以区分公布值与估计值，每次运行都重新估计）；min_score 缺失或为 0 的不估计。
+    equal_score 为该记录的位次（优先公布值）在目标年份（target_year，默认该省该科类最新一年）对应的分数。
+    """
+    # 第一步：按 (年份, 省份, 科类) 分组，批量估计位次
+    groups = {}
+    for n, record in enumerate(records):
+        if positive(record.get('min_rank')) is None and positive(record.get('min_score')) is not None:
+            key = (str(record.get('year')), str(record.get('province_id')), str(record.get('type')))
+            if key in tables:
+                groups.setdefault(key, []).append(n)
+        elif record.get('min_rank_est') is not None:
+            # 已有公布位次或分数未知：之前的估计不再有依据
+            record['min_rank_est'] = None
+
+    filled = 0
+    for key, indexes in groups.items():
+        ranks = tables[key].ranks_at([to_int(records[n]['min_score']) for n in indexes])
+        for n, rank in zip(indexes, ranks):
+            records[n]['min_rank_est'] = rank
+        filled += len(indexes)
+
+    # 第二步：按 (省份, 科类) 分组，把位次批量换算成目标年份的分数
+    latest = latest_years(tables)
+    groups = {}
+    ranks = {}
+    for n, record in enumerate(records):
+        rank = positive(record.get('min_rank')) or positive(record.get('min_rank_est'))
+        if rank is None:
+            if record.get('equal_score') is not None:
+                record['equal_score'] = None
+            continue
+        province_id, type_code = str(record.get('province_id')), str(record.get('type'))
+        year = target_year or latest.get((province_id, type_code))
+        if (str(year), province_id, type_code) in tables:
+            groups.setdefault((str(year), province_id, type_code), []).append(n)
+            ranks[n] = rank
+
+    equal = 0
+    for key, indexes in groups.items():
+        scores = tables[key].scores_at([ranks[n] for n in indexes])
+        for n, score in zip(indexes, scores):
+            records[n]['equal_score'] = score
+        equal += len(indexes)
+
+    return filled, equal
+
+
+if __name__ == "__main__":
+    import sys
+    from .base import BaseCrawler
+
+    # python -m crawlers.equal_rank [数据文件名 ...] [--year=目标年份] [--sections=一分一段表]
+    # 数据按 OUTPUT_LAYOUT 从 data/ 下的单个文件或分区读取并写回
+    files = [os.path.basename(a) for a in sys.argv[1:] if not a.startswith('--')] or ['scores.json', 'school_scores.json']
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+    tables = load_tables(options.get('sections', 'data/sections.json'))
+    if not tables:
+        print("⚠️  没有可用的一分一段表，请先运行 python -m crawlers sections")
+        sys.exit(1)
+
+    print(f"\n{'='*60}")
+    print(f"等位分计算：{len(tables)} 张一分一段表")
+    print(f"{'='*60}\n")
+
+    crawler = BaseCrawler()
+    for filename in files:
+        records = crawler.read_output(filename)
+        if not records:
+            print(f"⚠️  没有数据: {filename}")
+            continue
+        filled, equal = fill_ranks(records, tables, options.get('year'))
+        print(f"   {filename}: {len(records)} 条，估计位次 {filled} 条，等位分 {equal} 条")
+        crawler.save_records(records, filename)
+        if filename.startswith('scores.'):
+            from .views import score_views
+            crawler.save_views(score_views(records))
@@ -0,0 +1,127 @@
+import json
+from datetime import datetime
+from .partitions import read_dataset
+from .storage import atomic_open
+from .views import to_int
+
+
+def major_key(record):
+    """分数线/招生计划记录的连接键：学校×年份×省份×科类×专业组×专业"""
+    return (
+        str(record.get('school_id')),
+        str(record.get('year')),
+        str(record.get('province_id')),
+        str(record.get('type') or ''),
+        record.get('major_group') or '',
+        record.get('major_code') or record.get('major') or '',
+    )
+
+
+class MajorJoin:
+    """scores / plans / majors 的哈希连接
+
+    构造时对 plans 和 majors 各扫描一次建立哈希索引，并对 scores 扫描一次记录
+    各年位次；enrich() 再流式遍历 scores，每条记录 O(1) 查找，不做 n×m 嵌套循环。
+    """
+
+    def __init__(self, scores, plans, majors):
+        self.scores = scores
+
+        # 招生计划：同一连接键可能有多条（不同批次），计划人数累加
+        self.plan_index = {}
+        for p in plans:
+            key = major_key(p)
+            self.plan_index[key] = self.plan_index.get(key, 0) + (to_int(p.get('plan_number')) or 0)
+
+        # 专业目录：优先按专业代码，其次按专业名称
+        self.major_by_code = {}
+        self.major_by_name = {}
+        for m in majors:
+            if m.get('code'):
+                self.major_by_code.setdefault(m['code'], m)
+            if m.get('name'):
+                self.major_by_name.setdefault(m['name'], m)
+
+        # 位次走势：去掉年份后的连接键 -> {年份: 最低位次}
+        self.rank_history = {}
+        for s in scores:
+            rank = to_int(s.get('min_rank'))
+            if rank is None:
+                continue
+            key = major_key(s)
+            history = self.rank_history.setdefault(key[:1] + key[2:], {})
+            year = key[1]
+            # 同一年多个批次取最大位次（即最低录取线）
+            if history.get(year) is None or rank > history[year]:
+                history[year] = rank
+
+    def find_major(self, record):
+        major = None
+        if record.get('major_code'):
+            major = self.major_by_code.get(record['major_code'])
+        if major is None and record.get('major'):
+            major = self.major_by_name.get(record['major'])
+        return major
+
+    def enrich(self):
+        """逐条产出连接后的专业记录"""
+        for s in self.scores:
+            key = major_key(s)
+            major = self.find_major(s) or {}
+            history = self.rank_history.get(key[:1] + key[2:], {})
+
+            yield {
+                'school_id': s.get('school_id'),
+                'year': s.get('year'),
+                'province_id': s.get('province_id'),
+                'province': s.get('province'),
+                'type': s.get('type'),
+                'batch': s.get('batch'),
+                'major': s.get('major'),
+                'major_code': s.get('major_code') or major.get('code'),
+                'major_group': s.get('major_group'),
+                'level2_name': s.get('level2_name') or major.get('level2_name'),
+
+                # 计划 vs 实际录取
+                'plan_number': self.plan_index.get(key),
+                'enrollment': to_int(s.get('enrollment')),
+
+                # 分数与位次
+                'min_score': to_int(s.get('min_score')),
+                'min_rank': to_int(s.get('min_rank')),
+                'min_rank_history': dict(sorted(history.items())),
+
+                # 专业薪资
+                'salary_avg': major.get('salary_avg'),
+                'salary_5year': major.get('salary_5year'),
+            }
+
+
+def write_stream(rows, filepath):
+    """流式写出 {'update_time', 'data', 'count'} 格式的JSON，不在内存中保留全部结果
+
+    先写临时文件再原子替换，中途失败或被终止时原文件保持不变。
+    """
+    count = 0
+    with atomic_open(filepath, 'w') as f:
+        f.write('{\n  "update_time": %s,\n  "data": [' % json.dumps(datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        for row in rows:
+            f.write(',\n    ' if count else '\n    ')
+            f.write(json.dumps(row, ensure_ascii=False))
+            count += 1
+        f.write('\n  ],\n  "count": %d\n}\n' % count)
+    return count
+
+
+def load_records(filename):
+    """读取 data/ 下的爬虫输出（单个文件或分区），不存在时返回空列表"""
+    records = list(read_dataset(filename))
+    if not records:
+        print(f"⚠️  未找到 {filename}，按空数据处理")
+    return records
+
+
+if __name__ == "__main__":
+    join = MajorJoin(load_records('scores.json'), load_records('plans.json'), load_records('majors.json'))
+    count = write_stream(join.enrich(), 'data/majors_enriched.json')
+    print(f"✓ 数据已保存到 data/majors_enriched.json（{count} 条）")
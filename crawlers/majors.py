@@ -1,16 +1,224 @@
 import time
 import json
 import os
-from .base import BaseCrawler
+import re
+from datetime import datetime, timedelta
+from .base import BaseCrawler, decode_static
+from .profiler import parse_profile_args, profile_run
+from .schema import MAJOR_DETAIL_FIELDS
+from .storage import atomic_write
+
+# 专业详情接口（可用 MAJOR_DETAIL_URL 覆盖，占位符 {special_id}）
+MAJOR_DETAIL_URL = "https://static-data.gaokao.cn/www/2.0/special/{special_id}/pc_special_detail.json"
+DETAIL_STATE = 'data/state/major_details.json'
+
+
+def major_detail_url(special_id):
+    return os.getenv('MAJOR_DETAIL_URL', MAJOR_DETAIL_URL).format(special_id=special_id)
+
+
+def _pick(data, *keys):
+    """取第一个非空字段"""
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, '', [], {}):
+            return value
+    return None
+
+
+def _first_number(value):
+    match = re.search(r'\d+(?:\.\d+)?', str(value))
+    return float(match.group()) if match else None
+
+
+def build_major_detail(data, detail_time=None):
+    """将专业详情响应转换为详情字段（模块级函数，接口字段缺失时对应字段为None）"""
+    courses = _pick(data, 'course', 'main_course', 'courses')
+    if isinstance(courses, str):
+        courses = [c.strip() for c in re.split(r'[、,，;；]', courses) if c.strip()]
+
+    # 就业率：列表（按年份）取最近一年，字符串如 "95%-100%" 取下界
+    rate = _pick(data, 'jobrate', 'job_rate', 'employment_rate')
+    if isinstance(rate, list):
+        rows = [r for r in rate if isinstance(r, dict)]
+        rows.sort(key=lambda r: str(r.get('year', '')))
+        rate = rows[-1].get('rate') if rows else None
+    employment_rate = _first_number(rate) if rate is not None else None
+
+    # 就业去向：{分类: [{'name', 'rate'}]} 或 [{'name', 'rate'}]，统一为列表
+    destinations = _pick(data, 'jobdetail', 'job_detail', 'employment')
+    if isinstance(destinations, dict):
+        destinations = [
+            dict(item, category=category)
+            for category, items in destinations.items() if isinstance(items, list)
+            for item in items if isinstance(item, dict)
+        ]
+
+    # 薪资曲线：[{'year'/'name', 'salary'/'value'}]，按毕业年限排列
+    curve = _pick(data, 'salary', 'salary_curve', 'salarydata', 'salary_list')
+    if isinstance(curve, list):
+        curve = [
+            {'year': row.get('year') or row.get('name'), 'salary': row.get('salary') or row.get('value')}
+            for row in curve if isinstance(row, dict)
+        ]
+
+    schools = _pick(data, 'school_num', 'schoolnum', 'school_count', 'school')
+    if isinstance(schools, list):
+        schools = len(schools)
+    elif schools is not None:
+        schools = int(_first_number(schools) or 0) or None
+
+    return {
+        'intro': _pick(data, 'is_what', 'content', 'introduction'),
+        'learn_what': _pick(data, 'learn_what'),
+        'do_what': _pick(data, 'do_what'),
+        'courses': courses,
+        'job_direction': _pick(data, 'job', 'job_direction'),
+        'employment_rate': employment_rate,
+        'employment_destinations': destinations,
+        'salary_curve': curve,
+        'offering_schools': schools,
+        'detail_time': detail_time,
+    }
+
+
+class MajorDetailState:
+    """已获取的专业详情（data/state/major_details.json），每批写入一次，中断后续爬时跳过仍新鲜的条目
+
+    {special_id: {'fetched': 'YYYY-MM-DD', 'detail': {...} 或 None（接口无此专业）}}
+    """
+
+    def __init__(self, path=DETAIL_STATE, max_age_days=None):
+        self.path = path
+        self.max_age = timedelta(days=int(max_age_days if max_age_days is not None else os.getenv('MAJOR_DETAIL_MAX_AGE', '30')))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def fresh(self, special_id):
+        entry = self.entries.get(str(special_id))
+        if not entry:
+            return False
+        return datetime.now() - datetime.strptime(entry['fetched'], '%Y-%m-%d') < self.max_age
+
+    def pending(self, special_ids):
+        """需要（重新）请求的 special_id，去重并保持顺序"""
+        return [special_id for special_id in dict.fromkeys(special_ids) if not self.fresh(special_id)]
+
+    def get(self, special_id):
+        entry = self.entries.get(str(special_id))
+        return entry and entry['detail']
+
+    def put(self, special_id, detail):
+        self.entries[str(special_id)] = {'fetched': datetime.now().strftime('%Y-%m-%d'), 'detail': detail}
+
+    def save(self):
+        body = json.dumps(dict(sorted(self.entries.items())), ensure_ascii=False, indent=1)
+        atomic_write(self.path, body.encode('utf-8'))
+
 
 class MajorCrawler(BaseCrawler):
     
+    dataset = 'majors'
+    
     def __init__(self):
         super().__init__()
         self._first_logged = False
     
-    def crawl(self, max_pages=200):
-        """爬取专业列表"""
+    def detail_batch_size(self):
+        """详情阶段每批的专业数（MAJOR_DETAIL_BATCH，默认为并发数的4倍且不少于20）"""
+        return int(os.getenv('MAJOR_DETAIL_BATCH', '0')) or max(self.static_concurrency * 4, 20)
+    
+    def crawl_details(self, majors, batch_size=None, state=None):
+        """详情阶段：按 special_id 获取专业详情并合并进 majors（原地修改）
+        
+        每批 batch_size 个专业并发预取（STATIC_CONCURRENCY，整批只限速一次），每批完成后写入
+        详情状态文件；已有且未过期（MAJOR_DETAIL_MAX_AGE 天）的详情直接复用，中断后重跑只请求剩余部分。
+        配合 CRAWL_ARCHIVE 时原始响应也会归档。
+        """
+        state = state or MajorDetailState()
+        batch_size = batch_size or self.detail_batch_size()
+        ids = [str(m['special_id']) for m in majors if m.get('special_id')]
+        pending = state.pending(ids)
+        
+        print(f"\n{'='*60}")
+        print(f"开始获取专业详情")
+        print(f"专业: {len(ids)} 个 | 需请求: {len(pending)} 个 | 复用: {len(ids) - len(pending)} 个 | 并发: {self.static_concurrency}")
+        print(f"{'='*60}\n")
+        
+        fetched = missing = failed = 0
+        started = time.time()
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            prefetched = self.prefetch_static([major_detail_url(special_id) for special_id in batch])
+            
+            for special_id in batch:
+                try:
+                    data = decode_static(*self.fetch_static(major_detail_url(special_id)))
+                except Exception as e:
+                    print(f"   ⚠️  专业 {special_id} 详情请求异常: {str(e)}")
+                    data = None
+                
+                if isinstance(data, dict):
+                    state.put(special_id, build_major_detail(data, datetime.now().strftime('%Y-%m-%d')))
+                    fetched += 1
+                elif data == 'no_data':
+                    state.put(special_id, None)
+                    missing += 1
+                else:
+                    failed += 1
+                
+                if not prefetched:
+                    self.polite_sleep(1.5, 3.0)
+            
+            state.save()
+            done = min(start + batch_size, len(pending))
+            rate = done / max(time.time() - started, 1e-9)
+            print(f"   ✓ {done}/{len(pending)}  成功 {fetched}  无详情 {missing}  失败 {failed}  "
+                  f"（{rate:.1f} 个/秒，预计剩余 {(len(pending) - done) / max(rate, 1e-9):.0f} 秒）")
+        
+        merged = 0
+        for major in majors:
+            detail = state.get(major.get('special_id'))
+            if detail:
+                major.update({f: detail.get(f) for f in MAJOR_DETAIL_FIELDS if self.projection.wants(f)})
+                merged += 1
+        
+        print(f"\n   专业详情: 合并 {merged}/{len(majors)} 个，本次请求 {len(pending)} 个（失败 {failed} 个，下次运行会重试）")
+        return majors
+    
+    def crawl_details_only(self):
+        """只运行详情阶段：读取已有的 majors.json，补充详情后保存"""
+        majors = self.read_output('majors.json')
+        if not majors:
+            print("⚠️  未找到 data/majors.json，请先爬取专业列表")
+            return []
+        self.crawl_details(majors)
+        self.save_to_json(majors, 'majors.json')
+        return majors
+    
+    def list_payload(self, page):
+        """专业列表接口的请求参数（每页30个）"""
+        return {
+            "keyword": "",
+            "page": page,
+            "size": 30,
+            "level1": "",
+            "level2": "",
+            "level3": "",
+            "uri": "apidata/api/gkv3/special/lists"
+        }
+    
+    def crawl(self, max_pages=200, fetch_details=None):
+        """爬取专业列表（fetch_details 或 MAJOR_DETAILS=true 时再获取每个专业的详情）"""
+        if fetch_details is None:
+            fetch_details = os.getenv('MAJOR_DETAILS', 'false').lower() == 'true'
+        # 没有配置任何详情字段时，不必请求详情接口
+        if not self.projection.wants_any(MAJOR_DETAIL_FIELDS):
+            fetch_details = False
+        
         majors = []
         page = 1
         
@@ -22,17 +230,7 @@ class MajorCrawler(BaseCrawler):
         while page <= max_pages:
             print(f"\n📡 [专业列表接口] page={page}, size=30")
             
-            payload = {
-                "keyword": "",
-                "page": page,
-                "size": 30,
-                "level1": "",
-                "level2": "",
-                "level3": "",
-                "uri": "apidata/api/gkv3/special/lists"
-            }
-            
-            data = self.make_request(payload, retry=5)
+            data = self.make_request(self.list_payload(page), retry=5)
             
             if not data:
                 print(f"   ✗ 第 {page} 页：请求失败")
@@ -150,7 +348,7 @@ class MajorCrawler(BaseCrawler):
                     'view_month': item.get('view_month'),     # 月浏览量
                     'view_week': item.get('view_week'),       # 周浏览量
                 }
-                majors.append(major_info)
+                majors.append(self.projection.apply(major_info))
             
             print(f"   ✓ 第 {page} 页：获取 {len(items)} 个专业（累计 {len(majors)} 个）")
             
@@ -161,6 +359,9 @@ class MajorCrawler(BaseCrawler):
             page += 1
             self.polite_sleep(3.0, 6.0)
         
+        if fetch_details:
+            self.crawl_details(majors)
+        
         # 保存数据
         self.save_to_json(majors, 'majors.json')
         
@@ -176,10 +377,23 @@ class MajorCrawler(BaseCrawler):
             # 统计有薪资数据的专业
             has_salary = sum(1 for m in majors if m.get('salary_avg'))
             print(f"   有薪资数据: {has_salary} 个 ({has_salary*100//len(majors)}%)")
+            if fetch_details:
+                has_detail = sum(1 for m in majors if m.get('detail_time'))
+                print(f"   有详情数据: {has_detail} 个 ({has_detail*100//len(majors)}%)")
         print(f"{'='*60}\n")
         
         return majors
 
 if __name__ == "__main__":
+    import sys
+    
+    # 支持 --details（同时获取专业详情）/ --details-only（只补充已有 majors.json 的详情）
+    # 以及 --profile / --profile-stats=PATH / --profile-stacks=PATH
+    argv, profile_options = parse_profile_args(sys.argv[1:])
+    
     crawler = MajorCrawler()
-    crawler.crawl()
+    with profile_run(profile_options):
+        if '--details-only' in argv:
+            crawler.crawl_details_only()
+        else:
+            crawler.crawl(fetch_details=True if '--details' in argv else None)
@@ -0,0 +1,149 @@
+"""按 年份/省份 分区的数据输出
+
+data/{dataset}/{year}/{province_id}.jsonl   每个分区一个 JSON Lines 文件，记录按固定顺序排序
+data/{dataset}/manifest.json                各分区的路径、记录数和内容哈希
+
+只关心某个省份的读者只需读取对应的分区；写入时只重写内容有变化的分区，
+数据仓库的提交历史里每次只出现真正变化的文件。
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from .storage import atomic_write
+from .views import to_int
+
+PARTITIONED = ('scores', 'plans')
+MANIFEST = 'manifest.json'
+
+
+def record_order(record):
+    """分区内的排序键：学校、批次、科类、专业等，保证同样的数据总是写出同样的字节"""
+    return (
+        to_int(record.get('school_id')) or 0,
+        str(record.get('batch') or ''),
+        str(record.get('type') or ''),
+        str(record.get('major_group') or ''),
+        str(record.get('major_code') or ''),
+        str(record.get('major') or ''),
+        json.dumps(record, ensure_ascii=False, sort_keys=True),
+    )
+
+
+class PartitionStore:
+
+    def __init__(self, dataset, data_dir='data', name=None):
+        """name 为目录名，默认与数据集同名（分片输出为 scores.shard-1-of-4 这样的目录）"""
+        self.dataset = dataset
+        self.root = os.path.join(data_dir, name or dataset)
+        self.manifest_path = os.path.join(self.root, MANIFEST)
+
+    def exists(self):
+        return os.path.exists(self.manifest_path)
+
+    def manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'dataset': self.dataset, 'update_time': None, 'count': 0, 'partitions': {}}
+
+    @staticmethod
+    def key_of(record):
+        return f"{record.get('year')}/{record.get('province_id')}"
+
+    def write(self, records, replace=True):
+        """按分区写入记录，返回 (重写的分区数, 删除的分区数)
+
+        replace=True 时 records 为完整数据，原有但本次没有记录的分区会被删除；
+        replace=False 时只替换 records 涉及的分区，其余分区保持不变。
+        """
+        groups = {}
+        for record in records:
+            groups.setdefault(self.key_of(record), []).append(record)
+
+        manifest = self.manifest()
+        partitions = dict(manifest['partitions'])
+        written = removed = 0
+
+        for key in sorted(groups):
+            rows = sorted(groups[key], key=record_order)
+            body = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in rows).encode('utf-8')
+            digest = hashlib.sha256(body).hexdigest()
+            path = f'{key}.jsonl'
+
+            entry = partitions.get(key)
+            if entry and entry['sha256'] == digest and os.path.exists(os.path.join(self.root, path)):
+                continue
+            atomic_write(os.path.join(self.root, path), body)
+            partitions[key] = {'path': path, 'count': len(rows), 'sha256': digest}
+            written += 1
+
+        if replace:
+            for key in sorted(set(partitions) - set(groups)):
+                filepath = os.path.join(self.root, partitions.pop(key)['path'])
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                if not os.listdir(os.path.dirname(filepath)):
+                    os.rmdir(os.path.dirname(filepath))
+                removed += 1
+
+        if written or removed or not self.exists():
+            manifest = {
+                'dataset': self.dataset,
+                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'count': sum(e['count'] for e in partitions.values()),
+                'partitions': dict(sorted(partitions.items())),
+            }
+            atomic_write(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+        return written, removed
+
+    def keys(self, year=None, province_id=None):
+        """符合条件的分区键，如 ['2025/13', '2025/37']"""
+        return [
+            key for key in self.manifest()['partitions']
+            if (year is None or key.split('/')[0] == str(year))
+            and (province_id is None or key.split('/')[1] == str(province_id))
+        ]
+
+    def read(self, year=None, province_id=None):
+        """逐条读取记录，只打开符合条件的分区"""
+        partitions = self.manifest()['partitions']
+        for key in self.keys(year, province_id):
+            with open(os.path.join(self.root, partitions[key]['path']), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def read_dataset(filename, data_dir='data', year=None, province_id=None):
+    """读取一个数据集的记录：有分区输出时读分区，否则读 data/{filename}（JSON 或 JSON Lines）
+
+    给出 year / province_id 时只返回符合条件的记录（分区输出只打开对应分区）。文件不存在时返回空列表。
+    """
+    from .quality import RecordReader
+
+    store = PartitionStore(filename.split('.')[0], data_dir)
+    if store.exists():
+        return store.read(year, province_id)
+    path = os.path.join(data_dir, filename)
+    if not os.path.exists(path):
+        return []
+    if year is None and province_id is None:
+        return RecordReader(path)
+    return (
+        r for r in RecordReader(path)
+        if (year is None or str(r.get('year')) == str(year))
+        and (province_id is None or str(r.get('province_id')) == str(province_id))
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m crawlers.partitions [数据集]：打印分区清单
+    store = PartitionStore(sys.argv[1] if len(sys.argv) > 1 else 'scores')
+    manifest = store.manifest()
+    print(f"{store.root}: {len(manifest['partitions'])} 个分区，{manifest['count']} 条，更新于 {manifest['update_time']}")
+    for key, entry in manifest['partitions'].items():
+        print(f"   {key:12} {entry['count']:>8} 条  {entry['sha256'][:12]}")
@@ -0,0 +1,68 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from .base import decode_static
+from .profiler import phase
+
+
+def decode_and_build(builder, raw, context):
+    """在工作进程中解析原始响应并构建记录，返回 (状态, 记录列表)"""
+    if raw is None:
+        return None, []
+
+    try:
+        data = decode_static(*raw)
+    except ValueError:
+        return None, []
+
+    if data == 'no_data':
+        return 'no_data', []
+    if not isinstance(data, dict):
+        return None, []
+    with phase('transform'):
+        return 'ok', builder(data, *context)
+
+
+class ParsePipeline:
+    """解析流水线：抓取线程只负责网络I/O，JSON解析与记录构建交给进程池
+
+    workers=0 时在当前进程内同步解析（与原先行为一致）。
+    builder 必须是模块级函数，以便传给子进程。
+    """
+
+    def __init__(self, builder, workers=None):
+        if workers is None:
+            workers = int(os.getenv('PARSE_WORKERS', '0'))
+        self.builder = builder
+        self.workers = max(int(workers), 0)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers else None
+
+    def submit(self, raw, *context):
+        """提交一个原始响应 (状态码, 原始字节)，返回 Future，结果为 (状态, 记录列表)"""
+        if self._executor:
+            return self._executor.submit(decode_and_build, self.builder, raw, context)
+
+        future = Future()
+        future.set_result(decode_and_build(self.builder, raw, context))
+        return future
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def peek(raw):
+    """在当前进程中解析原始响应（用于首次结构展示等），失败返回None"""
+    if raw is None:
+        return None
+
+    try:
+        return decode_static(*raw)
+    except ValueError:
+        return None
@@ -0,0 +1,354 @@
+"""运行前估算（dry run）：请求数、下载量、耗时和建议分片数
+
+    python -m crawlers scores --dry-run --sample 9999
+    python -m crawlers plans --dry-run --years 2020-2025 --concurrency 8
+
+按与爬虫相同的方式列出本次运行会发出的请求（学校列表、年份、省份发现、分片），
+减去已知无数据（省份发现排除的省份、一分一段表已知没有的科类）和归档中可回放（--cache / --resume）的请求，
+再用 data/state/throughput.json（见 crawlers.throughput）记录的平均请求耗时、响应大小、404 比例和限流倍数，
+加上各爬虫固定的限速间隔，估算网络请求数、下载量和墙钟时间。
+
+按学校分片的爬虫（scores / plans / school-scores）还会给出在作业时限内完成所需的最少分片数
+（PLAN_BUDGET_MINUTES，默认 330 分钟；GitHub Actions 单个作业上限 360 分钟）。
+"""
+import math
+import os
+from .archive import request_key
+from .throughput import ThroughputLog, kind_of
+
+DEFAULT_LATENCY = 0.5   # 没有历史记录的接口，每个请求按此秒数估计
+MAX_SHARDS = 256        # GitHub Actions matrix 的作业数上限
+
+
+def sleep_mean(delay, factor=1.0):
+    """polite_sleep(min, max) 的期望等待秒数（factor 为限流放大倍数）"""
+    return min((delay[0] + delay[1]) / 2 * factor, 20)
+
+
+def format_duration(seconds):
+    minutes = int(round(seconds / 60))
+    if minutes < 60:
+        return f"{minutes} 分" if minutes else f"{seconds:.0f} 秒"
+    return f"{minutes // 60} 小时 {minutes % 60} 分"
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+class CrawlPlan:
+    """一次运行的请求清单与耗时估算，耗时按分片单位（学校）累计，顺序与爬取顺序一致"""
+
+    def __init__(self, crawler, history=None):
+        self.crawler = crawler
+        self.history = history if history is not None else ThroughputLog().load()
+        sleep = self.history.get('sleep') or {}
+        self.throttle = sleep['seconds'] / sleep['nominal'] if sleep.get('nominal') else 1.0
+        self.concurrency = crawler.static_concurrency
+        self.units = {}       # 分片单位 -> 预计秒数
+        self.full = 0         # 不排除任何已知无数据单元时的请求数
+        self.skipped = 0      # 已知无数据，不会请求
+        self.cached = 0       # 归档中可回放或可复用已有结果
+        self.requests = 0     # 网络请求
+        self.bytes = 0.0
+        self.kinds = {}       # 接口类别 -> 网络请求数
+        self.unknown = set()  # 没有历史记录的接口类别
+        self.notes = []
+
+    def stats(self, kind):
+        """某类接口的 (平均耗时, 平均字节, 404 比例)"""
+        entry = self.history['kinds'].get(kind)
+        if not entry or not entry['requests']:
+            self.unknown.add(kind)
+            return DEFAULT_LATENCY, 0.0, 0.0
+        count = entry['requests']
+        return entry['seconds'] / count, entry['bytes'] / count, entry['not_found'] / count
+
+    def replays(self, key):
+        archive = self.crawler.archive
+        return key is not None and archive is not None and archive.replays(key)
+
+    def add(self, unit, kind, keys, delay=(1.5, 3.0), batched=False, sleep_on_404=True):
+        """计入一组请求（keys 为归档键，None 表示事先不知道具体请求）
+
+        batched=True 对应 prefetch_static：并发预取、整组只限速一次；否则逐个请求并逐个限速，
+        sleep_on_404=False 表示爬虫遇到 404 时跳过这次限速。
+        """
+        live = [key for key in keys if not self.replays(key)]
+        self.full += len(keys)
+        self.cached += len(keys) - len(live)
+        self.units.setdefault(unit, 0.0)
+        if not live:
+            return
+
+        self.requests += len(live)
+        self.kinds[kind] = self.kinds.get(kind, 0) + len(live)
+        latency, size, not_found = self.stats(kind)
+        self.bytes += size * len(live)
+
+        wait = sleep_mean(delay, self.throttle)
+        if batched and self.concurrency > 1 and len(live) >= 2:
+            seconds = math.ceil(len(live) / self.concurrency) * latency + wait
+        else:
+            seconds = len(live) * (latency + wait * (1 if sleep_on_404 else 1 - not_found))
+        self.units[unit] += seconds
+
+    def skip(self, count):
+        """已知无数据、爬虫不会请求的单元"""
+        self.full += count
+        self.skipped += count
+
+    def reuse(self, count):
+        """可直接复用已有结果、不必请求的单元（如未过期的专业详情）"""
+        self.full += count
+        self.cached += count
+
+    def pause(self, unit, delay):
+        """两组请求之间的固定限速（如学校之间）"""
+        self.units[unit] = self.units.get(unit, 0.0) + sleep_mean(delay, self.throttle)
+
+    @property
+    def seconds(self):
+        return sum(self.units.values())
+
+    def shard_seconds(self, count):
+        """按 load_school_ids 的轮转方式（第 i 片取 school_ids[i-1::count]）分成 count 片后各片的耗时"""
+        costs = list(self.units.values())
+        return [sum(costs[i::count]) for i in range(count)]
+
+    def recommend_shards(self, budget):
+        """使每片耗时都不超过 budget 秒的最少分片数"""
+        limit = max(min(len(self.units), MAX_SHARDS), 1)
+        for count in range(1, limit + 1):
+            if max(self.shard_seconds(count), default=0) <= budget:
+                return count
+        return limit
+
+    def report(self, title, sharded=False):
+        """打印估算结果，返回汇总字典"""
+        budget = float(os.getenv('PLAN_BUDGET_MINUTES', '330')) * 60
+        history = sum(e['requests'] for e in self.history['kinds'].values())
+        shards = self.recommend_shards(budget) if sharded else None
+
+        print(f"\n{'='*60}")
+        print(f"运行估算（dry run）: {title}")
+        print(f"{'='*60}")
+        print(f"   请求单元: {self.full} 个")
+        print(f"   已知无数据: {self.skipped} 个（不会请求）")
+        print(f"   已缓存: {self.cached} 个（归档回放或复用已有结果）")
+        print(f"   网络请求: {self.requests} 个" + (f"（{', '.join(f'{k} {n}' for k, n in self.kinds.items())}）" if self.kinds else ''))
+        print(f"   预计下载: {format_bytes(self.bytes)}")
+        print(f"   预计耗时: {format_duration(self.seconds)}（并发 {self.concurrency}，限流倍数 {self.throttle:.2f}，依据 {history:.0f} 次历史请求）")
+        if self.unknown:
+            print(f"   ⚠️  没有历史记录的接口: {', '.join(sorted(self.unknown))}（每个请求按 {DEFAULT_LATENCY} 秒估计，下载量未计入）")
+        for note in self.notes:
+            print(f"   ⚠️  {note}")
+        if sharded:
+            if self.crawler.shard:
+                print(f"   ⚠️  已按 CRAWL_SHARD 只估算第 {self.crawler.shard[0]}/{self.crawler.shard[1]} 片，建议分片数是对这一片再细分")
+            print(f"   建议分片: {shards}（每片最多 {format_duration(max(self.shard_seconds(shards), default=0))}，作业时限 {format_duration(budget)}）")
+        print(f"{'='*60}\n")
+
+        summary = {'requests': self.requests, 'bytes': int(self.bytes), 'minutes': math.ceil(self.seconds / 60)}
+        if sharded:
+            summary['shards'] = shards
+        # 在 GitHub Actions 中可作为步骤输出，供后续作业决定分片矩阵
+        if os.getenv('GITHUB_OUTPUT'):
+            with open(os.getenv('GITHUB_OUTPUT'), 'a', encoding='utf-8') as f:
+                for key, value in summary.items():
+                    f.write(f"{key}={value}\n")
+        return summary
+
+
+def plan_school_years(crawler, url_of, years=None, province_ids=None):
+    """scores / plans：学校 × 年份 × 省份，省份发现排除已知不招生的省份，每年的各省文件并发预取"""
+    from .discovery import ProvinceDiscovery, info_url
+
+    plan = CrawlPlan(crawler)
+    years = crawler.resolve_years(years)
+    province_ids = province_ids or list(crawler.province_dict.keys())
+    school_ids = crawler.load_school_ids(int(os.getenv('SAMPLE_SCHOOLS', '3')))
+    discovery = ProvinceDiscovery(crawler, province_ids)
+    kind = kind_of(url_of(0, years[0], province_ids[0]))
+
+    probes = 0
+    for idx, school_id in enumerate(school_ids, 1):
+        provinces, probe = discovery.plan(school_id)
+        if probe:
+            probes += 1
+            plan.add(school_id, kind_of(info_url(school_id)), [request_key('GET', info_url(school_id))])
+        for year in years:
+            plan.skip(len(province_ids) - len(provinces))
+            plan.add(school_id, kind, [request_key('GET', url_of(school_id, year, p)) for p in provinces],
+                     batched=True, sleep_on_404=False)
+        if idx < len(school_ids):
+            plan.pause(school_id, (4.0, 7.0))
+
+    if probes:
+        plan.notes.append(f"{probes} 所学校的招生省份未知，需要预探测，按全部省份估计（上限）")
+    return plan
+
+
+def plan_scores(crawler, args):
+    from .scores import score_url
+    return plan_school_years(crawler, score_url, args.years, args.provinces)
+
+
+def plan_plans(crawler, args):
+    from .plans import plan_url
+    return plan_school_years(crawler, plan_url, args.years, args.provinces)
+
+
+def plan_watch(crawler, args):
+    """watch：每轮按优先级检查最多 max_requests 个当年文件（条件请求，不回放归档）"""
+    from datetime import datetime
+    from .discovery import ProvinceDiscovery
+    from .scores import score_url
+
+    plan = CrawlPlan(crawler)
+    year = str(args.year or os.getenv('WATCH_YEAR') or datetime.now().year)
+    cycles = int(args.cycles if args.cycles is not None else os.getenv('WATCH_CYCLES', '1'))
+    interval = float(args.interval if args.interval is not None else os.getenv('WATCH_INTERVAL', '600'))
+    max_requests = int(args.max_requests if args.max_requests is not None else os.getenv('WATCH_MAX_REQUESTS', '300'))
+    province_ids = args.provinces or list(crawler.province_dict.keys())
+    school_ids = crawler.load_school_ids(int(os.getenv('SAMPLE_SCHOOLS', '999999')))
+
+    discovery = ProvinceDiscovery(crawler, province_ids)
+    units = sum(len(discovery.plan(sid)[0]) for sid in school_ids)
+    kind = kind_of(score_url(0, year, province_ids[0]))
+    plan.skip(len(school_ids) * len(province_ids) - units)
+    for cycle in range(1, cycles + 1):
+        plan.add(cycle, kind, [None] * min(units, max_requests))
+        if cycle < cycles:
+            plan.units[cycle] += interval
+    if units > max_requests:
+        plan.notes.append(f"每轮最多 {max_requests} 个请求，{units} 个文件需 {math.ceil(units / max_requests)} 轮才能全部检查一遍")
+    return plan
+
+
+def plan_school_scores(crawler, args):
+    """school-scores：每所学校一个 info.json"""
+    from .discovery import info_url
+
+    plan = CrawlPlan(crawler)
+    for school_id in crawler.load_school_ids(int(os.getenv('SAMPLE_SCHOOLS', '999999'))):
+        plan.add(school_id, kind_of(info_url(school_id)), [request_key('GET', info_url(school_id))],
+                 delay=(2.0, 4.0), sleep_on_404=False)
+    return plan
+
+
+def plan_sections(crawler, args):
+    """sections：年份 × 省份 × 科类，已有 sections.json 中省份的科类可预知需要请求哪些表"""
+    from .sections import TYPE_ORDER, known_types, preferred_types, section_url
+
+    plan = CrawlPlan(crawler)
+    years = crawler.resolve_years(args.years)
+    province_ids = args.provinces or list(crawler.province_dict.keys())
+    known = known_types(crawler.read_output('sections.json'))
+
+    unknown = 0
+    for year in years:
+        for province_id in province_ids:
+            # 与 SectionCrawler.crawl_province_year 相同：科类已知时只请求这些表（假设仍然都有）；
+            # 未知时最多五种都要请求（上限）
+            requested = list(preferred_types(known, year, province_id))
+            if not requested:
+                unknown += 1
+                requested = list(TYPE_ORDER)
+            plan.skip(len(TYPE_ORDER) - len(requested))
+            plan.add((year, province_id), kind_of(section_url(year, province_id, TYPE_ORDER[0])),
+                     [request_key('GET', section_url(year, province_id, t)) for t in requested])
+
+    if unknown:
+        plan.notes.append(f"{unknown} 个 年份/省份 的科类未知，按尝试全部 {len(TYPE_ORDER)} 种表估计（上限）")
+    return plan
+
+
+def plan_schools(crawler, args):
+    """schools：列表页 + 需要（重新）验证详情的学校，页数按已有 schools.json 的学校数推算
+
+    列表字段是否变化要等取到列表页才知道，这里假设都未变化：只有轮到重新验证的和新学校会请求详情。
+    """
+    from .discovery import info_url
+    from .schema import SCHOOL_DETAIL_FIELDS
+    from .schools import SchoolDetailState
+
+    plan = CrawlPlan(crawler)
+    max_pages = args.max_pages or int(os.getenv('MAX_PAGES', '10'))
+    fetch_complete_info = os.getenv('FETCH_COMPLETE_INFO', str(not args.no_detail)).lower() == 'true'
+    fetch_complete_info = fetch_complete_info and crawler.projection.wants_any(SCHOOL_DETAIL_FIELDS)
+
+    existing = [s.get('school_id') for s in crawler.read_output('schools.json')]
+    state = SchoolDetailState()
+    # 遇到空页才停止：已有 N 所学校时通常请求 N//20 + 1 页
+    pages = min(max_pages, len(existing) // 20 + 1) if existing else max_pages
+    for page in range(1, pages + 1):
+        plan.add('list', kind_of(crawler.base_url, crawler.list_payload(page)),
+                 [request_key('POST', crawler.base_url, crawler.list_payload(page))], delay=(3.0, 6.0))
+        if fetch_complete_info:
+            ids = existing[(page - 1) * 20:page * 20] if existing else [None] * 20
+            fetch = [id for id in ids if id is None or str(id) not in state.schools or state.revalidate(id)]
+            plan.reuse(len(ids) - len(fetch))
+            plan.add('list', kind_of(info_url(0)), [id and request_key('GET', info_url(id)) for id in fetch],
+                     delay=(2.0, 4.0))
+
+    if not existing:
+        plan.notes.append(f"没有已有的 schools.json，按 {max_pages} 页满页估计（上限）")
+    return plan
+
+
+def plan_majors(crawler, args):
+    """majors：列表页（每页30个）+ 需要更新的专业详情（按批并发预取）"""
+    from .majors import MajorDetailState, major_detail_url
+    from .schema import MAJOR_DETAIL_FIELDS
+
+    plan = CrawlPlan(crawler)
+    fetch_details = args.details or args.details_only or os.getenv('MAJOR_DETAILS', 'false').lower() == 'true'
+    fetch_details = fetch_details and crawler.projection.wants_any(MAJOR_DETAIL_FIELDS)
+
+    existing = [m.get('special_id') for m in crawler.read_output('majors.json')]
+    if not args.details_only:
+        pages = min(200, len(existing) // 30 + 1) if existing else 200
+        for page in range(1, pages + 1):
+            plan.add('list', kind_of(crawler.base_url, crawler.list_payload(page)),
+                     [request_key('POST', crawler.base_url, crawler.list_payload(page))], delay=(3.0, 6.0))
+        if not existing:
+            plan.notes.append("没有已有的 majors.json，按最多 200 页估计（上限）")
+
+    if fetch_details:
+        pending = MajorDetailState().pending(str(s) for s in existing if s)
+        plan.reuse(len(set(str(s) for s in existing if s)) - len(pending))
+        batch_size = crawler.detail_batch_size()
+        for start in range(0, len(pending), batch_size):
+            plan.add('details', kind_of(major_detail_url(0)),
+                     [request_key('GET', major_detail_url(s)) for s in pending[start:start + batch_size]], batched=True)
+        if not existing:
+            plan.notes.append("没有已有的 majors.json，无法估算专业详情请求")
+    return plan
+
+
+# 命令 -> (爬虫, 估算函数, 是否按学校分片)
+PLANNERS = {
+    'schools': ('crawlers.schools:SchoolCrawler', plan_schools, False),
+    'majors': ('crawlers.majors:MajorCrawler', plan_majors, False),
+    'scores': ('crawlers.scores:ScoreCrawler', plan_scores, True),
+    'watch': ('crawlers.scores:ScoreCrawler', plan_watch, False),
+    'plans': ('crawlers.plans:PlanCrawler', plan_plans, True),
+    'school-scores': ('crawlers.school_scores:SchoolScoreCrawler', plan_school_scores, True),
+    'sections': ('crawlers.sections:SectionCrawler', plan_sections, False),
+}
+
+
+def run_plan(args):
+    """--dry-run：按命令行参数（years / provinces 已解析为列表）估算本次运行，不发出任何请求"""
+    import importlib
+
+    target, planner, sharded = PLANNERS[args.command]
+    module, name = target.split(':')
+    crawler = getattr(importlib.import_module(module), name)()
+    plan = planner(crawler, args)
+    return plan.report(args.command, sharded=sharded)
@@ -1,10 +1,77 @@
 import time
-import json
 import os
 from .base import BaseCrawler
+from .pipeline import ParsePipeline, peek
+from .views import plan_views
+from .profiler import parse_profile_args, profile_run
+from .discovery import ProvinceDiscovery
+from .deadline import crawl_with_deadline, deadline_minutes
+
+def build_plan_records(data, school_id, year, province_id, province_name, fields=None):
+    """将单个响应的 data 转换为记录列表（模块级函数，可在解析子进程中执行）
+    
+    fields 为字段投影（见 schema.Projection），None 表示保留全部字段。
+    """
+    records = []
+    
+    # 遍历所有招生类型（普通类、中外合作等）
+    for plan_type, plan_info in data.items():
+        if not isinstance(plan_info, dict):
+            continue
+        
+        items = plan_info.get('item', [])
+        
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            
+            plan_record = {
+                # 基础标识
+                'school_id': school_id,
+                'year': year,
+                'province_id': province_id,
+                'province': province_name,
+
+                # 招生类型
+                'plan_type': plan_type,  # 普通类、中外合作等
+                'batch': item.get('local_batch_name'),  # 招生批次
+                'type': item.get('type'),  # 科类
+
+                # 专业信息
+                'major': item.get('sp_name') or item.get('spname'),
+                'major_code': item.get('spcode'),
+                'major_group': item.get('sg_name'),  # 专业组名称
+                'major_group_code': item.get('sg_code'),  # 专业组代码
+                'major_group_info': item.get('sg_info'),  # 专业组要求/选考科目
+
+                # 学科分类
+                'level1_name': item.get('level1_name'),
+                'level2_name': item.get('level2_name'),
+                'level3_name': item.get('level3_name'),
+
+                # 招生人数
+                'plan_number': item.get('num') or item.get('plan_num'),  # 计划招生人数
+
+                # 学制和学费
+                'years': item.get('length') or item.get('years'),  # 学制
+                'tuition': item.get('tuition'),  # 学费
+
+                # 其他信息
+                'note': item.get('note') or item.get('remark'),  # 备注
+            }
+            records.append(plan_record if fields is None else {f: plan_record.get(f) for f in fields})
+    
+    return records
+
+
+def plan_url(school_id, year, province_id):
+    return f"https://static-data.gaokao.cn/www/2.0/schoolspecialplan/{school_id}/{year}/{province_id}.json"
+
 
 class PlanCrawler(BaseCrawler):
     
+    dataset = 'plans'
+    
     def __init__(self):
         super().__init__()
         self._first_logged = False
@@ -62,25 +129,23 @@ class PlanCrawler(BaseCrawler):
             '82': '澳门',
         }
     
-    def get_plan_data(self, school_id, year, province_id):
-        """获取指定学校、年份、省份的招生计划数据"""
-        url = f"https://static-data.gaokao.cn/www/2.0/schoolspecialplan/{school_id}/{year}/{province_id}.json"
+    def get_plan_raw(self, school_id, year, province_id):
+        """获取招生计划原始响应 (状态码, 原始字节)，请求异常返回None"""
+        url = plan_url(school_id, year, province_id)
         
         try:
-            response = self.session.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('code') == '0000' and 'data' in result:
-                    return result['data']
-            elif response.status_code == 404:
-                return 'no_data'  # 该省份无招生
+            return self.fetch_static(url)
         except Exception as e:
             # 静默处理异常，避免过多日志
             pass
         
         return None
     
+    def get_plan_data(self, school_id, year, province_id):
+        """获取指定学校、年份、省份的招生计划数据"""
+        raw = self.get_plan_raw(school_id, year, province_id)
+        return peek(raw)
+    
     def parse_years(self, years_input):
         """解析年份参数，支持多种格式"""
         if isinstance(years_input, list):
@@ -97,195 +162,156 @@ class PlanCrawler(BaseCrawler):
         
         return years_input
     
-    def crawl(self, school_ids=None, years=None, province_ids=None):
-        """爬取招生计划数据"""
-        # 年份控制优先级：
-        # 1. 函数参数 years
-        # 2. 环境变量 PLAN_YEARS
-        # 3. 默认值 ["2025", "2024", "2023"]
+    def resolve_years(self, years=None):
+        """本次爬取的年份
+        
+        优先级：
+        1. 函数参数 years
+        2. 环境变量 PLAN_YEARS
+        3. 默认值 ["2025", "2024", "2023"]
+        """
         if years is None:
-            years_env = os.getenv('PLAN_YEARS', '2025,2024,2023')
-            years = self.parse_years(years_env)
-        else:
-            years = self.parse_years(years)
+            return self.parse_years(os.getenv('PLAN_YEARS', '2025,2024,2023'))
+        return self.parse_years(years)
+    
+    def crawl(self, school_ids=None, years=None, province_ids=None, parse_workers=None, deadline=None):
+        """爬取招生计划数据"""
+        years = self.resolve_years(years)
         
         province_ids = province_ids or list(self.province_dict.keys())
         
         # 从schools.json读取学校ID
         if school_ids is None:
-            try:
-                with open('data/schools.json', 'r', encoding='utf-8') as f:
-                    schools_data = json.load(f)
-                    
-                    # 处理不同的数据结构
-                    if isinstance(schools_data, list):
-                        schools = schools_data
-                    elif isinstance(schools_data, dict):
-                        schools = schools_data.get('data', [])
-                        if not schools:
-                            schools = [schools_data]
-                    else:
-                        print(f"⚠️  schools.json 数据格式错误: {type(schools_data)}")
-                        return []
-                    
-                    sample_count = int(os.getenv('SAMPLE_SCHOOLS', '3'))
-                    school_ids = [s['school_id'] for s in schools[:sample_count] if isinstance(s, dict) and s.get('school_id')]
-                    
-                    if not school_ids:
-                        print("⚠️  未找到有效的学校ID")
-                        return []
-                    
-                    print(f"从 schools.json 读取到 {len(school_ids)} 所学校")
-                    
-            except FileNotFoundError:
-                print("⚠️  未找到 schools.json，请先运行学校爬虫")
-                return []
-            except Exception as e:
-                print(f"⚠️  读取 schools.json 失败: {e}")
-                import traceback
-                traceback.print_exc()
+            school_ids = self.load_school_ids(int(os.getenv('SAMPLE_SCHOOLS', '3')))
+            if not school_ids:
+                print("⚠️  未找到有效的学校ID")
                 return []
+            print(f"从 schools.json 读取到 {len(school_ids)} 所学校")
+        
+        # 截止时间模式（deadline 或 CRAWL_DEADLINE，分钟）：按价值顺序爬取，到时保存进度和已完成的部分
+        deadline = deadline_minutes(deadline)
+        if deadline:
+            return crawl_with_deadline(self, deadline, plan_url, build_plan_records, 'plans.json', plan_views,
+                                       school_ids, years, province_ids, parse_workers)
         
         all_plans = []
         
         print(f"\n{'='*60}")
         print(f"开始爬取招生计划")
-        print(f"学校数: {len(school_ids)} | 年份: {', '.join(years)} | 省份: {len(province_ids)} 个")
+        print(f"学校数: {len(school_ids)} | 年份: {', '.join(years)} | 省份: {len(province_ids)} 个 | 字段: {self.projection.describe()}")
         print(f"{'='*60}\n")
         
-        for idx, school_id in enumerate(school_ids, 1):
-            school_plan_count = 0
+        # 只请求各学校实际招生的省份
+        discovery = ProvinceDiscovery(self, province_ids)
+        
+        with ParsePipeline(build_plan_records, workers=parse_workers) as pipeline:
+            for idx, school_id in enumerate(school_ids, 1):
+                school_plan_count = 0
             
-            print(f"\n[{idx}/{len(school_ids)}] 学校ID: {school_id}")
+                school_provinces, reason = discovery.provinces_for(school_id)
+                print(f"\n[{idx}/{len(school_ids)}] 学校ID: {school_id}（{reason}）")
             
-            for year in years:
-                year_count = 0
+                for year in years:
+                    year_count = 0
+                    pending = []
                 
-                for province_id in province_ids:
-                    province_name = self.province_dict.get(province_id, f'省份{province_id}')
+                    # 并发预取本年度各省份文件（STATIC_CONCURRENCY > 1 时），逐个处理时不再单独限速
+                    prefetched = self.prefetch_static([plan_url(school_id, year, p) for p in school_provinces])
+                
+                    for province_id in school_provinces:
+                        province_name = self.province_dict.get(province_id, f'省份{province_id}')
                     
-                    # 只在第一所学校第一个年份第一个省份显示详细日志
-                    show_detail = (idx == 1 and year == years[0] and province_id == province_ids[0])
+                        # 只在第一所学校第一个年份第一个省份显示详细日志
+                        show_detail = (idx == 1 and year == years[0] and province_id == school_provinces[0])
                     
-                    if show_detail:
-                        print(f"\n   📡 [招生计划接口] school_id={school_id}, year={year}, province={province_name}")
-                        print(f"      URL: https://static-data.gaokao.cn/www/2.0/schoolspecialplan/{school_id}/{year}/{province_id}.json")
+                        if show_detail:
+                            print(f"\n   📡 [招生计划接口] school_id={school_id}, year={year}, province={province_name}")
+                            print(f"      URL: https://static-data.gaokao.cn/www/2.0/schoolspecialplan/{school_id}/{year}/{province_id}.json")
                     
-                    data = self.get_plan_data(school_id, year, province_id)
+                        raw = self.get_plan_raw(school_id, year, province_id)
                     
-                    # 首次显示响应结构
-                    if not self._first_logged and data and data != 'no_data':
-                        print(f"\n      {'─'*50}")
-                        print(f"      首次响应数据结构:")
-                        print(f"      {'─'*50}")
-                        print(f"      data类型: {type(data).__name__}")
+                        # 首次显示响应结构（仅此一次在主进程中解析）
+                        data = peek(raw) if not self._first_logged else None
+                        if not self._first_logged and data and data != 'no_data':
+                            print(f"\n      {'─'*50}")
+                            print(f"      首次响应数据结构:")
+                            print(f"      {'─'*50}")
+                            print(f"      data类型: {type(data).__name__}")
                         
-                        if isinstance(data, dict):
-                            print(f"      data包含键: {list(data.keys())}")
+                            if isinstance(data, dict):
+                                print(f"      data包含键: {list(data.keys())}")
                             
-                            # 查找第一个有数据的类型
-                            sample_item = None
-                            for plan_type, plan_info in data.items():
-                                if isinstance(plan_info, dict):
-                                    items = plan_info.get('item', [])
-                                    if items:
-                                        sample_item = items[0]
-                                        print(f"      招生类型: {plan_type}")
-                                        print(f"      该类型数据条数: {len(items)}")
-                                        break
+                                # 查找第一个有数据的类型
+                                sample_item = None
+                                for plan_type, plan_info in data.items():
+                                    if isinstance(plan_info, dict):
+                                        items = plan_info.get('item', [])
+                                        if items:
+                                            sample_item = items[0]
+                                            print(f"      招生类型: {plan_type}")
+                                            print(f"      该类型数据条数: {len(items)}")
+                                            break
                             
-                            if sample_item and isinstance(sample_item, dict):
-                                fields = list(sample_item.keys())
-                                print(f"\n      招生计划数据字段({len(fields)}个):")
-                                print(f"      {'─'*50}")
-                                for i, field in enumerate(fields, 1):
-                                    value = sample_item[field]
-                                    value_type = type(value).__name__
-                                    # 显示值的预览
-                                    if value is None:
-                                        preview = "None"
-                                    elif isinstance(value, str):
-                                        preview = f'"{value[:25]}..."' if len(value) > 25 else f'"{value}"'
-                                    elif isinstance(value, (list, dict)):
-                                        preview = f"{value_type}({len(value)}项)"
-                                    else:
-                                        preview = str(value)
-                                    print(f"      {i:2}. {field:25} = {preview}")
-                                print(f"      {'─'*50}\n")
+                                if sample_item and isinstance(sample_item, dict):
+                                    fields = list(sample_item.keys())
+                                    print(f"\n      招生计划数据字段({len(fields)}个):")
+                                    print(f"      {'─'*50}")
+                                    for i, field in enumerate(fields, 1):
+                                        value = sample_item[field]
+                                        value_type = type(value).__name__
+                                        # 显示值的预览
+                                        if value is None:
+                                            preview = "None"
+                                        elif isinstance(value, str):
+                                            preview = f'"{value[:25]}..."' if len(value) > 25 else f'"{value}"'
+                                        elif isinstance(value, (list, dict)):
+                                            preview = f"{value_type}({len(value)}项)"
+                                        else:
+                                            preview = str(value)
+                                        print(f"      {i:2}. {field:25} = {preview}")
+                                    print(f"      {'─'*50}\n")
                         
-                        self._first_logged = True
+                            self._first_logged = True
                     
-                    # 处理数据
-                    if data == 'no_data':
-                        continue
-                    elif data and isinstance(data, dict):
-                        for plan_type, plan_info in data.items():
-                            if not isinstance(plan_info, dict):
-                                continue
-                                
-                            items = plan_info.get('item', [])
-                            
-                            for item in items:
-                                if not isinstance(item, dict):
-                                    continue
-                                    
-                                plan_record = {
-                                    # 基础标识
-                                    'school_id': school_id,
-                                    'year': year,
-                                    'province_id': province_id,
-                                    'province': province_name,
-                                    
-                                    # 招生类型
-                                    'plan_type': plan_type,  # 普通类、中外合作等
-                                    'batch': item.get('local_batch_name'),  # 招生批次
-                                    'type': item.get('type'),  # 科类
-                                    
-                                    # 专业信息
-                                    'major': item.get('sp_name') or item.get('spname'),
-                                    'major_code': item.get('spcode'),
-                                    'major_group': item.get('sg_name'),  # 专业组名称
-                                    'major_group_code': item.get('sg_code'),  # 专业组代码
-                                    'major_group_info': item.get('sg_info'),  # 专业组要求/选考科目
-                                    
-                                    # 学科分类
-                                    'level1_name': item.get('level1_name'),
-                                    'level2_name': item.get('level2_name'),
-                                    'level3_name': item.get('level3_name'),
-                                    
-                                    # 招生人数
-                                    'plan_number': item.get('num') or item.get('plan_num'),  # 计划招生人数
-                                    
-                                    # 学制和学费
-                                    'years': item.get('length') or item.get('years'),  # 学制
-                                    'tuition': item.get('tuition'),  # 学费
-                                    
-                                    # 其他信息
-                                    'note': item.get('note') or item.get('remark'),  # 备注
-                                }
-                                all_plans.append(plan_record)
-                                year_count += 1
-                                school_plan_count += 1
+                        # 404 表示该省份无招生，不记录
+                        if raw is not None and raw[0] == 404:
+                            continue
+                    
+                        # 交给解析流水线（可能在子进程中解析）
+                        pending.append((province_id, pipeline.submit(raw, school_id, year, province_id, province_name, self.projection.fields)))
                     
-                    if show_detail:
-                        print(f"      ✓ {province_name}: 获取数据")
+                        if show_detail:
+                            print(f"      ✓ {province_name}: 获取数据")
                     
-                    self.polite_sleep(1.5, 3.0)
+                        if not prefetched:
+                            self.polite_sleep(1.5, 3.0)
                 
-                if year_count > 0:
-                    print(f"   ✓ {year}年: 获取 {year_count} 条招生计划")
-                else:
-                    print(f"   ⚠️  {year}年: 无招生计划数据")
+                    # 收集本年度的解析结果（抓取期间已在后台解析）
+                    for province_id, future in pending:
+                        _, records = future.result()
+                        if records:
+                            discovery.observe(school_id, province_id)
+                        all_plans.extend(records)
+                        year_count += len(records)
+                        school_plan_count += len(records)
+                    
+                    if year_count > 0:
+                        print(f"   ✓ {year}年: 获取 {year_count} 条招生计划")
+                    else:
+                        print(f"   ⚠️  {year}年: 无招生计划数据")
             
-            if school_plan_count > 0:
-                print(f"   ✅ 学校ID {school_id}：共 {school_plan_count} 条招生计划")
-            else:
-                print(f"   ⚠️  学校ID {school_id}：无招生计划数据")
+                if school_plan_count > 0:
+                    print(f"   ✅ 学校ID {school_id}：共 {school_plan_count} 条招生计划")
+                else:
+                    print(f"   ⚠️  学校ID {school_id}：无招生计划数据")
             
-            if idx < len(school_ids):
-                self.polite_sleep(4.0, 7.0)
+                if idx < len(school_ids):
+                    self.polite_sleep(4.0, 7.0)
         
-        self.save_to_json(all_plans, 'plans.json')
+        discovery.save()
+        self.save_records(all_plans, 'plans.json')
+        views = plan_views(all_plans)
+        self.save_views(views)
         
         print(f"\n{'='*60}")
         print(f"✅ 招生计划爬取完成！")
@@ -302,8 +328,11 @@ class PlanCrawler(BaseCrawler):
                 year_counts[y] = year_counts.get(y, 0) + 1
             print(f"   年份分布: {dict(sorted(year_counts.items(), reverse=True))}")
             # 统计总招生人数
-            total_enrollment = sum(int(p.get('plan_number', 0) or 0) for p in all_plans if p.get('plan_number'))
+            total_enrollment = sum(row['plan_total'] for row in views['plan_total_by_school'])
             print(f"   总招生人数: {total_enrollment}")
+        discovery.summary(len(years))
+        if self.failed_urls:
+            print(f"   ⚠️  重试后仍失败的请求: {len(self.failed_urls)} 个（数据可能不完整）")
         print(f"{'='*60}\n")
         
         return all_plans
@@ -311,8 +340,10 @@ class PlanCrawler(BaseCrawler):
 if __name__ == "__main__":
     import sys
     
-    # 支持命令行参数
-    years_arg = sys.argv[1] if len(sys.argv) > 1 else None
+    # 支持命令行参数（以及 --profile / --profile-stats=PATH / --profile-stacks=PATH）
+    argv, profile_options = parse_profile_args(sys.argv[1:])
+    years_arg = argv[0] if len(argv) > 0 else None
     
     crawler = PlanCrawler()
-    crawler.crawl(years=years_arg)
+    with profile_run(profile_options):
+        crawler.crawl(years=years_arg)
@@ -0,0 +1,183 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# 各阶段的显示名称（按报告顺序）
+PHASES = {
+    'fetch': '网络请求',
+    'sleep': '限速等待',
+    'decode': 'JSON解析',
+    'transform': '记录构建',
+    'serialize': '序列化写盘',
+}
+
+
+class PhaseProfiler:
+    """按阶段统计墙钟时间和CPU时间
+
+    阶段可以嵌套，统计的是“自身时间”：例如 fetch 内部的重试等待计入 sleep，
+    不会在 fetch 中重复计算。未启用时 phase() 返回空上下文，开销可以忽略。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.wall = {}
+        self.cpu = {}
+        self.calls = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._null = nullcontext()
+
+    def reset(self):
+        self.wall, self.cpu, self.calls = {}, {}, {}
+
+    def phase(self, name):
+        if not self.enabled:
+            return self._null
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        # [子阶段墙钟时间, 子阶段CPU时间]
+        frame = [0.0, 0.0]
+        stack.append(frame)
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall0
+            cpu = time.thread_time() - cpu0
+            stack.pop()
+            if stack:
+                stack[-1][0] += wall
+                stack[-1][1] += cpu
+
+            with self._lock:
+                self.wall[name] = self.wall.get(name, 0.0) + wall - frame[0]
+                self.cpu[name] = self.cpu.get(name, 0.0) + cpu - frame[1]
+                self.calls[name] = self.calls.get(name, 0) + 1
+
+    def report(self, total_wall, total_cpu):
+        """打印各阶段耗时汇总表"""
+        names = list(PHASES) + sorted(n for n in self.wall if n not in PHASES)
+        accounted_wall = sum(self.wall.values())
+        accounted_cpu = sum(self.cpu.values())
+
+        print(f"\n{'='*60}")
+        print(f"⏱️  阶段耗时分析")
+        print(f"{'─'*60}")
+        print(f"   {'阶段':12} {'次数':>8} {'墙钟(s)':>10} {'占比':>7} {'CPU(s)':>10}")
+        print(f"{'─'*60}")
+        rows = [(PHASES.get(n, n), self.calls.get(n, 0), self.wall.get(n, 0.0), self.cpu.get(n, 0.0)) for n in names]
+        rows.append(('其他', 0, max(total_wall - accounted_wall, 0.0), max(total_cpu - accounted_cpu, 0.0)))
+        for label, calls, wall, cpu in rows:
+            share = wall * 100 / total_wall if total_wall else 0
+            print(f"   {label:12} {calls:>8} {wall:>10.2f} {share:>6.1f}% {cpu:>10.2f}")
+        print(f"{'─'*60}")
+        print(f"   {'合计':12} {'':>8} {total_wall:>10.2f} {100.0:>6.1f}% {total_cpu:>10.2f}")
+        print(f"{'='*60}\n")
+
+
+class StackSampler(threading.Thread):
+    """定时采样目标线程的调用栈，输出 flamegraph.pl / speedscope 可读的折叠栈格式"""
+
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                key = ';'.join(reversed(names))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+profiler = PhaseProfiler()
+phase = profiler.phase
+
+
+def parse_profile_args(argv):
+    """从命令行参数中取出性能分析选项，返回 (其余参数, 选项)
+
+    --profile               打印阶段耗时汇总表
+    --profile-stats=PATH    同时用 cProfile 采集并保存 pstats 文件
+    --profile-stacks=PATH   同时采样调用栈并保存折叠栈文件（可生成火焰图）
+    """
+    rest = []
+    options = {}
+    for arg in argv:
+        if arg == '--profile':
+            options['enabled'] = True
+        elif arg.startswith('--profile-stats='):
+            options['enabled'] = True
+            options['stats'] = arg.split('=', 1)[1]
+        elif arg.startswith('--profile-stacks='):
+            options['enabled'] = True
+            options['stacks'] = arg.split('=', 1)[1]
+        else:
+            rest.append(arg)
+    return rest, options
+
+
+@contextmanager
+def profile_run(options):
+    """在性能分析模式下执行一次爬取，结束后打印汇总并保存分析文件"""
+    if not options.get('enabled'):
+        yield
+        return
+
+    profiler.reset()
+    profiler.enabled = True
+
+    cprofile = None
+    if options.get('stats'):
+        import cProfile
+        cprofile = cProfile.Profile()
+
+    sampler = None
+    if options.get('stacks'):
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    if cprofile:
+        cprofile.enable()
+    try:
+        yield
+    finally:
+        if cprofile:
+            cprofile.disable()
+        if sampler:
+            sampler.stop()
+        profiler.enabled = False
+
+        profiler.report(time.perf_counter() - wall0, time.process_time() - cpu0)
+        if cprofile:
+            cprofile.dump_stats(options['stats'])
+            print(f"✓ cProfile 统计已保存到 {options['stats']}")
+        if sampler:
+            sampler.dump(options['stacks'])
+            print(f"✓ 调用栈采样已保存到 {options['stacks']}")
@@ -0,0 +1,446 @@
+"""数据质量检查与规范化
+
+对输出文件（data/*.json 或 *.jsonl）做单次流式扫描，内存占用与文件大小无关：
+    - 数值字段统一转成 int/float，"-"、空串以及"未知时填0"的字段转成 None
+    - 科类代码按 TYPE_NAMES 查表，未知代码记为异常
+    - 记录级检查：最低分高于最高分、平均分不在区间内、分数/位次超出合理范围、缺少键字段等
+    - 每个字段统计：原始类型分布、空值数、被转换数、无法解析数、最小/最大/平均值
+"""
+import json
+import os
+import tempfile
+from .schema import KEY_FIELDS, SCHEMAS
+from .storage import atomic_open
+
+# 科类代码（2073/2074 为新高考"物理类/历史类"）
+TYPE_NAMES = {
+    '1': '理科',
+    '2': '文科',
+    '3': '综合',
+    '2073': '物理类',
+    '2074': '历史类',
+}
+
+NULL_TOKENS = ('', '-', '--', 'null', 'None')
+
+# 字段 -> (类型, 0是否表示未知, 合理下限, 合理上限)
+FIELD_RULES = {
+    'scores': {
+        'min_score': ('int', True, 1, 900),
+        'max_score': ('int', True, 1, 900),
+        'avg_score': ('float', True, 1, 900),
+        'min_rank': ('int', True, 1, None),
+        'proscore': ('int', True, 1, 900),
+        'enrollment': ('int', False, 0, None),
+        'equal_score': ('int', True, 1, 900),
+        'min_rank_est': ('int', True, 1, None),
+    },
+    'plans': {
+        'plan_number': ('int', False, 0, None),
+    },
+    'school_scores': {
+        'min_score': ('int', True, 1, 900),
+        'min_rank': ('int', True, 1, None),
+        'equal_score': ('int', True, 1, 900),
+        'min_rank_est': ('int', True, 1, None),
+    },
+    'sections': {
+        'max_score': ('int', True, 1, 900),
+        'min_score': ('int', True, 1, 900),
+        'total': ('int', False, 1, None),
+    },
+    'majors': {
+        'salary_avg': ('int', True, 1, None),
+        'salary_5year': ('int', True, 1, None),
+        'boy_rate': ('int', False, 0, 100),
+        'girl_rate': ('int', False, 0, 100),
+        'rank': ('int', True, 1, None),
+        'view_total': ('int', False, 0, None),
+        'view_month': ('int', False, 0, None),
+        'view_week': ('int', False, 0, None),
+        'employment_rate': ('float', True, 0, 100),
+        'offering_schools': ('int', True, 1, None),
+    },
+    'schools': {
+        'rank': ('int', True, 1, None),
+        # 接口编码为 1=是、2=否
+        'f985': ('int', True, 1, 2),
+        'f211': ('int', True, 1, 2),
+    },
+}
+
+# 使用科类代码的数据集
+TYPE_DATASETS = ('scores', 'plans', 'school_scores', 'sections')
+
+ANOMALY_LABELS = {
+    'not_numeric': '不是数值',
+    'out_of_range': '超出合理范围',
+    'unknown_type': '未知科类代码',
+    'min_gt_max': '最低分高于最高分',
+    'avg_out_of_range': '平均分不在最低/最高分之间',
+    'missing_key': '缺少键字段',
+    'bad_year': '年份异常',
+}
+
+
+def coerce_number(value, kind):
+    """返回 (新值, 状态)，状态为 ok / coerced / null / invalid"""
+    if value is None:
+        return None, 'null'
+    if isinstance(value, bool):
+        return int(value), 'coerced'
+    if isinstance(value, int):
+        return value, 'ok'
+    if isinstance(value, float):
+        if kind == 'int' and value.is_integer():
+            return int(value), 'coerced'
+        return value, 'ok'
+
+    text = str(value).strip()
+    if text in NULL_TOKENS:
+        return None, 'null'
+    try:
+        return int(text), 'coerced'
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+    except ValueError:
+        return None, 'invalid'
+    if number != number:  # NaN
+        return None, 'null'
+    return (int(number) if kind == 'int' and number.is_integer() else number), 'coerced'
+
+
+class FieldStats:
+    """单个字段的统计（常数内存）"""
+
+    __slots__ = ('present', 'nulls', 'coerced', 'invalid', 'types', 'min', 'max', 'total', 'numeric')
+
+    def __init__(self):
+        self.present = 0
+        self.nulls = 0
+        self.coerced = 0
+        self.invalid = 0
+        self.types = {}
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.numeric = 0
+
+    def add_number(self, value):
+        self.numeric += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def to_dict(self):
+        return {
+            'present': self.present,
+            'nulls': self.nulls,
+            'coerced': self.coerced,
+            'invalid': self.invalid,
+            'types': self.types,
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.total / self.numeric, 2) if self.numeric else None,
+        }
+
+
+class Validator:
+    """逐条规范化记录并累计统计；不保存记录本身"""
+
+    def __init__(self, dataset, max_examples=5):
+        self.dataset = dataset
+        self.rules = FIELD_RULES.get(dataset, {})
+        self.key_fields = KEY_FIELDS.get(dataset, ())
+        self.max_examples = max_examples
+        self.fields = {}
+        self.anomalies = {}
+        self.examples = {}
+        self.records = 0
+        self.flagged = 0
+
+    def _stats(self, field):
+        stats = self.fields.get(field)
+        if stats is None:
+            stats = self.fields[field] = FieldStats()
+        return stats
+
+    def normalize(self, record):
+        """返回 (规范化后的记录, 异常代码列表)"""
+        self.records += 1
+        flags = []
+        record = dict(record)
+
+        for field, value in record.items():
+            stats = self._stats(field)
+            stats.present += 1
+            type_name = type(value).__name__
+            stats.types[type_name] = stats.types.get(type_name, 0) + 1
+
+            rule = self.rules.get(field)
+            if rule is None:
+                if value is None or (isinstance(value, str) and value.strip() in NULL_TOKENS):
+                    stats.nulls += 1
+                continue
+
+            kind, zero_is_null, low, high = rule
+            number, status = coerce_number(value, kind)
+            if number == 0 and zero_is_null:
+                number, status = None, 'null'
+            if status == 'invalid':
+                stats.invalid += 1
+                flags.append(f'{field}:not_numeric')
+            if number is None:
+                stats.nulls += 1
+            else:
+                stats.add_number(number)
+                if (low is not None and number < low) or (high is not None and number > high):
+                    flags.append(f'{field}:out_of_range')
+            if number != value or type(number) is not type(value):
+                stats.coerced += 1
+            record[field] = number
+
+        if self.dataset in TYPE_DATASETS and record.get('type') is not None:
+            code = str(record['type'])
+            if code not in TYPE_NAMES:
+                flags.append('type:unknown_type')
+            if 'type_name' in record:
+                record['type_name'] = TYPE_NAMES.get(code)
+
+        flags.extend(self._check(record))
+
+        if flags:
+            self.flagged += 1
+            for code in flags:
+                self.anomalies[code] = self.anomalies.get(code, 0) + 1
+                examples = self.examples.setdefault(code, [])
+                if len(examples) < self.max_examples:
+                    examples.append(self.key_of(record))
+        return record, flags
+
+    def _check(self, record):
+        flags = []
+        missing = [f for f in self.key_fields if record.get(f) in (None, '')]
+        if missing:
+            flags.append(f"{','.join(missing)}:missing_key")
+
+        year = record.get('year')
+        if year is not None:
+            try:
+                if not 2000 <= int(year) <= 2100:
+                    flags.append('year:bad_year')
+            except (TypeError, ValueError):
+                flags.append('year:bad_year')
+
+        if self.dataset == 'scores':
+            low, high, avg = record.get('min_score'), record.get('max_score'), record.get('avg_score')
+            if low is not None and high is not None and low > high:
+                flags.append('min_score:min_gt_max')
+            if avg is not None and ((low is not None and avg < low) or (high is not None and avg > high)):
+                flags.append('avg_score:avg_out_of_range')
+        return flags
+
+    def key_of(self, record):
+        return {f: record.get(f) for f in self.key_fields + ('major',) if f in record}
+
+    def report(self):
+        return {
+            'dataset': self.dataset,
+            'records': self.records,
+            'flagged': self.flagged,
+            'fields': {f: s.to_dict() for f, s in self.fields.items()},
+            'anomalies': dict(sorted(self.anomalies.items(), key=lambda item: -item[1])),
+            'examples': self.examples,
+        }
+
+
+class RecordReader:
+    """流式读取 {update_time, count, data: [...]} 格式或 JSON Lines 文件中的记录
+
+    header 在开始迭代后可用（data 之前的键，如 update_time、count）。
+    """
+
+    def __init__(self, path, chunk_size=1 << 16):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.header = {}
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            if self.path.endswith('.jsonl'):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+                return
+
+            buf = ''
+            start = -1
+            while start < 0:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    raise ValueError(f"{self.path} 不是 {{update_time, count, data}} 格式的数据文件")
+                buf += chunk
+                key = buf.find('"data"')
+                if key >= 0:
+                    start = buf.find('[', key)
+            self.header = json.loads(buf[:key].rstrip().rstrip(',') + '}')
+
+            decoder = json.JSONDecoder()
+            pos = start + 1
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buf) and buf[pos] == ']':
+                    return
+                try:
+                    record, pos = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # 记录跨越了读取块的边界，补读后重试
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        raise
+                    buf = buf[pos:] + chunk
+                    pos = 0
+                    continue
+                yield record
+
+
+def dataset_of(path):
+    """根据路径推断数据集，如 data/scores.json、data/scores/2025/13.jsonl -> scores"""
+    parts = os.path.normpath(path).split(os.sep)
+    for part in reversed(parts):
+        name = part.split('.')[0]
+        if name in SCHEMAS:
+            return name
+    raise ValueError(f"无法从路径推断数据集: {path}（可选: {', '.join(SCHEMAS)}）")
+
+
+def check_file(src, dst=None, anomalies_path=None, dataset=None):
+    """扫描 src 并返回 Validator；给出 dst 时写出规范化后的数据（可与 src 相同），
+    给出 anomalies_path 时把每条异常记录的键字段和异常代码写成 JSON Lines
+    """
+    validator = Validator(dataset or dataset_of(src))
+    reader = RecordReader(src)
+
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as body, \
+            tempfile.TemporaryFile('w+', encoding='utf-8') as flagged:
+        count = 0
+        for record in reader:
+            record, flags = validator.normalize(record)
+            if flags and anomalies_path:
+                flagged.write(json.dumps({**validator.key_of(record), 'flags': flags}, ensure_ascii=False) + '\n')
+            if dst is None:
+                continue
+            if dst.endswith('.jsonl'):
+                body.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                # 与 save_to_json（indent=2）的排版保持一致
+                text = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+                body.write((',\n    ' if count else '\n    ') + text)
+            count += 1
+
+        if dst is not None:
+            body.seek(0)
+            with atomic_open(dst, 'w') as out:
+                if not dst.endswith('.jsonl'):
+                    header = {**reader.header, 'count': count}
+                    out.write('{\n')
+                    for k, v in header.items():
+                        out.write(f'  {json.dumps(k)}: {json.dumps(v, ensure_ascii=False)},\n')
+                    out.write('  "data": [')
+                _copy(body, out)
+                if not dst.endswith('.jsonl'):
+                    out.write('\n  ]\n}' if count else ']\n}')
+
+        if anomalies_path:
+            flagged.seek(0)
+            with atomic_open(anomalies_path, 'w') as out:
+                _copy(flagged, out)
+
+    return validator
+
+
+def _copy(src, dst, chunk_size=1 << 16):
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(chunk)
+
+
+def print_report(path, validator):
+    report = validator.report()
+    print(f"\n{'='*60}")
+    print(f"数据质量报告: {path}（{report['dataset']}）")
+    print(f"   记录数: {report['records']}，有异常: {report['flagged']} 条")
+    print(f"\n   {'字段':20} {'出现':>7} {'空值':>7} {'转换':>7} {'无法解析':>6} {'最小':>9} {'最大':>9} {'平均':>9}  原始类型")
+    for field, s in report['fields'].items():
+        types = ' '.join(f"{t}:{n}" for t, n in sorted(s['types'].items(), key=lambda item: -item[1]))
+        print(f"   {field:20} {s['present']:>7} {s['nulls']:>7} {s['coerced']:>7} {s['invalid']:>8} "
+              f"{_fmt(s['min']):>9} {_fmt(s['max']):>9} {_fmt(s['mean']):>9}  {types}")
+
+    if report['anomalies']:
+        print(f"\n   异常:")
+        for code, n in report['anomalies'].items():
+            field, kind = code.rsplit(':', 1)
+            print(f"   ⚠️  {field} {ANOMALY_LABELS.get(kind, kind)}: {n} 条")
+            for example in report['examples'].get(code, [])[:2]:
+                print(f"         例: {json.dumps(example, ensure_ascii=False)}")
+    print(f"{'='*60}\n")
+
+
+def expand_paths(paths):
+    """展开命令行参数：目录（如分区输出 data/scores/）换成其中全部 .json/.jsonl 文件，不存在的目录跳过"""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            if path.endswith(('/', os.sep)):
+                print(f"⚠️  目录不存在，跳过: {path}")
+                continue
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            files.extend(os.path.join(root, n) for n in sorted(names) if n.endswith(('.json', '.jsonl')))
+    return files
+
+
+def _fmt(value):
+    if value is None:
+        return '-'
+    return f"{value:.1f}" if isinstance(value, float) else str(value)
+
+
+if __name__ == "__main__":
+    import sys
+
+    usage = ("用法: python -m crawlers.quality <文件或目录...> [--fix | --out=路径] "
+             "[--anomalies=路径] [--report=路径]")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].split('=', 1) if '=' in a else (a[2:], True) for a in sys.argv[1:] if a.startswith('--'))
+    paths = expand_paths(args)
+    if not args or (options.get('out') and len(paths) > 1):
+        print(usage)
+        sys.exit(1)
+    if not paths:
+        # 例如首次分区运行或测试模式没有产出任何分区
+        print("⚠️  没有可检查的数据文件")
+        sys.exit(0)
+
+    reports = {}
+    for path in paths:
+        dst = path if options.get('fix') else options.get('out')
+        validator = check_file(path, dst=dst, anomalies_path=options.get('anomalies'))
+        print_report(path, validator)
+        if dst:
+            print(f"✓ 规范化后的数据已保存到 {dst}")
+        reports[path] = validator.report()
+
+    if options.get('report'):
+        with atomic_open(options['report'], 'w') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"✓ 质量报告已保存到 {options['report']}")
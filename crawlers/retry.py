@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from .profiler import phase
+
+# 这些状态码视为暂时性错误，可以重试
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """重试策略：指数退避 + 随机抖动"""
+
+    def __init__(self, attempts=3, base_delay=2.0, max_delay=60.0, jitter=0.5):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def backoff(self, attempt, floor=0.0):
+        """第 attempt 次（从0开始）失败后的等待秒数，不低于 floor"""
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        delay *= 1 - self.jitter * random.random()
+        return max(delay, floor)
+
+    def retryable(self, status_code):
+        return status_code in RETRYABLE_STATUS
+
+
+class RetryBudget:
+    """重试预算：每个请求存入 ratio 个令牌，每次重试消耗 1 个
+
+    主机持续故障时重试很快耗尽预算，避免重试把请求量放大数倍。
+    """
+
+    def __init__(self, ratio=0.2, min_tokens=10.0, max_tokens=100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """单个主机的熔断器
+
+    连续失败 failure_threshold 次后熔断 cooldown 秒，期间所有线程在 wait() 中暂停；
+    冷却结束后只放行一个试探请求，成功则恢复，失败则再次熔断（冷却时间翻倍，最多 max_cooldown）。
+    """
+
+    def __init__(self, host, failure_threshold=5, cooldown=30.0, max_cooldown=600.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._cond = threading.Condition()
+
+    def wait(self):
+        """熔断期间阻塞，直到允许发出请求"""
+        with self._cond:
+            while True:
+                if self.state == 'closed':
+                    return
+                # open: 等待冷却结束；half_open: 等待试探请求的结果（试探超时则再放行一个）
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining <= 0:
+                    self.state = 'half_open'
+                    self.opened_at = time.monotonic()
+                    return  # 当前线程作为试探请求
+                with phase('sleep'):
+                    self._cond.wait(remaining)
+
+    def ready(self):
+        """非阻塞检查：熔断中且冷却未结束时返回 False（按需查询不能在 wait() 中等待冷却）"""
+        with self._cond:
+            return self.state == 'closed' or time.monotonic() >= self.opened_at + self.cooldown
+
+    def record_success(self):
+        with self._cond:
+            if self.state != 'closed':
+                print(f"🔌 {self.host} 已恢复，解除熔断")
+            self.state = 'closed'
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self.failures += 1
+            if self.state == 'half_open':
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.state == 'open' or self.failures < self.failure_threshold:
+                return
+
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            print(f"🔌 {self.host} 连续失败 {self.failures} 次，熔断 {self.cooldown:.0f} 秒")
+            self._cond.notify_all()
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def host_guard(url):
+    """返回 URL 所在主机共享的 (熔断器, 重试预算)，同一进程内所有爬虫和线程共用"""
+    host = urlsplit(url).netloc
+    with _hosts_lock:
+        guard = _hosts.get(host)
+        if guard is None:
+            guard = _hosts[host] = (CircuitBreaker(host), RetryBudget())
+        return guard
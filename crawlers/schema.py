@@ -0,0 +1,125 @@
+import json
+import os
+
+# 各数据集的全部输出字段（顺序即输出顺序）
+SCHOOL_LIST_FIELDS = (
+    'school_id', 'name', 'province', 'city', 'county', 'type', 'level', 'nature', 'belong',
+    'rank', 'f985', 'f211', 'dual_class', 'is_dual_class', 'view_total',
+)
+# 以下字段来自详情接口 school/{id}/info.json，一个都不需要时不会请求详情
+SCHOOL_DETAIL_FIELDS = (
+    'content', 'motto', 'old_name', 'email', 'school_email', 'phone', 'school_phone', 'address',
+    'postcode', 'site', 'school_site', 'create_date', 'area', 'num_doctor', 'num_master',
+    'num_subject', 'num_academician', 'num_library', 'recommend_master_rate',
+    'recommend_master_level', 'upgrading_rate', 'ruanke_rank', 'xyh_rank', 'wsl_rank', 'qs_rank',
+    'us_rank', 'qs_world', 'label_list', 'label_list_detail', 'attr_list', 'is_top', 'hightitle',
+    'dualclass', 'special', 'province_score_min', 'rank_detail',
+)
+
+MAJOR_LIST_FIELDS = (
+    'special_id', 'code', 'name', 'level1_name', 'level2_name', 'level3_name', 'degree',
+    'years', 'salary_avg', 'salary_5year', 'boy_rate', 'girl_rate', 'rank', 'view_total',
+    'view_month', 'view_week',
+)
+# 以下字段来自专业详情接口 special/{special_id}/pc_special_detail.json（MAJOR_DETAILS=true 时请求）
+MAJOR_DETAIL_FIELDS = (
+    'intro', 'learn_what', 'do_what', 'courses', 'job_direction', 'employment_rate',
+    'employment_destinations', 'salary_curve', 'offering_schools', 'detail_time',
+)
+
+SCHEMAS = {
+    'schools': SCHOOL_LIST_FIELDS + SCHOOL_DETAIL_FIELDS,
+    'scores': (
+        'school_id', 'year', 'province_id', 'province', 'major_type', 'batch', 'type',
+        'recruit_type', 'major', 'major_code', 'major_group', 'major_group_info', 'level1_name',
+        'level2_name', 'level3_name', 'min_score', 'max_score', 'avg_score', 'min_rank',
+        'proscore', 'enrollment', 'equal_score', 'min_rank_est',
+    ),
+    'plans': (
+        'school_id', 'year', 'province_id', 'province', 'plan_type', 'batch', 'type', 'major',
+        'major_code', 'major_group', 'major_group_code', 'major_group_info', 'level1_name',
+        'level2_name', 'level3_name', 'plan_number', 'years', 'tuition', 'note',
+    ),
+    'majors': MAJOR_LIST_FIELDS + MAJOR_DETAIL_FIELDS,
+    'school_scores': (
+        'school_id', 'school_name', 'province_id', 'province', 'type', 'type_name', 'min_score',
+        'year', 'batch', 'min_rank', 'equal_score', 'min_rank_est',
+    ),
+    'sections': (
+        'year', 'province_id', 'province', 'type', 'type_name', 'max_score', 'min_score', 'total',
+        'scores', 'ranks',
+    ),
+}
+
+# 无论如何配置都会保留的键字段（下游合并、聚合依赖它们）
+KEY_FIELDS = {
+    'schools': ('school_id',),
+    'scores': ('school_id', 'year', 'province_id', 'province'),
+    'plans': ('school_id', 'year', 'province_id', 'province'),
+    'majors': ('special_id',),
+    'school_scores': ('school_id', 'province_id', 'year'),
+    'sections': ('year', 'province_id', 'type'),
+}
+
+
+class Projection:
+    """字段投影：决定某个数据集提取并保存哪些字段
+
+    fields 为 None 表示全部字段（默认行为）。键字段总是保留。
+    """
+
+    def __init__(self, dataset, fields=None):
+        self.dataset = dataset
+        schema = SCHEMAS[dataset]
+
+        if fields is None:
+            self.fields = None
+            return
+
+        unknown = [f for f in fields if f not in schema]
+        if unknown:
+            raise ValueError(f"{dataset} 没有这些字段: {', '.join(unknown)}（可选: {', '.join(schema)}）")
+
+        wanted = set(fields) | set(KEY_FIELDS[dataset])
+        self.fields = tuple(f for f in schema if f in wanted)
+
+    @property
+    def is_full(self):
+        return self.fields is None
+
+    def wants(self, field):
+        return self.fields is None or field in self.fields
+
+    def wants_any(self, fields):
+        return self.fields is None or any(f in self.fields for f in fields)
+
+    def apply(self, record):
+        """只保留需要的字段"""
+        if self.fields is None:
+            return record
+        return {f: record.get(f) for f in self.fields}
+
+    def describe(self):
+        return '全部字段' if self.fields is None else f"{len(self.fields)} 个字段"
+
+
+def load_projection(dataset):
+    """读取字段配置
+
+    优先级：
+    1. 环境变量 FIELDS_<DATASET>，逗号分隔，如 FIELDS_SCHOOLS=school_id,name,province
+    2. 环境变量 CRAWL_FIELDS_CONFIG 指向的JSON文件，如 {"schools": ["school_id", "name"]}
+    3. 全部字段
+    """
+    env = os.getenv(f'FIELDS_{dataset.upper()}')
+    if env:
+        return Projection(dataset, [f.strip() for f in env.split(',') if f.strip()])
+
+    config_path = os.getenv('CRAWL_FIELDS_CONFIG')
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if config.get(dataset) is not None:
+            return Projection(dataset, config[dataset])
+
+    return Projection(dataset)
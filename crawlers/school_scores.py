@@ -1,10 +1,13 @@
 import time
-import json
 import os
-from .base import BaseCrawler
+from .base import BaseCrawler, decode_static
+from .profiler import parse_profile_args, profile_run
+from .quality import TYPE_NAMES
 
 class SchoolScoreCrawler(BaseCrawler):
     
+    dataset = 'school_scores'
+    
     def __init__(self):
         super().__init__()
         self._first_logged = False
@@ -67,11 +70,9 @@ class SchoolScoreCrawler(BaseCrawler):
         url = f"https://static-data.gaokao.cn/www/2.0/school/{school_id}/info.json"
         
         try:
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('code') == '0000' and 'data' in result:
-                    return result['data']
+            data = decode_static(*self.fetch_static(url))
+            if data != 'no_data':
+                return data
         except Exception as e:
             print(f"      ⚠️  获取学校信息失败 (ID:{school_id}): {str(e)}")
         
@@ -81,38 +82,11 @@ class SchoolScoreCrawler(BaseCrawler):
         """爬取大学最低分数线数据"""
         # 从schools.json读取学校ID
         if school_ids is None:
-            try:
-                with open('data/schools.json', 'r', encoding='utf-8') as f:
-                    schools_data = json.load(f)
-                    
-                    # 处理不同的数据结构
-                    if isinstance(schools_data, list):
-                        schools = schools_data
-                    elif isinstance(schools_data, dict):
-                        schools = schools_data.get('data', [])
-                        if not schools:
-                            schools = [schools_data]
-                    else:
-                        print(f"⚠️  schools.json 数据格式错误: {type(schools_data)}")
-                        return []
-                    
-                    sample_count = int(os.getenv('SAMPLE_SCHOOLS', '999999'))
-                    school_ids = [s['school_id'] for s in schools[:sample_count] if isinstance(s, dict) and s.get('school_id')]
-                    
-                    if not school_ids:
-                        print("⚠️  未找到有效的学校ID")
-                        return []
-                    
-                    print(f"从 schools.json 读取到 {len(school_ids)} 所学校")
-                    
-            except FileNotFoundError:
-                print("⚠️  未找到 schools.json，请先运行学校爬虫")
-                return []
-            except Exception as e:
-                print(f"⚠️  读取 schools.json 失败: {e}")
-                import traceback
-                traceback.print_exc()
+            school_ids = self.load_school_ids(int(os.getenv('SAMPLE_SCHOOLS', '999999')))
+            if not school_ids:
+                print("⚠️  未找到有效的学校ID")
                 return []
+            print(f"从 schools.json 读取到 {len(school_ids)} 所学校")
         
         all_school_scores = []
         
@@ -190,7 +164,7 @@ class SchoolScoreCrawler(BaseCrawler):
                     'min_rank': score_data.get('min_section'),  # 最低位次
                 }
                 
-                all_school_scores.append(school_score_record)
+                all_school_scores.append(self.projection.apply(school_score_record))
                 score_count += 1
             
             print(f" ✓ {school_name} - {score_count} 个省份")
@@ -223,21 +197,22 @@ class SchoolScoreCrawler(BaseCrawler):
                     year_counts[y] = year_counts.get(y, 0) + 1
             if year_counts:
                 print(f"   年份分布: {dict(sorted(year_counts.items(), reverse=True))}")
+        if self.failed_urls:
+            print(f"   ⚠️  重试后仍失败的请求: {len(self.failed_urls)} 个（数据可能不完整）")
         print(f"{'='*60}\n")
         
         return all_school_scores
     
     def get_type_name(self, type_code):
-        """科类代码转名称"""
-        type_map = {
-            '1': '文科',
-            '2': '理科',
-            '3': '综合',
-            '4': '物理类',
-            '5': '历史类',
-        }
-        return type_map.get(str(type_code), f'类型{type_code}')
+        """科类代码转名称（未知代码返回None，由 crawlers.quality 报告）"""
+        return TYPE_NAMES.get(str(type_code))
 
 if __name__ == "__main__":
+    import sys
+    
+    # 支持 --profile / --profile-stats=PATH / --profile-stacks=PATH
+    _, profile_options = parse_profile_args(sys.argv[1:])
+    
     crawler = SchoolScoreCrawler()
-    crawler.crawl()
+    with profile_run(profile_options):
+        crawler.crawl()
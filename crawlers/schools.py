@@ -1,49 +1,265 @@
 import time
 import os
 import json
-from .base import BaseCrawler
+import hashlib
+import zlib
+from .base import BaseCrawler, decode_static
+from .discovery import info_url
+from .schema import SCHOOL_DETAIL_FIELDS
+from .storage import atomic_write
+from .profiler import parse_profile_args, profile_run
+
+DETAIL_STATE = 'data/state/school_details.json'
+# 列表字段中每天都在变化、不代表学校信息变化的字段
+VOLATILE_FIELDS = ('view_total',)
+
+def build_school_info(item):
+    """从学校列表接口的单条数据提取字段"""
+    return {
+        # 基础标识
+        'school_id': item.get('school_id'),
+        'name': item.get('name'),
+
+        # 地理位置
+        'province': item.get('province_name'),
+        'city': item.get('city_name'),
+        'county': item.get('county_name'),
+
+        # 学校属性
+        'type': item.get('type_name'),
+        'level': item.get('level_name'),
+        'nature': item.get('nature_name'),
+        'belong': item.get('belong'),
+
+        # 排名与标识
+        'rank': item.get('rank'),
+        'f985': item.get('f985'),
+        'f211': item.get('f211'),
+        'dual_class': item.get('dual_class_name'),
+        'is_dual_class': item.get('dual_class'),
+
+        # 统计数据
+        'view_total': item.get('view_total'),
+    }
+
+
+def top_flag(rank):
+    """从排名推导is_top（前10名为顶尖学校）"""
+    try:
+        return 1 if int(rank) <= 10 else 2
+    except (TypeError, ValueError):
+        return 2
+
+
+def school_fingerprint(school_info):
+    """列表页字段的指纹（不含浏览量等每天变化的字段），学校的列表字段变化时重新验证详情"""
+    stable = {k: v for k, v in school_info.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(stable, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class SchoolDetailState:
+    """学校详情的变化检测状态（data/state/school_details.json）
+
+    {'run': 运行次数, 'schools': {school_id: {'fingerprint': 列表字段指纹, 'validators': {'etag', 'last_modified'}, 'digest': info.json 内容哈希}}}
+
+    列表字段指纹未变的学校直接复用上次保存的详情；每次运行有 1/revalidate_every 的学校
+    按学校ID轮换做一次条件请求，用来发现只有详情变化（列表字段没变）的学校。
+    """
+
+    def __init__(self, path=DETAIL_STATE, revalidate_every=None):
+        self.path = path
+        self.revalidate_every = int(revalidate_every if revalidate_every is not None
+                                    else os.getenv('SCHOOL_DETAIL_REVALIDATE_EVERY', '20'))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {'run': 0, 'schools': {}}
+        self.schools = self.state['schools']
+
+    def revalidate(self, school_id):
+        """本次运行是否轮到该学校重新验证（按学校ID错开）"""
+        if self.revalidate_every <= 1:
+            return True
+        return (self.state['run'] + zlib.crc32(str(school_id).encode())) % self.revalidate_every == 0
+
+    def save(self):
+        self.state = {'run': self.state['run'] + 1, 'schools': dict(sorted(self.schools.items()))}
+        atomic_write(self.path, json.dumps(self.state, ensure_ascii=False).encode('utf-8'))
+
+
+def apply_school_detail(school_info, complete_info):
+    """把详情接口 info.json 的字段合并进学校记录（模块级函数，便于单独调用和基准测试）"""
+    # 提取label_list（从详细对象中提取名称）
+    label_list = []
+    label_list_detail = complete_info.get('label_list', [])
+    if isinstance(label_list_detail, list):
+        label_list = [item.get('name') for item in label_list_detail if isinstance(item, dict)]
+
+    school_info.update({
+        # 学校介绍
+        'content': complete_info.get('content'),
+        'motto': complete_info.get('motto'),
+        'old_name': complete_info.get('old_name'),
+
+        # 联系方式
+        'email': complete_info.get('email'),
+        'school_email': complete_info.get('school_email'),
+        'phone': complete_info.get('phone'),
+        'school_phone': complete_info.get('school_phone'),
+        'address': complete_info.get('address'),
+        'postcode': complete_info.get('postcode'),
+
+        # 网站链接
+        'site': complete_info.get('site'),  # 招生网
+        'school_site': complete_info.get('school_site'),  # 官网
+
+        # 建校信息
+        'create_date': complete_info.get('create_date'),
+        'area': complete_info.get('area'),  # 占地面积
+
+        # 学科实力
+        'num_doctor': complete_info.get('num_doctor'),  # 博士点
+        'num_master': complete_info.get('num_master'),  # 硕士点
+        'num_subject': complete_info.get('num_subject'),  # 重点学科
+        'num_academician': complete_info.get('num_academician'),  # 院士
+        'num_library': complete_info.get('num_library'),  # 图书馆藏书
+
+        # 升学数据
+        'recommend_master_rate': complete_info.get('recommend_master_rate'),  # 保研率
+        'recommend_master_level': complete_info.get('recommend_master_level'),  # 保研评级
+        'upgrading_rate': complete_info.get('upgrading_rate'),  # 升学率
+
+        # 排名数据
+        'ruanke_rank': complete_info.get('ruanke_rank'),  # 软科排名
+        'xyh_rank': complete_info.get('xyh_rank'),  # 校友会排名
+        'wsl_rank': complete_info.get('wsl_rank'),  # 武书连排名
+        'qs_rank': complete_info.get('qs_rank'),  # QS排名
+        'us_rank': complete_info.get('us_rank'),  # US排名
+        'qs_world': complete_info.get('qs_world'),  # QS世界排名
+
+        # 标签和属性（从接口2提取）
+        'label_list': label_list,  # 简化的标签列表
+        'label_list_detail': label_list_detail,  # 详细的标签列表
+        'attr_list': complete_info.get('attr_list', []),  # 属性列表
+        'is_top': top_flag(school_info.get('rank', 999)),  # 是否顶尖学校（从rank推导）
+        'hightitle': complete_info.get('name'),  # 高亮标题（就是name）
+
+        # 其他详细信息
+        'dualclass': complete_info.get('dualclass'),  # 双一流学科列表
+        'special': complete_info.get('special'),  # 特色专业列表
+        'province_score_min': complete_info.get('province_score_min'),  # 各省最低分
+        'rank_detail': complete_info.get('rank'),  # 详细排名字典
+    })
+    return school_info
+
 
 class SchoolCrawler(BaseCrawler):
     
+    dataset = 'schools'
+    
     def get_school_complete_info(self, school_id):
         """获取学校完整信息"""
         url = f"https://static-data.gaokao.cn/www/2.0/school/{school_id}/info.json"
         
         try:
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('code') == '0000' and 'data' in result:
-                    return result['data']
+            data = decode_static(*self.fetch_static(url))
+            if data != 'no_data':
+                return data
         except Exception as e:
             print(f"⚠️  获取完整信息失败 (ID:{school_id}): {str(e)}")
         
         return None
     
+    def refresh_school_detail(self, school_info, state, previous):
+        """按变化检测决定是否请求详情，把详情字段合并进 school_info，返回处理方式
+        
+        reused        列表字段未变且本次不轮到重新验证：复用上次的详情，不发请求
+        not_modified  条件请求返回 304，复用上次的详情
+        unchanged     返回 200 但内容与上次相同，复用上次的详情
+        fetched       首次获取或详情有变化
+        failed        请求失败（有上次的详情时仍复用）
+        """
+        school_id = str(school_info['school_id'])
+        entry = state.schools.get(school_id)
+        fingerprint = school_fingerprint(school_info)
+        
+        # 上次保存的记录需包含本次需要的全部详情字段才能复用
+        wanted = [f for f in SCHOOL_DETAIL_FIELDS if self.projection.wants(f)]
+        stored = bool(entry) and previous is not None and all(f in previous for f in wanted)
+        
+        def reuse():
+            school_info.update({f: previous.get(f) for f in SCHOOL_DETAIL_FIELDS if f in previous})
+            school_info['is_top'] = top_flag(school_info.get('rank', 999))
+        
+        if stored and entry.get('fingerprint') == fingerprint and not state.revalidate(school_id):
+            reuse()
+            return 'reused'
+        
+        try:
+            status_code, content, validators = self.fetch_conditional(
+                info_url(school_id), entry.get('validators') if stored else None)
+        except Exception as e:
+            print(f"⚠️  获取完整信息失败 (ID:{school_id}): {str(e)}")
+            status_code = None
+        self.polite_sleep(2.0, 4.0)
+        
+        if status_code == 304 and stored:
+            entry['fingerprint'] = fingerprint
+            reuse()
+            return 'not_modified'
+        
+        data = decode_static(status_code, content) if status_code in (200, 404) else None
+        if not isinstance(data, dict):
+            if stored:
+                reuse()
+            return 'failed'
+        
+        digest = hashlib.sha1(content).hexdigest()
+        state.schools[school_id] = {'fingerprint': fingerprint, 'validators': validators, 'digest': digest}
+        if stored and entry.get('digest') == digest:
+            reuse()
+            return 'unchanged'
+        
+        apply_school_detail(school_info, data)
+        return 'fetched'
+    
+    def list_payload(self, page):
+        """学校列表接口的请求参数（每页20所）"""
+        return {
+            "keyword": "",
+            "page": page,
+            "province_id": "",
+            "ranktype": "",
+            "request_type": 1,
+            "size": 20,
+            "type": "",
+            "uri": "apidata/api/gkv3/school/lists"
+        }
+    
     def crawl(self, max_pages=None, fetch_complete_info=True):
         """爬取学校列表"""
         max_pages = max_pages or int(os.getenv('MAX_PAGES', '10'))
         fetch_complete_info = os.getenv('FETCH_COMPLETE_INFO', str(fetch_complete_info)).lower() == 'true'
         
+        # 没有配置任何详情字段时，不必请求详情接口
+        if not self.projection.wants_any(SCHOOL_DETAIL_FIELDS):
+            fetch_complete_info = False
+        
         schools = []
+        
+        # 详情的变化检测：列表字段未变的学校复用上次 schools.json 中的详情
+        state = SchoolDetailState() if fetch_complete_info else None
+        previous = {str(s.get('school_id')): s for s in self.read_output('schools.json')} if fetch_complete_info else {}
+        detail_counts = dict.fromkeys(('reused', 'not_modified', 'unchanged', 'fetched', 'failed'), 0)
+        
         print(f"\n{'='*60}")
         print(f"开始爬取学校数据")
-        print(f"页数: {max_pages} | 完整信息: {'✓' if fetch_complete_info else '✗'}")
+        print(f"页数: {max_pages} | 完整信息: {'✓' if fetch_complete_info else '✗'} | 字段: {self.projection.describe()}")
         print(f"{'='*60}\n")
         
         for page in range(1, max_pages + 1):
-            payload = {
-                "keyword": "",
-                "page": page,
-                "province_id": "",
-                "ranktype": "",
-                "request_type": 1,
-                "size": 20,
-                "type": "",
-                "uri": "apidata/api/gkv3/school/lists"
-            }
-            
-            data = self.make_request(payload)
+            data = self.make_request(self.list_payload(page))
             
             if not data or 'data' not in data or 'item' not in data['data']:
                 print(f"✗ 第 {page} 页请求失败")
@@ -60,109 +276,14 @@ class SchoolCrawler(BaseCrawler):
                 school_id = item.get('school_id')
                 
                 # 从基础列表提取字段
-                school_info = {
-                    # 基础标识
-                    'school_id': school_id,
-                    'name': item.get('name'),
-                    
-                    # 地理位置
-                    'province': item.get('province_name'),
-                    'city': item.get('city_name'),
-                    'county': item.get('county_name'),
-                    
-                    # 学校属性
-                    'type': item.get('type_name'),
-                    'level': item.get('level_name'),
-                    'nature': item.get('nature_name'),
-                    'belong': item.get('belong'),
-                    
-                    # 排名与标识
-                    'rank': item.get('rank'),
-                    'f985': item.get('f985'),
-                    'f211': item.get('f211'),
-                    'dual_class': item.get('dual_class_name'),
-                    'is_dual_class': item.get('dual_class'),
-                    
-                    # 统计数据
-                    'view_total': item.get('view_total'),
-                }
+                school_info = build_school_info(item)
                 
-                # 获取完整信息（128个字段）
+                # 获取完整信息（128个字段），未变化的学校复用上次的详情
                 if fetch_complete_info and school_id:
-                    complete_info = self.get_school_complete_info(school_id)
-                    if complete_info:
-                        # 提取label_list（从详细对象中提取名称）
-                        label_list = []
-                        label_list_detail = complete_info.get('label_list', [])
-                        if isinstance(label_list_detail, list):
-                            label_list = [item.get('name') for item in label_list_detail if isinstance(item, dict)]
-                        
-                        # 从排名推导is_top（前10名为顶尖学校）
-                        try:
-                            rank_num = int(school_info.get('rank', 999))
-                            is_top = 1 if rank_num <= 10 else 2
-                        except:
-                            is_top = 2
-                        
-                        school_info.update({
-                            # 学校介绍
-                            'content': complete_info.get('content'),
-                            'motto': complete_info.get('motto'),
-                            'old_name': complete_info.get('old_name'),
-                            
-                            # 联系方式
-                            'email': complete_info.get('email'),
-                            'school_email': complete_info.get('school_email'),
-                            'phone': complete_info.get('phone'),
-                            'school_phone': complete_info.get('school_phone'),
-                            'address': complete_info.get('address'),
-                            'postcode': complete_info.get('postcode'),
-                            
-                            # 网站链接
-                            'site': complete_info.get('site'),  # 招生网
-                            'school_site': complete_info.get('school_site'),  # 官网
-                            
-                            # 建校信息
-                            'create_date': complete_info.get('create_date'),
-                            'area': complete_info.get('area'),  # 占地面积
-                            
-                            # 学科实力
-                            'num_doctor': complete_info.get('num_doctor'),  # 博士点
-                            'num_master': complete_info.get('num_master'),  # 硕士点
-                            'num_subject': complete_info.get('num_subject'),  # 重点学科
-                            'num_academician': complete_info.get('num_academician'),  # 院士
-                            'num_library': complete_info.get('num_library'),  # 图书馆藏书
-                            
-                            # 升学数据
-                            'recommend_master_rate': complete_info.get('recommend_master_rate'),  # 保研率
-                            'recommend_master_level': complete_info.get('recommend_master_level'),  # 保研评级
-                            'upgrading_rate': complete_info.get('upgrading_rate'),  # 升学率
-                            
-                            # 排名数据
-                            'ruanke_rank': complete_info.get('ruanke_rank'),  # 软科排名
-                            'xyh_rank': complete_info.get('xyh_rank'),  # 校友会排名
-                            'wsl_rank': complete_info.get('wsl_rank'),  # 武书连排名
-                            'qs_rank': complete_info.get('qs_rank'),  # QS排名
-                            'us_rank': complete_info.get('us_rank'),  # US排名
-                            'qs_world': complete_info.get('qs_world'),  # QS世界排名
-                            
-                            # 标签和属性（从接口2提取）
-                            'label_list': label_list,  # 简化的标签列表
-                            'label_list_detail': label_list_detail,  # 详细的标签列表
-                            'attr_list': complete_info.get('attr_list', []),  # 属性列表
-                            'is_top': is_top,  # 是否顶尖学校（从rank推导）
-                            'hightitle': complete_info.get('name'),  # 高亮标题（就是name）
-                            
-                            # 其他详细信息
-                            'dualclass': complete_info.get('dualclass'),  # 双一流学科列表
-                            'special': complete_info.get('special'),  # 特色专业列表
-                            'province_score_min': complete_info.get('province_score_min'),  # 各省最低分
-                            'rank_detail': complete_info.get('rank'),  # 详细排名字典
-                        })
-                        
-                        self.polite_sleep(2.0, 4.0)
+                    how = self.refresh_school_detail(school_info, state, previous.get(str(school_id)))
+                    detail_counts[how] += 1
                 
-                schools.append(school_info)
+                schools.append(self.projection.apply(school_info))
                 
                 # 进度显示
                 if idx % 5 == 0:
@@ -173,6 +294,8 @@ class SchoolCrawler(BaseCrawler):
         
         # 保存数据
         self.save_to_json(schools, 'schools.json')
+        if state is not None:
+            state.save()
         
         print(f"\n{'='*60}")
         print(f"✅ 爬取完成！共 {len(schools)} 所学校")
@@ -186,6 +309,11 @@ class SchoolCrawler(BaseCrawler):
             print(f"   学校介绍: {'✓' if has_content else '✗'}")
             print(f"   联系邮箱: {'✓' if has_email else '✗'}")
             print(f"   标签数量: {has_labels}")
+        if fetch_complete_info:
+            print(f"   学校详情: 复用 {detail_counts['reused']} | 304 {detail_counts['not_modified']} | "
+                  f"未变化 {detail_counts['unchanged']} | 更新 {detail_counts['fetched']} | 失败 {detail_counts['failed']}")
+        if self.failed_urls:
+            print(f"   ⚠️  重试后仍失败的请求: {len(self.failed_urls)} 个（数据可能不完整）")
         print(f"{'='*60}\n")
         
         return schools
@@ -193,11 +321,15 @@ class SchoolCrawler(BaseCrawler):
 if __name__ == "__main__":
     import sys
     
-    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 1
-    fetch_complete_info = sys.argv[2].lower() == 'true' if len(sys.argv) > 2 else True
+    # 支持 --profile / --profile-stats=PATH / --profile-stacks=PATH
+    argv, profile_options = parse_profile_args(sys.argv[1:])
+    
+    max_pages = int(argv[0]) if len(argv) > 0 else 1
+    fetch_complete_info = argv[1].lower() == 'true' if len(argv) > 1 else True
     
     crawler = SchoolCrawler()
-    crawler.crawl(
-        max_pages=max_pages, 
-        fetch_complete_info=fetch_complete_info
-    )
+    with profile_run(profile_options):
+        crawler.crawl(
+            max_pages=max_pages, 
+            fetch_complete_info=fetch_complete_info
+        )
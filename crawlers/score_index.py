@@ -0,0 +1,211 @@
+"""分数线二进制索引
+
+文件布局（小端）：
+    文件头      HEADER
+    记录区      按 (school_id, year, province_id) 排序的定长记录 RECORD
+    键索引区    每个 (school_id, year, province_id) 一项 KEY：该键的首条记录下标和记录数
+    字符串索引  每个字符串一项 (偏移, 长度)，0 号为 None，1 号为空字符串
+    字符串数据  UTF-8 字节
+
+读取方用 mmap 映射整个文件，多个进程共享同一份页缓存；查询时在键索引区二分查找，
+直接从映射内存解包记录，不需要把 scores.json 载入内存。
+"""
+import math
+import mmap
+import os
+import struct
+from .views import to_int
+
+MAGIC = b'GKSI'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHIIIQQQQ')
+KEY = struct.Struct('<IHHII')
+
+STRING_FIELDS = (
+    'province', 'major_type', 'batch', 'type', 'recruit_type',
+    'major', 'major_code', 'major_group', 'major_group_info',
+    'level1_name', 'level2_name', 'level3_name',
+)
+INT_FIELDS = ('min_score', 'max_score', 'min_rank', 'proscore', 'enrollment')
+RECORD = struct.Struct(f'<IHH{len(STRING_FIELDS)}I{len(INT_FIELDS)}if')
+
+NULL_INT = -2 ** 31
+
+
+def build_score_index(scores, path):
+    """把 scores.json 的记录编译成二进制索引文件（先写临时文件再原子替换）"""
+    strings = {None: 0, '': 1}
+    string_list = [None, '']
+
+    def intern(value):
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        sid = strings.get(value)
+        if sid is None:
+            sid = strings[value] = len(string_list)
+            string_list.append(value)
+        return sid
+
+    def key_of(s):
+        return (int(s['school_id']), int(s['year']), int(s['province_id']))
+
+    rows = sorted((s for s in scores if s.get('school_id') is not None), key=key_of)
+
+    records = bytearray()
+    keys = []
+    for s in rows:
+        key = key_of(s)
+        if keys and keys[-1][0] == key:
+            keys[-1][2] += 1
+        else:
+            keys.append([key, len(records) // RECORD.size, 1])
+
+        ints = []
+        for field in INT_FIELDS:
+            value = to_int(s.get(field))
+            ints.append(NULL_INT if value is None else value)
+        try:
+            avg = float(s['avg_score']) if s.get('avg_score') not in (None, '', '-') else math.nan
+        except ValueError:
+            avg = math.nan
+
+        records += RECORD.pack(*key, *(intern(s.get(f)) for f in STRING_FIELDS), *ints, avg)
+
+    key_bytes = b''.join(KEY.pack(*key, first, count) for key, first, count in keys)
+
+    string_index = bytearray()
+    string_data = bytearray()
+    for value in string_list:
+        encoded = b'' if value is None else value.encode('utf-8')
+        string_index += struct.pack('<II', len(string_data), len(encoded))
+        string_data += encoded
+
+    record_offset = HEADER.size
+    key_offset = record_offset + len(records)
+    string_index_offset = key_offset + len(key_bytes)
+    string_data_offset = string_index_offset + len(string_index)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(
+            MAGIC, VERSION, 0, len(rows), len(keys), len(string_list),
+            record_offset, key_offset, string_index_offset, string_data_offset,
+        ))
+        f.write(records)
+        f.write(key_bytes)
+        f.write(string_index)
+        f.write(string_data)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class ScoreIndex:
+    """内存映射的分数线索引（只读，可在多进程间共享）"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        self._strings = {0: None}  # 已解码的字符串（字符串表高度重复）
+
+        (magic, version, _, self.record_count, self.key_count, self.string_count,
+         self._record_offset, self._key_offset, self._string_index_offset,
+         self._string_data_offset) = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的分数线索引文件: {path}")
+
+    def close(self):
+        self._buf.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _key(self, i):
+        return KEY.unpack_from(self._buf, self._key_offset + i * KEY.size)
+
+    def _string(self, sid):
+        value = self._strings.get(sid, self)
+        if value is self:
+            offset, length = struct.unpack_from('<II', self._buf, self._string_index_offset + sid * 8)
+            start = self._string_data_offset + offset
+            value = self._strings[sid] = str(self._buf[start:start + length], 'utf-8')
+        return value
+
+    def _record(self, i):
+        values = RECORD.unpack_from(self._buf, self._record_offset + i * RECORD.size)
+        record = {
+            'school_id': values[0],
+            'year': str(values[1]),
+            'province_id': str(values[2]),
+        }
+        n = 3
+        for field in STRING_FIELDS:
+            record[field] = self._string(values[n])
+            n += 1
+        for field in INT_FIELDS:
+            record[field] = None if values[n] == NULL_INT else values[n]
+            n += 1
+        record['avg_score'] = None if math.isnan(values[n]) else values[n]
+        return record
+
+    def _lower_bound(self, target):
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:3] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, school_id, year, province_id):
+        """查询某学校某年某省的全部分数线记录"""
+        target = (int(school_id), int(year), int(province_id))
+        i = self._lower_bound(target)
+        if i >= self.key_count:
+            return []
+        key = self._key(i)
+        if key[:3] != target:
+            return []
+        return [self._record(r) for r in range(key[3], key[3] + key[4])]
+
+    def school(self, school_id, year=None):
+        """查询某学校（可限定年份）的全部分数线记录"""
+        school_id = int(school_id)
+        target = (school_id, int(year) if year is not None else 0, 0)
+        records = []
+        for i in range(self._lower_bound(target), self.key_count):
+            key = self._key(i)
+            if key[0] != school_id or (year is not None and key[1] != int(year)):
+                break
+            records.extend(self._record(r) for r in range(key[3], key[3] + key[4]))
+        return records
+
+    def keys(self):
+        """遍历所有 (school_id, year, province_id) 键"""
+        for i in range(self.key_count):
+            yield self._key(i)[:3]
+
+
+if __name__ == "__main__":
+    import sys
+    from .partitions import read_dataset
+    from .quality import RecordReader
+
+    # python -m crawlers.score_index [源文件] [索引文件]
+    # 不指定源文件时按输出布局读取 scores（有分区输出时读分区，否则读 data/scores.json）
+    src = sys.argv[1] if len(sys.argv) > 1 else None
+    dst = sys.argv[2] if len(sys.argv) > 2 else 'data/scores.idx'
+
+    scores = list(RecordReader(src) if src else read_dataset('scores.json'))
+    if not scores:
+        print(f"⚠️  没有分数线数据: {src or 'scores'}")
+        sys.exit(1)
+    count = build_score_index(scores, dst)
+    print(f"✓ 已编译 {count} 条分数线到 {dst}（{os.path.getsize(dst) / 1024:.0f} KB）")
@@ -1,10 +1,95 @@
 import time
 import json
 import os
-from .base import BaseCrawler
+import hashlib
+from datetime import datetime
+from .base import BaseCrawler, decode_static
+from .pipeline import ParsePipeline, peek
+from .views import score_views
+from .profiler import parse_profile_args, profile_run
+from .discovery import ProvinceDiscovery
+from .deadline import crawl_with_deadline, deadline_minutes
+
+def build_score_records(data, school_id, year, province_id, province_name, fields=None):
+    """将单个响应的 data 转换为记录列表（模块级函数，可在解析子进程中执行）
+    
+    fields 为字段投影（见 schema.Projection），None 表示保留全部字段。
+    """
+    records = []
+    
+    # 遍历所有招生类型（普通类、中外合作等）
+    for major_type, major_info in data.items():
+        if not isinstance(major_info, dict):
+            continue
+        
+        items = major_info.get('item', [])
+        
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            
+            score_info = {
+                # 基础标识
+                'school_id': school_id,
+                'year': year,
+                'province_id': province_id,
+                'province': province_name,
+
+                # 招生类型
+                'major_type': major_type,  # 普通类、中外合作等
+                'batch': item.get('local_batch_name'),  # 招生批次
+                'type': item.get('type'),  # 科类
+                'recruit_type': item.get('zslx_name'),  # 录取类型
+
+                # 专业信息
+                'major': item.get('sp_name') or item.get('spname'),
+                'major_code': item.get('spcode'),
+                'major_group': item.get('sg_name'),  # 专业组名称
+                'major_group_info': item.get('sg_info'),  # 专业组要求
+
+                # 学科分类
+                'level1_name': item.get('level1_name'),
+                'level2_name': item.get('level2_name'),
+                'level3_name': item.get('level3_name'),
+
+                # 分数信息
+                'min_score': item.get('min'),
+                'max_score': item.get('max'),
+                'avg_score': item.get('average') or item.get('avg'),
+                'min_rank': item.get('min_section'),  # 最低位次
+                'proscore': item.get('proscore'),  # 省控线
+
+                # 招生人数
+                'enrollment': item.get('lq_num'),
+            }
+            records.append(score_info if fields is None else {f: score_info.get(f) for f in fields})
+    
+    return records
+
+
+def score_url(school_id, year, province_id):
+    return f"https://static-data.gaokao.cn/www/2.0/schoolspecialscore/{school_id}/{year}/{province_id}.json"
+
+
+def load_watch_state(path):
+    """读取监视状态 {url: {'validators', 'digest', 'has_data', 'checked'}}"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_watch_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
 
 class ScoreCrawler(BaseCrawler):
     
+    dataset = 'scores'
+    
     def __init__(self):
         super().__init__()
         self._first_logged = False
@@ -63,210 +148,173 @@ class ScoreCrawler(BaseCrawler):
         }
 
     
+    def get_score_raw(self, school_id, year, province_id):
+        """获取分数线原始响应 (状态码, 原始字节)，请求异常返回None"""
+        url = score_url(school_id, year, province_id)
+        
+        try:
+            return self.fetch_static(url)
+        except Exception as e:
+            print(f"         ⚠️  请求异常: {str(e)}")
+        
+        return None
+    
     def get_score_data(self, school_id, year, province_id):
         """获取指定学校、年份、省份的分数线数据"""
-        url = f"https://static-data.gaokao.cn/www/2.0/schoolspecialscore/{school_id}/{year}/{province_id}.json"
+        raw = self.get_score_raw(school_id, year, province_id)
+        if raw is None:
+            return None
         
         try:
-            response = self.session.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('code') == '0000' and 'data' in result:
-                    return result['data']
-            elif response.status_code == 404:
-                return 'no_data'  # 该省份无招生
-        except Exception as e:
+            return decode_static(*raw)
+        except ValueError as e:
             print(f"         ⚠️  请求异常: {str(e)}")
         
         return None
     
-    def crawl(self, school_ids=None, years=None, province_ids=None):
+    def resolve_years(self, years=None):
+        """本次爬取的年份（默认近六年）"""
+        return years or ["2025", "2024", "2023", "2022", "2021", "2020"]
+    
+    def crawl(self, school_ids=None, years=None, province_ids=None, parse_workers=None, deadline=None):
         """爬取分数线数据"""
-        years = years or ["2025", "2024", "2023", "2022", "2021", "2020"]
+        years = self.resolve_years(years)
         province_ids = province_ids or list(self.province_dict.keys())
         
         # 从schools.json读取学校ID
         if school_ids is None:
-            try:
-                with open('data/schools.json', 'r', encoding='utf-8') as f:
-                    schools_data = json.load(f)
-                    
-                    # 处理不同的数据结构
-                    if isinstance(schools_data, list):
-                        schools = schools_data
-                    elif isinstance(schools_data, dict):
-                        # 可能是 {'data': [...]} 或 直接是学校字典列表
-                        schools = schools_data.get('data', [])
-                        if not schools:
-                            schools = [schools_data]  # 单个学校
-                    else:
-                        print(f"⚠️  schools.json 数据格式错误: {type(schools_data)}")
-                        return []
-                    
-                    sample_count = int(os.getenv('SAMPLE_SCHOOLS', '3'))
-                    school_ids = [s['school_id'] for s in schools[:sample_count] if isinstance(s, dict) and s.get('school_id')]
-                    
-                    if not school_ids:
-                        print("⚠️  未找到有效的学校ID")
-                        return []
-                    
-                    print(f"从 schools.json 读取到 {len(school_ids)} 所学校")
-                    
-            except FileNotFoundError:
-                print("⚠️  未找到 schools.json，请先运行学校爬虫")
-                return []
-            except Exception as e:
-                print(f"⚠️  读取 schools.json 失败: {e}")
-                import traceback
-                traceback.print_exc()
+            school_ids = self.load_school_ids(int(os.getenv('SAMPLE_SCHOOLS', '3')))
+            if not school_ids:
+                print("⚠️  未找到有效的学校ID")
                 return []
+            print(f"从 schools.json 读取到 {len(school_ids)} 所学校")
+        
+        # 截止时间模式（deadline 或 CRAWL_DEADLINE，分钟）：按价值顺序爬取，到时保存进度和已完成的部分
+        deadline = deadline_minutes(deadline)
+        if deadline:
+            return crawl_with_deadline(self, deadline, score_url, build_score_records, 'scores.json', score_views,
+                                       school_ids, years, province_ids, parse_workers)
         
         all_scores = []
         
         print(f"\n{'='*60}")
         print(f"开始爬取分数线")
-        print(f"学校数: {len(school_ids)} | 年份: {', '.join(years)} | 省份: {len(province_ids)} 个")
+        print(f"学校数: {len(school_ids)} | 年份: {', '.join(years)} | 省份: {len(province_ids)} 个 | 字段: {self.projection.describe()}")
         print(f"{'='*60}\n")
         
-        for idx, school_id in enumerate(school_ids, 1):
-            school_score_count = 0
+        # 只请求各学校实际招生的省份
+        discovery = ProvinceDiscovery(self, province_ids)
+        
+        with ParsePipeline(build_score_records, workers=parse_workers) as pipeline:
+            for idx, school_id in enumerate(school_ids, 1):
+                school_score_count = 0
             
-            print(f"\n[{idx}/{len(school_ids)}] 学校ID: {school_id}")
+                school_provinces, reason = discovery.provinces_for(school_id)
+                print(f"\n[{idx}/{len(school_ids)}] 学校ID: {school_id}（{reason}）")
             
-            for year in years:
-                year_count = 0
+                for year in years:
+                    year_count = 0
+                    pending = []
+                
+                    # 并发预取本年度各省份文件（STATIC_CONCURRENCY > 1 时），逐个处理时不再单独限速
+                    prefetched = self.prefetch_static([score_url(school_id, year, p) for p in school_provinces])
                 
-                for province_id in province_ids:
-                    province_name = self.province_dict.get(province_id, f'省份{province_id}')
+                    for province_id in school_provinces:
+                        province_name = self.province_dict.get(province_id, f'省份{province_id}')
                     
-                    # 只在第一所学校第一个年份第一个省份显示详细日志
-                    show_detail = (idx == 1 and year == years[0] and province_id == province_ids[0])
+                        # 只在第一所学校第一个年份第一个省份显示详细日志
+                        show_detail = (idx == 1 and year == years[0] and province_id == school_provinces[0])
                     
-                    if show_detail:
-                        print(f"\n   📡 [分数线接口] school_id={school_id}, year={year}, province={province_name}")
-                        print(f"      URL: https://static-data.gaokao.cn/www/2.0/schoolspecialscore/{school_id}/{year}/{province_id}.json")
+                        if show_detail:
+                            print(f"\n   📡 [分数线接口] school_id={school_id}, year={year}, province={province_name}")
+                            print(f"      URL: https://static-data.gaokao.cn/www/2.0/schoolspecialscore/{school_id}/{year}/{province_id}.json")
                     
-                    data = self.get_score_data(school_id, year, province_id)
+                        raw = self.get_score_raw(school_id, year, province_id)
                     
-                    # 首次显示响应结构
-                    if not self._first_logged and data and data != 'no_data':
-                        print(f"\n      {'─'*50}")
-                        print(f"      首次响应数据结构:")
-                        print(f"      {'─'*50}")
-                        print(f"      data类型: {type(data).__name__}")
+                        # 首次显示响应结构（仅此一次在主进程中解析）
+                        data = peek(raw) if not self._first_logged else None
+                        if not self._first_logged and data and data != 'no_data':
+                            print(f"\n      {'─'*50}")
+                            print(f"      首次响应数据结构:")
+                            print(f"      {'─'*50}")
+                            print(f"      data类型: {type(data).__name__}")
                         
-                        if isinstance(data, dict):
-                            print(f"      data包含键: {list(data.keys())}")
+                            if isinstance(data, dict):
+                                print(f"      data包含键: {list(data.keys())}")
                             
-                            # 查找第一个有数据的类型
-                            sample_item = None
-                            for major_type, major_info in data.items():
-                                if isinstance(major_info, dict):
-                                    items = major_info.get('item', [])
-                                    if items:
-                                        sample_item = items[0]
-                                        print(f"      招生类型: {major_type}")
-                                        print(f"      该类型数据条数: {len(items)}")
-                                        break
+                                # 查找第一个有数据的类型
+                                sample_item = None
+                                for major_type, major_info in data.items():
+                                    if isinstance(major_info, dict):
+                                        items = major_info.get('item', [])
+                                        if items:
+                                            sample_item = items[0]
+                                            print(f"      招生类型: {major_type}")
+                                            print(f"      该类型数据条数: {len(items)}")
+                                            break
                             
-                            if sample_item and isinstance(sample_item, dict):
-                                fields = list(sample_item.keys())
-                                print(f"\n      分数线数据字段({len(fields)}个):")
-                                print(f"      {'─'*50}")
-                                for i, field in enumerate(fields, 1):
-                                    value = sample_item[field]
-                                    value_type = type(value).__name__
-                                    # 显示值的预览
-                                    if value is None:
-                                        preview = "None"
-                                    elif isinstance(value, str):
-                                        preview = f'"{value[:25]}..."' if len(value) > 25 else f'"{value}"'
-                                    elif isinstance(value, (list, dict)):
-                                        preview = f"{value_type}({len(value)}项)"
-                                    else:
-                                        preview = str(value)
-                                    print(f"      {i:2}. {field:25} = {preview}")
-                                print(f"      {'─'*50}\n")
+                                if sample_item and isinstance(sample_item, dict):
+                                    fields = list(sample_item.keys())
+                                    print(f"\n      分数线数据字段({len(fields)}个):")
+                                    print(f"      {'─'*50}")
+                                    for i, field in enumerate(fields, 1):
+                                        value = sample_item[field]
+                                        value_type = type(value).__name__
+                                        # 显示值的预览
+                                        if value is None:
+                                            preview = "None"
+                                        elif isinstance(value, str):
+                                            preview = f'"{value[:25]}..."' if len(value) > 25 else f'"{value}"'
+                                        elif isinstance(value, (list, dict)):
+                                            preview = f"{value_type}({len(value)}项)"
+                                        else:
+                                            preview = str(value)
+                                        print(f"      {i:2}. {field:25} = {preview}")
+                                    print(f"      {'─'*50}\n")
                         
-                        self._first_logged = True
+                            self._first_logged = True
                     
-                    # 处理数据
-                    if data == 'no_data':
-                        # 该省份无招生，不记录
-                        continue
-                    elif data and isinstance(data, dict):
-                        # 遍历所有招生类型（普通类、中外合作等）
-                        for major_type, major_info in data.items():
-                            if not isinstance(major_info, dict):
-                                continue
-                                
-                            items = major_info.get('item', [])
-                            
-                            for item in items:
-                                if not isinstance(item, dict):
-                                    continue
-                                    
-                                score_info = {
-                                    # 基础标识
-                                    'school_id': school_id,
-                                    'year': year,
-                                    'province_id': province_id,
-                                    'province': province_name,
-                                    
-                                    # 招生类型
-                                    'major_type': major_type,  # 普通类、中外合作等
-                                    'batch': item.get('local_batch_name'),  # 招生批次
-                                    'type': item.get('type'),  # 科类
-                                    'recruit_type': item.get('zslx_name'),  # 录取类型
-                                    
-                                    # 专业信息
-                                    'major': item.get('sp_name') or item.get('spname'),
-                                    'major_code': item.get('spcode'),
-                                    'major_group': item.get('sg_name'),  # 专业组名称
-                                    'major_group_info': item.get('sg_info'),  # 专业组要求
-                                    
-                                    # 学科分类
-                                    'level1_name': item.get('level1_name'),
-                                    'level2_name': item.get('level2_name'),
-                                    'level3_name': item.get('level3_name'),
-                                    
-                                    # 分数信息
-                                    'min_score': item.get('min'),
-                                    'max_score': item.get('max'),
-                                    'avg_score': item.get('average') or item.get('avg'),
-                                    'min_rank': item.get('min_section'),  # 最低位次
-                                    'proscore': item.get('proscore'),  # 省控线
-                                    
-                                    # 招生人数
-                                    'enrollment': item.get('lq_num') or item.get('sg_info'),
-                                }
-                                all_scores.append(score_info)
-                                year_count += 1
-                                school_score_count += 1
+                        # 404 表示该省份无招生，不记录
+                        if raw is not None and raw[0] == 404:
+                            continue
                     
-                    # 控制频率
-                    if show_detail:
-                        print(f"      ✓ {province_name}: 获取数据")
+                        # 交给解析流水线（可能在子进程中解析）
+                        pending.append((province_id, pipeline.submit(raw, school_id, year, province_id, province_name, self.projection.fields)))
                     
-                    self.polite_sleep(1.5, 3.0)
+                        # 控制频率
+                        if show_detail:
+                            print(f"      ✓ {province_name}: 获取数据")
+                    
+                        if not prefetched:
+                            self.polite_sleep(1.5, 3.0)
                 
-                if year_count > 0:
-                    print(f"   ✓ {year}年: 获取 {year_count} 条分数线")
-                else:
-                    print(f"   ⚠️  {year}年: 无分数线数据")
+                    # 收集本年度的解析结果（抓取期间已在后台解析）
+                    for province_id, future in pending:
+                        _, records = future.result()
+                        if records:
+                            discovery.observe(school_id, province_id)
+                        all_scores.extend(records)
+                        year_count += len(records)
+                        school_score_count += len(records)
+                    
+                    if year_count > 0:
+                        print(f"   ✓ {year}年: 获取 {year_count} 条分数线")
+                    else:
+                        print(f"   ⚠️  {year}年: 无分数线数据")
             
-            if school_score_count > 0:
-                print(f"   ✅ 学校ID {school_id}：共 {school_score_count} 条分数线")
-            else:
-                print(f"   ⚠️  学校ID {school_id}：无分数线数据")
+                if school_score_count > 0:
+                    print(f"   ✅ 学校ID {school_id}：共 {school_score_count} 条分数线")
+                else:
+                    print(f"   ⚠️  学校ID {school_id}：无分数线数据")
             
-            # 学校间更长延迟
-            if idx < len(school_ids):
-                self.polite_sleep(4.0, 7.0)
+                # 学校间更长延迟
+                if idx < len(school_ids):
+                    self.polite_sleep(4.0, 7.0)
         
         # 保存数据
-        self.save_to_json(all_scores, 'scores.json')
+        discovery.save()
+        self.save_records(all_scores, 'scores.json')
+        self.save_views(score_views(all_scores))
         
         print(f"\n{'='*60}")
         print(f"✅ 分数线爬取完成！")
@@ -282,10 +330,171 @@ class ScoreCrawler(BaseCrawler):
                 y = score.get('year')
                 year_counts[y] = year_counts.get(y, 0) + 1
             print(f"   年份分布: {dict(sorted(year_counts.items(), reverse=True))}")
+        discovery.summary(len(years))
+        if self.failed_urls:
+            print(f"   ⚠️  重试后仍失败的请求: {len(self.failed_urls)} 个（数据可能不完整）")
         print(f"{'='*60}\n")
         
         return all_scores
+    
+    def watch(self, year=None, school_ids=None, province_ids=None, cycles=None, interval=None, max_requests=None):
+        """当年分数线监视模式（招生季使用）
+        
+        只轮询当年的 schoolspecialscore/{id}/{year}/{pid}.json，使用条件请求避免重复下载；
+        仍缺当年数据的学校优先检查，每轮最多 max_requests 个请求（包括省份发现的预探测）以保持访问频率；
+        发现新数据后及时合并进 scores.json 并发布。
+        """
+        year = str(year or os.getenv('WATCH_YEAR') or datetime.now().year)
+        cycles = int(cycles if cycles is not None else os.getenv('WATCH_CYCLES', '1'))
+        interval = float(interval if interval is not None else os.getenv('WATCH_INTERVAL', '600'))
+        max_requests = int(max_requests if max_requests is not None else os.getenv('WATCH_MAX_REQUESTS', '300'))
+        province_ids = province_ids or list(self.province_dict.keys())
+        
+        if school_ids is None:
+            school_ids = self.load_school_ids(int(os.getenv('SAMPLE_SCHOOLS', '999999')))
+            if not school_ids:
+                return []
+        
+        state_path = f'data/state/score_watch_{year}.json'
+        state = load_watch_state(state_path)
+        
+        print(f"\n{'='*60}")
+        print(f"开始监视 {year} 年分数线")
+        print(f"学校数: {len(school_ids)} | 省份: {len(province_ids)} 个 | 轮数: {cycles} | 每轮最多 {max_requests} 个请求")
+        print(f"{'='*60}\n")
+        
+        # 只轮询各学校实际招生的省份（轮到全量扫描的学校轮询全部省份）；
+        # 招生省份未知的学校需要预探测 info.json，按需进行并计入每轮的请求数
+        discovery = ProvinceDiscovery(self, province_ids)
+        school_provinces = {}
+        
+        published = []
+        for cycle in range(1, cycles + 1):
+            # 预探测最多占用每轮一半的请求，其余留给轮询；没轮到的学校在之后的轮次探测
+            probes = 0
+            for school_id in school_ids:
+                if school_id in school_provinces:
+                    continue
+                needs_probe = discovery.plan(school_id)[1]
+                if needs_probe and probes >= max(max_requests // 2, 1):
+                    continue
+                school_provinces[school_id] = discovery.provinces_for(school_id)[0]
+                probes += needs_probe
+            budget = max_requests - probes
+            
+            # 优先级：当年完全没有数据的学校 → 没有数据的省份 → 最久未检查的
+            school_has_data = {}
+            for school_id in school_ids:
+                school_has_data[school_id] = any(
+                    state.get(score_url(school_id, year, pid), {}).get('has_data') for pid in province_ids
+                )
+            
+            def priority(unit):
+                entry = state.get(score_url(unit[0], year, unit[1]), {})
+                return (school_has_data[unit[0]], bool(entry.get('has_data')), entry.get('checked', 0))
+            
+            units = sorted(((sid, pid) for sid in school_provinces for pid in school_provinces[sid]), key=priority)[:budget]
+            updates = {}
+            pending = {}
+            unchanged = 0
+            
+            print(f"[第 {cycle}/{cycles} 轮] 检查 {len(units)} 个文件" + (f"（另预探测招生省份 {probes} 所学校）" if probes else ""))
+            
+            for n, (school_id, province_id) in enumerate(units, 1):
+                url = score_url(school_id, year, province_id)
+                entry = state.setdefault(url, {})
+                
+                try:
+                    status_code, content, validators = self.fetch_conditional(url, entry.get('validators'))
+                except Exception as e:
+                    print(f"   ⚠️  请求异常: {str(e)}")
+                    continue
+                
+                entry['checked'] = time.time()
+                if status_code == 304:
+                    unchanged += 1
+                elif status_code == 404:
+                    entry['has_data'] = False
+                elif status_code == 200:
+                    digest = hashlib.sha1(content).hexdigest()
+                    if digest == entry.get('digest'):
+                        entry['validators'] = validators
+                        unchanged += 1
+                    else:
+                        data = peek((status_code, content))
+                        if isinstance(data, dict):
+                            province_name = self.province_dict.get(province_id, f'省份{province_id}')
+                            records = build_score_records(data, school_id, year, province_id, province_name, self.projection.fields)
+                            if records:
+                                discovery.observe(school_id, province_id)
+                                # 摘要和校验头在发布成功后才写入状态，否则下次会被当作未变化而永远不发布
+                                updates[(str(school_id), year, province_id)] = records
+                                pending[url] = (digest, validators)
+                                print(f"   🆕 学校ID {school_id} {province_name}: {len(records)} 条分数线")
+                
+                # 每50个请求发布一次，保证新数据几分钟内可见
+                if updates and n % 50 == 0:
+                    published.extend(self.flush_watch_updates(updates, pending, state, state_path))
+                    discovery.save(advance=False)
+                
+                self.polite_sleep(1.5, 3.0)
+            
+            # 最后一批（包括最后几个请求异常时剩下的更新）
+            if updates:
+                published.extend(self.flush_watch_updates(updates, pending, state, state_path))
+            save_watch_state(state_path, state)
+            discovery.save(advance=False)
+            covered = sum(1 for sid in school_ids if any(state.get(score_url(sid, year, pid), {}).get('has_data') for pid in province_ids))
+            print(f"   ✓ 第 {cycle} 轮完成：未变化 {unchanged} 个，已有当年数据的学校 {covered}/{len(school_ids)} 所")
+            
+            if cycle < cycles:
+                time.sleep(interval)
+        
+        discovery.save()
+        
+        print(f"\n{'='*60}")
+        print(f"✅ 监视结束！共发布 {len(published)} 条新分数线")
+        print(f"{'='*60}\n")
+        
+        return published
+    
+    def flush_watch_updates(self, updates, pending, state, state_path):
+        """发布一批监视到的更新，成功后才记录这些文件的摘要和校验头，然后清空本批"""
+        new_records = self.publish_scores(updates)
+        for url, (digest, validators) in pending.items():
+            entry = state.setdefault(url, {})
+            entry.update(has_data=True, digest=digest, validators=validators)
+        save_watch_state(state_path, state)
+        updates.clear()
+        pending.clear()
+        return new_records
+    
+    def publish_scores(self, updates):
+        """把 {(school_id, year, province_id): 记录列表} 合并进 scores.json（整体替换对应单元）并保存"""
+        all_scores = self.read_output('scores.json')
+        
+        all_scores = [
+            s for s in all_scores
+            if (str(s.get('school_id')), str(s.get('year')), s.get('province_id')) not in updates
+        ]
+        new_records = [r for records in updates.values() for r in records]
+        all_scores.extend(new_records)
+        
+        # 分区布局下只有涉及的 年份/省份 分区会被重写
+        self.save_records(all_scores, 'scores.json')
+        self.save_views(score_views(all_scores))
+        return new_records
 
 if __name__ == "__main__":
+    import sys
+    
+    # 支持 --profile / --profile-stats=PATH / --profile-stacks=PATH
+    argv, profile_options = parse_profile_args(sys.argv[1:])
+    
     crawler = ScoreCrawler()
-    crawler.crawl()
+    with profile_run(profile_options):
+        if argv and argv[0] == 'watch':
+            # 监视模式：python -m crawlers.scores watch [年份]
+            crawler.watch(year=argv[1] if len(argv) > 1 else None)
+        else:
+            crawler.crawl()
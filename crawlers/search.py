@@ -0,0 +1,198 @@
+import math
+import os
+import pickle
+import re
+
+SEARCH_DIR = 'data/search'
+
+# 学校：检索字段及权重、分面字段
+SCHOOL_FIELDS = {'name': 8.0, 'old_name': 4.0, 'label_list': 3.0, 'province': 2.0, 'city': 2.0, 'type': 1.5, 'level': 1.0, 'content': 0.3}
+SCHOOL_FACETS = ('province', 'type', 'nature', 'level', 'f985', 'f211')
+
+# 专业：检索字段及权重、分面字段
+MAJOR_FIELDS = {'name': 8.0, 'level3_name': 3.0, 'level2_name': 2.0, 'degree': 1.0}
+MAJOR_FACETS = ('level1_name', 'level2_name', 'level3_name')
+
+_TOKEN_RE = re.compile(r'[一-鿿]+|[a-z0-9]+')
+
+
+def tokenize(text, unigrams=True):
+    """中文按二元组（bigram）切分，可选同时产出单字；英文和数字按整词切分"""
+    tokens = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if run[0] >= '一':
+            if unigrams or len(run) == 1:
+                tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ' '.join(_text(v) for v in value)
+    return str(value)
+
+
+class SearchIndex:
+    """倒排索引 + 分面位图
+
+    postings: 词 -> {文档号: 加权词频}
+    facets:   字段 -> {取值: 位图}，位图用 Python 整数表示，第 i 位为 1 表示文档 i 取该值
+    """
+
+    def __init__(self, docs, fields, facets, key='name'):
+        self.docs = docs
+        self.key = key
+        self.postings = {}
+        self.facets = {f: {} for f in facets}
+
+        for doc_id, doc in enumerate(docs):
+            bit = 1 << doc_id
+            for facet in facets:
+                value = doc.get(facet)
+                if value is not None and value != '':
+                    values = self.facets[facet]
+                    values[str(value)] = values.get(str(value), 0) | bit
+
+            for field, weight in fields.items():
+                # 长文本只建二元组，控制索引体积
+                for token in tokenize(_text(doc.get(field)), unigrams=weight >= 1.0):
+                    posting = self.postings.setdefault(token, {})
+                    posting[doc_id] = posting.get(doc_id, 0.0) + weight
+
+        n = len(docs)
+        self.idf = {t: math.log(1 + n / len(p)) for t, p in self.postings.items()}
+
+    def facet_mask(self, filters):
+        """按分面条件求文档位图（同一字段多个取值为“或”，不同字段之间为“且”），无条件返回 None
+
+        字段不是分面时抛出 ValueError。
+        """
+        unknown = [field for field in filters if field not in self.facets]
+        if unknown:
+            raise ValueError(f"不支持的分面字段: {', '.join(unknown)}（可用: {', '.join(self.facets)}）")
+
+        mask = None
+        for field, value in filters.items():
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            bits = 0
+            for v in values:
+                bits |= self.facets[field].get(str(v), 0)
+            mask = bits if mask is None else mask & bits
+        return mask
+
+    def facet_counts(self, field, mask=None):
+        """某分面各取值的文档数（可限定在 mask 范围内）"""
+        return {
+            value: bin(bits if mask is None else bits & mask).count('1')
+            for value, bits in self.facets[field].items()
+        }
+
+    def search(self, query='', limit=10, **filters):
+        """关键词检索，返回 [(得分, 文档)]，按得分降序；query 为空时只做分面过滤"""
+        mask = self.facet_mask(filters)
+
+        terms = []
+        for run in _TOKEN_RE.findall(query.lower()):
+            terms.extend(tokenize(run, unigrams=len(run) == 1))
+
+        if not terms:
+            ids = range(len(self.docs)) if mask is None else _bits(mask)
+            return [(0.0, self.docs[i]) for i in list(ids)[:limit]]
+
+        scores = {}
+        for term in set(terms):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in posting.items():
+                if mask is not None and not (mask >> doc_id) & 1:
+                    continue
+                # tf 是按字段权重加权的词频，低权重字段（如 content 0.3）可能小于 1，用 log1p 保证得分为正
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * math.log1p(tf)
+
+        # 完整命中检索字段（如学校名）的额外加分
+        needle = query.strip().lower()
+        for doc_id in scores:
+            name = _text(self.docs[doc_id].get(self.key)).lower()
+            if name == needle:
+                scores[doc_id] += 100.0
+            elif needle and needle in name:
+                scores[doc_id] += 10.0
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [(round(score, 3), self.docs[doc_id]) for doc_id, score in ranked]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def _bits(mask):
+    doc_id = 0
+    while mask:
+        if mask & 1:
+            yield doc_id
+        mask >>= 1
+        doc_id += 1
+
+
+def build_school_index(schools):
+    return SearchIndex(schools, SCHOOL_FIELDS, SCHOOL_FACETS)
+
+
+def build_major_index(majors):
+    return SearchIndex(majors, MAJOR_FIELDS, MAJOR_FACETS)
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    import time
+
+    usage = "用法: python -m crawlers.search build | python -m crawlers.search schools|majors <关键词> [字段=取值 ...]"
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == 'build':
+        for name, build in (('schools', build_school_index), ('majors', build_major_index)):
+            with open(f'data/{name}.json', 'r', encoding='utf-8') as f:
+                docs = json.load(f).get('data', [])
+            index = build(docs)
+            index.save(f'{SEARCH_DIR}/{name}.idx')
+            print(f"✓ {name}: {len(docs)} 条，{len(index.postings)} 个词，已保存到 {SEARCH_DIR}/{name}.idx")
+    elif sys.argv[1] in ('schools', 'majors'):
+        index = SearchIndex.load(f'{SEARCH_DIR}/{sys.argv[1]}.idx')
+        query = ' '.join(a for a in sys.argv[2:] if '=' not in a)
+        filters = dict(a.split('=', 1) for a in sys.argv[2:] if '=' in a)
+
+        t0 = time.perf_counter()
+        try:
+            results = index.search(query, **filters)
+        except ValueError as e:
+            print(f"⚠️  {e}")
+            sys.exit(1)
+        elapsed = (time.perf_counter() - t0) * 1e6
+
+        for score, doc in results:
+            print(f"   {score:8.2f}  {doc.get('name')}")
+        print(f"共 {len(results)} 条，耗时 {elapsed:.0f} 微秒")
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,242 @@
+import os
+from .base import BaseCrawler, decode_static
+from .profiler import parse_profile_args, profile_run
+from .quality import TYPE_NAMES
+from .views import to_int
+
+# 一分一段表接口（可用 SECTION_URL 覆盖，占位符 {year} {province_id} {type}）
+SECTION_URL = "https://static-data.gaokao.cn/www/2.0/section2021/{year}/{province_id}/{type}/3/lists.json"
+
+# 按此顺序尝试科类：新高考省份有 2073/2074，其余为文理分科（1/2）或不分科（3）
+TYPE_ORDER = ('2073', '2074', '1', '2', '3')
+
+
+def section_url(year, province_id, type_code):
+    return os.getenv('SECTION_URL', SECTION_URL).format(year=year, province_id=province_id, type=type_code)
+
+
+def known_types(tables):
+    """已有 sections.json 中各省各年份找到的科类：{省份ID: {年份: {科类, ...}}}"""
+    known = {}
+    for table in tables:
+        known.setdefault(str(table.get('province_id')), {}).setdefault(str(table.get('year')), set()).add(str(table.get('type')))
+    return known
+
+
+def preferred_types(known, year, province_id):
+    """优先尝试的科类（按 TYPE_ORDER 排列）：同一年份已知的科类，否则取最近年份的；都没有时返回空元组"""
+    by_year = known.get(str(province_id)) or {}
+    types = by_year.get(str(year))
+    if types is None and by_year:
+        types = by_year[max(by_year, key=lambda y: int(y) if y.isdigit() else 0)]
+    return tuple(t for t in TYPE_ORDER if t in (types or ()))
+
+
+def skip_type(type_code, found):
+    """新高考省份不再有文理分科表；文理分科省份没有综合表"""
+    return (type_code in ('1', '2') and bool({'2073', '2074'} & set(found))) or (type_code == '3' and bool(found))
+
+
+def build_section_table(data, year, province_id, province_name, type_code):
+    """把一分一段表响应转换为一条记录：分数降序数组 scores 与对应的累计位次数组 ranks
+
+    ranks[i] 为分数不低于 scores[i] 的考生人数（即该分数的最低位次）。
+    每行的累计人数优先取 total，其次取 rank_range 的上界，都没有时按 num 累加。
+    """
+    items = data.get('list', data.get('item')) if isinstance(data, dict) else data
+    if isinstance(items, dict):
+        items = items.get('item') or items.get('list') or []
+    if not isinstance(items, list):
+        return None
+
+    rows = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        # 最高分段可能是 "700-750" 这样的区间，按下界计
+        score = to_int(str(item.get('score', '')).split('-')[0])
+        if score is None:
+            continue
+        total = to_int(item.get('total'))
+        if total is None and item.get('rank_range'):
+            total = to_int(str(item['rank_range']).split('-')[-1])
+        rows[score] = (total, to_int(item.get('num')) or 0)
+
+    if not rows:
+        return None
+
+    scores = sorted(rows, reverse=True)
+    ranks = []
+    cumulative = 0
+    for score in scores:
+        total, num = rows[score]
+        cumulative = total if total is not None else cumulative + num
+        # 累计人数必须单调不减
+        ranks.append(max(cumulative, ranks[-1]) if ranks else cumulative)
+
+    return {
+        'year': str(year),
+        'province_id': str(province_id),
+        'province': province_name,
+        'type': str(type_code),
+        'type_name': TYPE_NAMES.get(str(type_code)),
+        'max_score': scores[0],
+        'min_score': scores[-1],
+        'total': ranks[-1],
+        'scores': scores,
+        'ranks': ranks,
+    }
+
+
+class SectionCrawler(BaseCrawler):
+
+    dataset = 'sections'
+
+    def __init__(self):
+        super().__init__()
+
+        # 省份ID映射（港澳台不参加高考，不在此列）
+        self.province_dict = {
+            # 华北地区
+            '11': '北京',
+            '12': '天津',
+            '13': '河北',
+            '14': '山西',
+            '15': '内蒙古',
+
+            # 东北地区
+            '21': '辽宁',
+            '22': '吉林',
+            '23': '黑龙江',
+
+            # 华东地区
+            '31': '上海',
+            '32': '江苏',
+            '33': '浙江',
+            '34': '安徽',
+            '35': '福建',
+            '36': '江西',
+            '37': '山东',
+
+            # 华中地区
+            '41': '河南',
+            '42': '湖北',
+            '43': '湖南',
+
+            # 华南地区
+            '44': '广东',
+            '45': '广西',
+            '46': '海南',
+
+            # 西南地区
+            '50': '重庆',
+            '51': '四川',
+            '52': '贵州',
+            '53': '云南',
+            '54': '西藏',
+
+            # 西北地区
+            '61': '陕西',
+            '62': '甘肃',
+            '63': '青海',
+            '64': '宁夏',
+            '65': '新疆',
+        }
+
+    def get_section_table(self, year, province_id, type_code):
+        """获取某年某省某科类的一分一段表，无此表返回'no_data'，失败返回None"""
+        try:
+            data = decode_static(*self.fetch_static(section_url(year, province_id, type_code)))
+        except Exception as e:
+            print(f"   ⚠️  请求异常: {str(e)}")
+            return None
+
+        if data in (None, 'no_data'):
+            return data
+        province_name = self.province_dict.get(province_id, f'省份{province_id}')
+        return build_section_table(data, year, province_id, province_name, type_code) or 'no_data'
+
+    def resolve_years(self, years=None):
+        """本次爬取的年份（SECTION_YEARS，默认近三年）"""
+        if years is None:
+            years = [y.strip() for y in os.getenv('SECTION_YEARS', '2025,2024,2023').split(',') if y.strip()]
+        return years
+
+    def crawl_province_year(self, year, province_id, preferred=()):
+        """爬取某年某省的全部科类表，返回 [(科类, 表), ...]
+
+        先尝试 preferred（已知该省有的科类），全部找到时不再尝试其他科类，通常只需 2 个（文理分科、新高考）
+        或 1 个（不分科）请求；有没找到的（如该省当年改为新高考）再按 TYPE_ORDER 尝试其余科类。
+        """
+        found = []
+        tried = set()
+
+        def attempt(type_code):
+            tried.add(type_code)
+            table = self.get_section_table(year, province_id, type_code)
+            self.polite_sleep(1.5, 3.0)
+            if isinstance(table, dict):
+                found.append((type_code, table))
+
+        for type_code in preferred:
+            attempt(type_code)
+        if not preferred or len(found) < len(preferred):
+            for type_code in TYPE_ORDER:
+                if type_code not in tried and not skip_type(type_code, [t for t, _ in found]):
+                    attempt(type_code)
+
+        return sorted(found, key=lambda pair: TYPE_ORDER.index(pair[0]))
+
+    def crawl(self, years=None, province_ids=None):
+        """爬取各省一分一段表"""
+        years = self.resolve_years(years)
+        province_ids = province_ids or list(self.province_dict.keys())
+        # 已有输出中各省的科类，用来决定先请求哪些表
+        known = known_types(self.read_output('sections.json'))
+
+        tables = []
+
+        print(f"\n{'='*60}")
+        print(f"开始爬取一分一段表")
+        print(f"年份: {', '.join(years)} | 省份: {len(province_ids)} 个")
+        print(f"{'='*60}\n")
+
+        for year in years:
+            for province_id in province_ids:
+                province_name = self.province_dict.get(province_id, f'省份{province_id}')
+                found = []
+
+                for type_code, table in self.crawl_province_year(year, province_id,
+                                                                 preferred_types(known, year, province_id)):
+                    found.append(type_code)
+                    tables.append(self.projection.apply(table))
+
+                if found:
+                    names = '、'.join(TYPE_NAMES[t] for t in found)
+                    print(f"   ✓ {year} {province_name}: {names}")
+                else:
+                    print(f"   ⚠️  {year} {province_name}: 无一分一段表")
+
+        self.save_to_json(tables, 'sections.json')
+
+        print(f"\n{'='*60}")
+        print(f"✅ 一分一段表爬取完成！")
+        print(f"   总计: {len(tables)} 张表")
+        if tables:
+            print(f"   分数段: {sum(len(t.get('scores') or []) for t in tables)} 个")
+        if self.failed_urls:
+            print(f"   ⚠️  重试后仍失败的请求: {len(self.failed_urls)} 个（数据可能不完整）")
+        print(f"{'='*60}\n")
+
+        return tables
+
+if __name__ == "__main__":
+    import sys
+
+    # 支持年份参数（以及 --profile / --profile-stats=PATH / --profile-stacks=PATH）
+    argv, profile_options = parse_profile_args(sys.argv[1:])
+    years_arg = argv[0].split(',') if argv else None
+
+    crawler = SectionCrawler()
+    with profile_run(profile_options):
+        crawler.crawl(years=years_arg)
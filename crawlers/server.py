@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from .partitions import PartitionStore, read_dataset
+
+DATA_FILES = ('schools.json', 'scores.json', 'plans.json', 'majors.json')
+
+
+def _load(data_dir, filename):
+    return list(read_dataset(filename, data_dir))
+
+
+def _version_path(data_dir, filename):
+    """数据集的版本依据：分区输出看 manifest.json，否则看数据文件本身"""
+    store = PartitionStore(filename.split('.')[0], data_dir)
+    return store.manifest_path if store.exists() else os.path.join(data_dir, filename)
+
+
+def _group_by_school(records):
+    """school_id -> {(year, province_id): [记录]}"""
+    index = {}
+    for r in records:
+        by_key = index.setdefault(str(r.get('school_id')), {})
+        by_key.setdefault((str(r.get('year')), str(r.get('province_id'))), []).append(r)
+    return index
+
+
+class Snapshot:
+    """某一时刻全部数据集的只读内存索引；更新时整体替换，不原地修改"""
+
+    def __init__(self, data_dir):
+        self.versions = _file_versions(data_dir)
+        self.loaded_at = time.strftime('%Y-%m-%d %H:%M:%S')
+
+        schools = _load(data_dir, 'schools.json')
+        self.schools = {str(s.get('school_id')): s for s in schools}
+        self.scores = _group_by_school(_load(data_dir, 'scores.json'))
+        self.plans = _group_by_school(_load(data_dir, 'plans.json'))
+
+        majors = _load(data_dir, 'majors.json')
+        self.majors = {}
+        for m in majors:
+            for key in (m.get('code'), m.get('special_id')):
+                if key:
+                    self.majors.setdefault(str(key), m)
+
+    def select(self, index, school_id, year=None, province_id=None):
+        by_key = index.get(str(school_id), {})
+        if year is not None and province_id is not None:
+            return by_key.get((str(year), str(province_id)), [])
+        return [
+            r for (y, p), records in by_key.items()
+            if (year is None or y == str(year)) and (province_id is None or p == str(province_id))
+            for r in records
+        ]
+
+
+def _file_versions(data_dir):
+    versions = {}
+    for filename in DATA_FILES:
+        try:
+            st = os.stat(_version_path(data_dir, filename))
+            versions[filename] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            versions[filename] = None
+    return versions
+
+
+class DataService:
+    """持有当前快照，后台线程监视数据文件，变化后构建新快照并原子替换"""
+
+    def __init__(self, data_dir='data', poll_interval=5.0):
+        self.data_dir = data_dir
+        self.poll_interval = poll_interval
+        self.snapshot = Snapshot(data_dir)
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            if _file_versions(self.data_dir) == self.snapshot.versions:
+                continue
+            # 等文件写完（大小和修改时间稳定）再加载
+            time.sleep(min(self.poll_interval, 1.0))
+            try:
+                snapshot = Snapshot(self.data_dir)
+            except (ValueError, OSError) as e:
+                print(f"⚠️  重新加载数据失败，继续使用旧版本: {e}")
+                continue
+            self.snapshot = snapshot  # 引用赋值是原子的，正在处理的请求继续使用旧快照
+            print(f"✓ 数据已重新加载 ({snapshot.loaded_at})")
+
+
+def make_handler(service):
+    class QueryHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 支持长连接
+        disable_nagle_algorithm = True  # 响应头和响应体分开发送，避免 Nagle + 延迟ACK 带来的 40ms 等待
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            parts = [p for p in url.path.split('/') if p]
+            snapshot = service.snapshot  # 整个请求只使用同一个快照
+
+            if parts == ['health']:
+                return self.reply(200, {'loaded_at': snapshot.loaded_at, 'versions': snapshot.versions})
+            if len(parts) == 2 and parts[0] == 'schools':
+                school = snapshot.schools.get(parts[1])
+                return self.reply(200, school) if school else self.reply(404, {'error': '学校不存在'})
+            if len(parts) == 2 and parts[0] == 'majors':
+                major = snapshot.majors.get(parts[1])
+                return self.reply(200, major) if major else self.reply(404, {'error': '专业不存在'})
+            if len(parts) == 1 and parts[0] in ('scores', 'plans'):
+                if 'school_id' not in params:
+                    return self.reply(400, {'error': '缺少 school_id 参数'})
+                index = snapshot.scores if parts[0] == 'scores' else snapshot.plans
+                records = snapshot.select(index, params['school_id'], params.get('year'), params.get('province_id'))
+                return self.reply(200, {'count': len(records), 'data': records})
+
+            self.reply(404, {'error': '未知路径'})
+
+        def reply(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # 高并发下不逐条打印访问日志
+
+    return QueryHandler
+
+
+def serve(host='127.0.0.1', port=8000, data_dir='data'):
+    service = DataService(data_dir)
+    service.start()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return service, server
+
+
+def benchmark(data_dir='data', concurrency=32, requests_per_client=200):
+    """在本地启动服务并用多个长连接客户端并发查询，打印QPS和延迟分位数"""
+    import http.client
+
+    service, server = serve(port=0, data_dir=data_dir)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    snapshot = service.snapshot
+    paths = [f'/schools/{sid}' for sid in list(snapshot.schools)[:50]]
+    for sid, by_key in list(snapshot.scores.items())[:50]:
+        for year, province_id in list(by_key)[:5]:
+            paths.append(f'/scores?school_id={sid}&year={year}&province_id={province_id}')
+    paths.extend(f'/majors/{code}' for code in list(snapshot.majors)[:50])
+    if not paths:
+        paths = ['/health']
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client(n):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        local = []
+        for i in range(requests_per_client):
+            path = paths[(n * requests_per_client + i) % len(paths)]
+            t0 = time.perf_counter()
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            local.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    server.shutdown()
+    service.stop()
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"\n{'='*60}")
+    print(f"查询服务压测：{concurrency} 个并发连接，共 {total} 个请求")
+    print(f"   QPS: {total / elapsed:.0f}")
+    for p in (50, 90, 99):
+        print(f"   p{p}: {latencies[min(total - 1, total * p // 100)] * 1000:.2f} ms")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(concurrency=int(sys.argv[2]) if len(sys.argv) > 2 else 32)
+    else:
+        port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv('PORT', '8000'))
+        service, server = serve(port=port)
+        print(f"✓ 查询服务已启动: http://127.0.0.1:{port}")
+        print(f"   /schools/<id>  /majors/<code>  /scores?school_id=&year=&province_id=  /plans?...  /health")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,184 @@
+"""数据文件的原子写入与版本快照
+
+data/{filename}                  最新版本（原子替换，读者永远不会读到写了一半的文件）
+data/snapshots/objects/{hash}    按内容哈希保存的不可变副本
+data/snapshots/manifests/{ver}   某个版本下每个文件对应的哈希、大小、记录数
+data/snapshots/CURRENT           最新版本号
+
+内容哈希不包含 update_time，数据没有变化时既不重写文件也不产生新版本。
+读者可以用 SnapshotReader 固定在某个版本上，不受之后写入的影响。
+"""
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+SNAPSHOT_DIR = 'snapshots'
+UPDATE_TIME_PLACEHOLDER = '"update_time": ""'
+
+
+@contextmanager
+def atomic_open(path, mode='wb'):
+    """写临时文件 → fsync → rename → fsync目录，任何时刻 path 要么是旧内容要么是新内容"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    try:
+        with open(tmp_path, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, content):
+    with atomic_open(path) as f:
+        f.write(content)
+
+
+def content_hash(body):
+    """去掉 update_time 后的内容哈希"""
+    head, sep, tail = body.partition(b'"update_time": "')
+    if sep:
+        tail = tail[tail.index(b'"'):]
+    return hashlib.sha256(head + sep + tail).hexdigest()
+
+
+class SnapshotStore:
+    def __init__(self, data_dir='data', keep=None):
+        self.data_dir = data_dir
+        self.root = os.path.join(data_dir, SNAPSHOT_DIR)
+        self.keep = int(keep if keep is not None else os.getenv('SNAPSHOT_KEEP', '5'))
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, 'CURRENT'), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version=None):
+        version = version or self.current_version()
+        if version is None:
+            return {'version': None, 'files': {}}
+        with open(os.path.join(self.root, 'manifests', f'{version}.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest)
+
+    def save(self, data, filename):
+        """保存一个数据集；内容未变化时返回 False（不写文件、不产生新版本）
+
+        .jsonl 文件每行一条记录，不含 update_time/count 信封。
+        """
+        filepath = os.path.join(self.data_dir, filename)
+        update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        jsonl = filename.endswith('.jsonl')
+
+        if jsonl:
+            body = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in data).encode('utf-8')
+            digest = hashlib.sha256(body).hexdigest()
+        else:
+            body = json.dumps({
+                'update_time': '',
+                'count': len(data),
+                'data': data
+            }, ensure_ascii=False, indent=2).encode('utf-8')
+            digest = hashlib.sha256(body).hexdigest()
+            body = body.replace(UPDATE_TIME_PLACEHOLDER.encode(), f'"update_time": "{update_time}"'.encode(), 1)
+
+        with self._locked():
+            # 与现有文件比较（不依赖快照记录，刚检出的仓库同样适用）
+            if os.path.exists(filepath):
+                with open(filepath, 'rb') as f:
+                    previous = f.read()
+                if (hashlib.sha256(previous).hexdigest() if jsonl else content_hash(previous)) == digest:
+                    return False
+
+            atomic_write(filepath, body)
+            if self.keep <= 0:
+                return True
+
+            if not os.path.exists(self.object_path(digest)):
+                atomic_write(self.object_path(digest), body)
+
+            manifest = self.manifest()
+            files = dict(manifest['files'])
+            files[filename] = {'sha256': digest, 'size': len(body), 'count': len(data), 'update_time': update_time}
+            version = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{digest[:8]}"
+            atomic_write(
+                os.path.join(self.root, 'manifests', f'{version}.json'),
+                json.dumps({'version': version, 'parent': manifest['version'], 'files': files},
+                           ensure_ascii=False, indent=2).encode('utf-8'),
+            )
+            atomic_write(os.path.join(self.root, 'CURRENT'), version.encode('utf-8'))
+            self._prune()
+        return True
+
+    def _prune(self):
+        """只保留最近 keep 个版本，以及它们引用的对象"""
+        manifest_dir = os.path.join(self.root, 'manifests')
+        versions = sorted(name[:-5] for name in os.listdir(manifest_dir) if name.endswith('.json'))
+        for version in versions[:-self.keep]:
+            os.remove(os.path.join(manifest_dir, f'{version}.json'))
+
+        referenced = set()
+        for version in versions[-self.keep:]:
+            referenced.update(e['sha256'] for e in self.manifest(version)['files'].values())
+        object_dir = os.path.join(self.root, 'objects')
+        for digest in os.listdir(object_dir):
+            if digest not in referenced and '.tmp.' not in digest:
+                os.remove(os.path.join(object_dir, digest))
+
+
+class SnapshotReader:
+    """固定在某个快照版本上的读者（默认创建时的最新版本）
+
+    同一个读者读到的所有文件来自同一版本；没有快照时退回读取 data/ 下的文件。
+    """
+
+    def __init__(self, data_dir='data', version=None):
+        self.store = SnapshotStore(data_dir)
+        self.manifest = self.store.manifest(version)
+        self.version = self.manifest['version']
+
+    def load(self, filename):
+        """读取数据集，返回 {'update_time', 'count', 'data'}"""
+        entry = self.manifest['files'].get(filename)
+        path = self.store.object_path(entry['sha256']) if entry else os.path.join(self.store.data_dir, filename)
+        with open(path, 'r', encoding='utf-8') as f:
+            if not filename.endswith('.jsonl'):
+                return json.load(f)
+            records = [json.loads(line) for line in f if line.strip()]
+        return {'update_time': entry and entry['update_time'], 'count': len(records), 'data': records}
+
+
+if __name__ == "__main__":
+    store = SnapshotStore()
+    manifest = store.manifest()
+    print(f"当前版本: {manifest['version']}")
+    for filename, entry in sorted(manifest['files'].items()):
+        print(f"   {filename:40} {entry['sha256'][:12]}  {entry['count']:>8} 条  {entry['update_time']}")
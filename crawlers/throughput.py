@@ -0,0 +1,97 @@
+"""网络请求吞吐量记录（data/state/throughput.json）
+
+实际发出的每个网络请求（回放的不算）按接口类别累计请求数、响应字节数、请求耗时和 404 数；
+限速等待累计实际等待秒数和名义等待秒数（区间中值），两者之比就是限流时延迟被放大的倍数。
+只记录真实接口主机（API_HOSTS）的请求，本地模拟服务（如 python -m crawlers.transport bench）不计入。
+进程退出时合并进状态文件，超过 THROUGHPUT_WINDOW 次请求的历史按比例衰减，使估算偏向最近的运行。
+crawlers.planner 用这些数据估算一次运行的请求量、下载量和耗时。
+"""
+import atexit
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+from .storage import atomic_write
+
+DEFAULT_PATH = 'data/state/throughput.json'
+API_HOSTS = ('api.zjzw.cn', 'static-data.gaokao.cn')
+FIELDS = ('requests', 'bytes', 'seconds', 'not_found')
+
+
+def kind_of(url, payload=None):
+    """接口类别：POST 为 uri 的最后两段（如 school/lists），静态文件为 2.0/ 之后的第一段（如 schoolspecialscore）；
+    不是真实接口主机时返回 None
+    """
+    if urlsplit(url).hostname not in API_HOSTS:
+        return None
+    if payload is not None:
+        return '/'.join(str(payload.get('uri', '')).split('/')[-2:])
+    parts = url.split('/')
+    return parts[5] if len(parts) > 5 else parts[-1]
+
+
+class ThroughputLog:
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('THROUGHPUT_LOG', DEFAULT_PATH)
+        self.enabled = self.path.lower() not in ('', '0', 'off', 'false', 'no')
+        self.kinds = {}
+        self.sleep = {'seconds': 0.0, 'nominal': 0.0}
+        self._lock = threading.Lock()
+        self._registered = False
+
+    def record(self, kind, status_code, size, seconds):
+        """记录一次网络请求（kind 为 None 时忽略）"""
+        if not self.enabled or kind is None:
+            return
+        with self._lock:
+            entry = self.kinds.setdefault(kind, dict.fromkeys(FIELDS, 0))
+            entry['requests'] += 1
+            entry['bytes'] += size
+            entry['seconds'] += seconds
+            entry['not_found'] += status_code == 404
+            if not self._registered:
+                atexit.register(self.save)
+                self._registered = True
+
+    def record_sleep(self, seconds, nominal):
+        """记录一次限速等待（nominal 为不考虑限流时的期望等待）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.sleep['seconds'] += seconds
+            self.sleep['nominal'] += nominal
+
+    def load(self):
+        """读取历史记录 {'kinds': {类别: {...}}, 'sleep': {...}}，不存在时返回空记录"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'kinds': {}, 'sleep': {'seconds': 0.0, 'nominal': 0.0}}
+
+    def save(self):
+        """把本进程的记录合并进状态文件"""
+        with self._lock:
+            if not self.enabled or not self.kinds:
+                return
+            history = self.load()
+            window = int(os.getenv('THROUGHPUT_WINDOW', '20000'))
+
+            for kind, entry in self.kinds.items():
+                old = history['kinds'].get(kind, dict.fromkeys(FIELDS, 0))
+                decay = min(1.0, window / old['requests']) if old['requests'] else 1.0
+                history['kinds'][kind] = {f: round(old[f] * decay + entry[f], 3) for f in FIELDS}
+
+            old = history['sleep']
+            decay = min(1.0, window * 3.0 / old['nominal']) if old['nominal'] else 1.0
+            history['sleep'] = {f: round(old[f] * decay + self.sleep[f], 3) for f in ('seconds', 'nominal')}
+
+            body = json.dumps({'kinds': dict(sorted(history['kinds'].items())), 'sleep': history['sleep']},
+                              ensure_ascii=False, indent=2)
+            atomic_write(self.path, body.encode('utf-8'))
+            self.kinds = {}
+            self.sleep = {'seconds': 0.0, 'nominal': 0.0}
+
+
+throughput = ThroughputLog()
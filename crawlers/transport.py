@@ -0,0 +1,169 @@
+"""静态数据文件的传输后端
+
+static-data.gaokao.cn 上的文件都是很小的JSON，耗时主要在请求往返上。
+BaseCrawler 的 GET 请求都经过这里的 transport：
+
+    requests  默认，使用 requests.Session（HTTP/1.1 连接池）
+    http2     使用 httpx 的 HTTP/2 客户端，多个并发请求复用少量连接（需安装 httpx[http2]）
+
+通过环境变量 CRAWL_TRANSPORT 选择，STATIC_CONNECTIONS 控制每个主机的连接数，
+STATIC_CONCURRENCY 控制 BaseCrawler.prefetch_static 的并发请求数。
+"""
+import importlib.util
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RequestsTransport:
+    name = 'requests'
+    errors = (requests.exceptions.RequestException,)
+
+    def __init__(self, session, connections=None):
+        self.session = session
+        if connections:
+            # pool_block: 并发请求数超过连接数时排队等待空闲连接，而不是新建后丢弃
+            adapter = HTTPAdapter(pool_connections=connections, pool_maxsize=connections, pool_block=True)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+
+    def get(self, url, timeout=10, headers=None):
+        return self.session.get(url, timeout=timeout, headers=headers)
+
+    def close(self):
+        self.session.close()
+
+
+class Http2Transport:
+    name = 'http2'
+
+    def __init__(self, headers=None, connections=2):
+        import httpx
+
+        self.errors = (httpx.HTTPError,)
+        self.client = httpx.Client(
+            http2=True,
+            headers=headers,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            follow_redirects=True,
+        )
+
+    def get(self, url, timeout=10, headers=None):
+        return self.client.get(url, timeout=timeout, headers=headers)
+
+    def close(self):
+        self.client.close()
+
+
+def http2_available():
+    return importlib.util.find_spec('httpx') is not None and importlib.util.find_spec('h2') is not None
+
+
+def make_transport(session, name=None, connections=None):
+    """按 CRAWL_TRANSPORT 创建传输后端；http2 不可用时退回 requests
+
+    connections 默认取 STATIC_CONNECTIONS；未设置时 requests 后端按 STATIC_CONCURRENCY 调整连接池，
+    http2 后端默认 2 个连接。
+    """
+    name = (name or os.getenv('CRAWL_TRANSPORT', 'requests')).lower()
+    connections = int(connections or os.getenv('STATIC_CONNECTIONS', '0')) or None
+
+    if name == 'http2':
+        if http2_available():
+            return Http2Transport(dict(session.headers), connections or 2)
+        print("⚠️  未安装 httpx[http2]，静态文件请求改用 requests")
+    elif name != 'requests':
+        print(f"⚠️  未知的传输后端: {name}，使用 requests")
+
+    # HTTP/1.1 每个在途请求占用一个连接，连接池至少要容纳 STATIC_CONCURRENCY 个并发请求
+    concurrency = int(os.getenv('STATIC_CONCURRENCY', '1'))
+    return RequestsTransport(session, connections or (concurrency if concurrency > 1 else None))
+
+
+def mock_server(latency=0.02, body=None):
+    """本地模拟 static-data 服务：任何路径都在 latency 秒后返回同一个小JSON，并统计连接数"""
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    payload = body or json.dumps({'code': '0000', 'data': {'1_1': {'item': [{'min': 600}] * 20}}}).encode('utf-8')
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with self.server.lock:
+                self.server.connections += 1
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark(total=300, concurrency=16, latency=0.02):
+    """在本地模拟服务上比较：逐个请求（现有路径） vs 并发预取（requests / http2）"""
+    import time
+    from .base import BaseCrawler
+
+    server = mock_server(latency)
+    base = f'http://127.0.0.1:{server.server_address[1]}/www/2.0/schoolspecialscore'
+    urls = [f'{base}/{n // 34}/2025/{n % 34}.json' for n in range(total)]
+
+    cases = [('requests 逐个请求', 'requests', 1), (f'requests 并发 {concurrency}', 'requests', concurrency)]
+    if http2_available():
+        # 模拟服务只支持明文 HTTP/1.1，httpx 会协商为 HTTP/1.1；对 HTTPS 的 CDN 才会使用 HTTP/2
+        cases.append((f'http2 并发 {concurrency}', 'http2', concurrency))
+
+    print(f"\n{'='*60}")
+    print(f"传输后端压测：{total} 个请求，模拟往返延迟 {latency * 1000:.0f} ms")
+    for label, name, workers in cases:
+        crawler = BaseCrawler()
+        # HTTP/1.1 每个在途请求占用一个连接；HTTP/2 用默认的 2 个连接承载全部并发请求
+        crawler.transport = make_transport(crawler.session, name, connections=workers if name == 'requests' else None)
+        before = server.connections
+
+        started = time.perf_counter()
+        if workers == 1:
+            for url in urls:
+                crawler.fetch_static(url)
+        else:
+            crawler.prefetch_static(urls, concurrency=workers, sleep=False)
+        elapsed = time.perf_counter() - started
+
+        crawler.transport.close()
+        print(f"   {label:24} {total / elapsed:8.0f} 请求/秒  耗时 {elapsed:6.2f} 秒  新建连接 {server.connections - before}")
+    print(f"{'='*60}\n")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        args = sys.argv[2:]
+        benchmark(
+            total=int(args[0]) if len(args) > 0 else 300,
+            concurrency=int(args[1]) if len(args) > 1 else 16,
+            latency=float(args[2]) / 1000 if len(args) > 2 else 0.02,
+        )
+    else:
+        print("用法: python -m crawlers.transport bench [请求数] [并发数] [延迟毫秒]")
+        sys.exit(1)
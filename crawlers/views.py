@@ -0,0 +1,170 @@
+import json
+import os
+
+VIEWS_DIR = 'data/views'
+
+
+def to_int(value):
+    """把分数/位次/人数等字段转成整数，无法转换时返回None"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    try:
+        return int(float(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def score_views(scores):
+    """从 scores.json 记录计算聚合表
+
+    score_min_by_school: 每所学校×省份×年份的最低分（以及该最低分对应的位次和专业）
+    """
+    groups = {}
+    for s in scores:
+        key = (s.get('school_id'), s.get('province_id'), s.get('year'))
+        row = groups.get(key)
+        if row is None:
+            row = groups[key] = {
+                'school_id': key[0],
+                'province_id': key[1],
+                'province': s.get('province'),
+                'year': key[2],
+                'min_score': None,
+                'min_rank': None,
+                'major': None,
+                'record_count': 0,
+            }
+        row['record_count'] += 1
+
+        score = to_int(s.get('min_score'))
+        if score is None or score <= 0:
+            continue
+        if row['min_score'] is None or score < row['min_score']:
+            row['min_score'] = score
+            row['min_rank'] = to_int(s.get('min_rank'))
+            row['major'] = s.get('major')
+
+    return {
+        'score_min_by_school': [groups[k] for k in sorted(groups, key=_sort_key)],
+    }
+
+
+def plan_views(plans):
+    """从 plans.json 记录计算聚合表
+
+    plan_total_by_school: 每所学校×年份的计划招生总数、专业数、省份数
+    plan_majors_by_level2: 每个学科门类×年份的专业数和计划招生总数
+    """
+    schools = {}
+    level2 = {}
+    for p in plans:
+        number = to_int(p.get('plan_number')) or 0
+        major = p.get('major_code') or p.get('major')
+
+        key = (p.get('school_id'), p.get('year'))
+        row = schools.get(key)
+        if row is None:
+            row = schools[key] = {'school_id': key[0], 'year': key[1], 'plan_total': 0, 'majors': set(), 'provinces': set()}
+        row['plan_total'] += number
+        row['majors'].add(major)
+        row['provinces'].add(p.get('province_id'))
+
+        key = (p.get('level2_name') or '', p.get('year'))
+        row = level2.get(key)
+        if row is None:
+            row = level2[key] = {'level2_name': key[0], 'year': key[1], 'plan_total': 0, 'majors': set()}
+        row['plan_total'] += number
+        row['majors'].add(major)
+
+    plan_total_by_school = []
+    for key in sorted(schools, key=_sort_key):
+        row = schools[key]
+        plan_total_by_school.append({
+            'school_id': row['school_id'],
+            'year': row['year'],
+            'plan_total': row['plan_total'],
+            'major_count': len(row['majors']),
+            'province_count': len(row['provinces']),
+        })
+
+    plan_majors_by_level2 = []
+    for key in sorted(level2, key=_sort_key):
+        row = level2[key]
+        plan_majors_by_level2.append({
+            'level2_name': row['level2_name'],
+            'year': row['year'],
+            'major_count': len(row['majors']),
+            'plan_total': row['plan_total'],
+        })
+
+    return {
+        'plan_total_by_school': plan_total_by_school,
+        'plan_majors_by_level2': plan_majors_by_level2,
+    }
+
+
+def _sort_key(key):
+    return tuple(str(k) if k is not None else '' for k in key)
+
+
+class ViewStore:
+    """聚合表查询接口，按需加载 data/views/*.json 并建立内存索引"""
+
+    def __init__(self, views_dir=VIEWS_DIR):
+        self.views_dir = views_dir
+        self._indexes = {}
+
+    def load(self, name):
+        """读取一张聚合表的全部行"""
+        with open(os.path.join(self.views_dir, f'{name}.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('data', [])
+
+    def _index(self, name, fields):
+        index = self._indexes.get(name)
+        if index is None:
+            index = {}
+            for row in self.load(name):
+                index.setdefault(tuple(str(row.get(f)) for f in fields), []).append(row)
+            self._indexes[name] = index
+        return index
+
+    def _query(self, name, fields, values):
+        index = self._index(name, fields)
+        if all(v is not None for v in values):
+            return list(index.get(tuple(str(v) for v in values), []))
+
+        rows = []
+        for key, group in index.items():
+            if all(v is None or k == str(v) for k, v in zip(key, values)):
+                rows.extend(group)
+        return rows
+
+    def min_score(self, school_id, province_id=None, year=None):
+        """某学校在各省各年的最低分"""
+        return self._query('score_min_by_school', ('school_id', 'province_id', 'year'), (school_id, province_id, year))
+
+    def plan_total(self, school_id, year=None):
+        """某学校各年的计划招生总数"""
+        return self._query('plan_total_by_school', ('school_id', 'year'), (school_id, year))
+
+    def majors_per_level2(self, level2_name=None, year=None):
+        """各学科门类的专业数"""
+        return self._query('plan_majors_by_level2', ('level2_name', 'year'), (level2_name, year))
+
+
+if __name__ == "__main__":
+    # 从已有的 scores.json / plans.json 重新生成聚合表
+    from .base import BaseCrawler
+    from .partitions import read_dataset
+
+    crawler = BaseCrawler()
+    for filename, build in (('scores.json', score_views), ('plans.json', plan_views)):
+        records = list(read_dataset(filename))
+        if not records:
+            print(f"⚠️  未找到 {filename}，跳过")
+            continue
+        crawler.save_views(build(records))
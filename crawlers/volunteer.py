@@ -0,0 +1,338 @@
+"""志愿填报方案优化
+
+给定考生的省份、科类和位次，从 scores 的多年最低位次估计每个志愿单位（院校专业组，没有专业组时为
+院校+专业）的录取概率，在志愿数和冲/稳/保各档数量的限制下，选出期望效用最大的志愿表。
+位次优先用公布的 min_rank，缺失时用一分一段表估计的 min_rank_est（见 crawlers.equal_rank）。
+
+录取概率：把各年最低位次取对数，按年份由近及远加权求均值 mu；招生计划有变化时按当年计划人数与
+往年的比例平移（计划多招，录取线位次相应后移）；离散程度 sigma 由历年波动与先验值收缩得到。
+考生位次为 rank 时，录取概率为 Φ((mu - ln rank) / sigma)。
+
+志愿表：平行志愿按顺序投档，期望效用为 Σ u_i·P_i·Π_{j<i}(1-P_j)，志愿按效用从高到低排列。
+每一步加入使期望效用增加最多的单位（边际增益贪心）。加入单位 c 后期望效用的增量有闭式解，
+每一步只需按效用顺序扫描一遍候选单位。
+"""
+import bisect
+import math
+from .partitions import read_dataset
+from .views import to_int
+
+# 档位（录取概率下限）：冲 < 稳 < 保
+TIERS = (('保', 0.8), ('稳', 0.4), ('冲', 0.0))
+# 默认各档最多占用的志愿比例
+TIER_SHARES = {'冲': 0.3, '稳': 0.4, '保': 0.3}
+
+MIN_PROBABILITY = 0.02   # 低于此概率的单位不考虑
+PRIOR_SIGMA = 0.25       # ln(位次) 的先验标准差（约 ±25% 的位次波动）
+PRIOR_WEIGHT = 2         # 先验相当于几年的观测
+RECENCY = 0.7            # 每早一年权重乘以此系数
+PROBABILITY_BINS = 20    # 候选单位按概率分桶，每桶只保留效用最高的若干个
+
+
+def unit_key(record):
+    """志愿单位：学校×科类×专业组；没有专业组时为学校×科类×专业"""
+    group = record.get('major_group') or ''
+    return (
+        str(record.get('school_id')),
+        str(record.get('type') or ''),
+        f'组{group}' if group else (record.get('major_code') or record.get('major') or ''),
+    )
+
+
+def is_regular(record):
+    """只使用普通类的常规批次（专项计划、提前批等有报考资格限制）"""
+    batch = record.get('batch') or ''
+    kind = record.get('recruit_type') or record.get('plan_type') or '普通类'
+    return kind == '普通类' and '提前' not in batch and '专项' not in batch
+
+
+def normal_cdf(z):
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+
+def tier_of(probability):
+    for name, threshold in TIERS:
+        if probability >= threshold:
+            return name
+
+
+class AdmissionModel:
+    """一个省份的全部志愿单位及其录取线位次分布
+
+    构造时对 scores / plans 各扫描一次；之后每个考生的推荐只用到这里的数组。
+    """
+
+    def __init__(self, province_id, scores, plans=(), schools=()):
+        self.province_id = str(province_id)
+        school_names = {str(s.get('school_id')): s.get('name') for s in schools}
+
+        # 单位 -> {年份: 最低位次}（同一年多条记录取最大位次，即专业组的录取线）
+        # 公布的 min_rank 优先；某单位某年没有公布位次时才用一分一段表估计的 min_rank_est
+        history = {}
+        estimated = {}
+        labels = {}
+        for s in scores:
+            if str(s.get('province_id')) != self.province_id or not is_regular(s):
+                continue
+            rank = to_int(s.get('min_rank'))
+            target = history
+            if not rank or rank <= 0:
+                rank = to_int(s.get('min_rank_est'))
+                target = estimated
+                if not rank or rank <= 0:
+                    continue
+            key = unit_key(s)
+            years = target.setdefault(key, {})
+            year = str(s.get('year'))
+            if years.get(year) is None or rank > years[year]:
+                years[year] = rank
+            labels.setdefault(key, {
+                'school_id': s.get('school_id'),
+                'school_name': school_names.get(str(s.get('school_id'))),
+                'major_group': s.get('major_group') or None,
+                'major': None if s.get('major_group') else s.get('major'),
+                'batch': s.get('batch'),
+            })
+
+        for key, years in estimated.items():
+            published = history.setdefault(key, {})
+            for year, rank in years.items():
+                published.setdefault(year, rank)
+
+        # 单位 -> {年份: 计划人数}
+        plan_numbers = {}
+        for p in plans:
+            if str(p.get('province_id')) != self.province_id or not is_regular(p):
+                continue
+            number = to_int(p.get('plan_number'))
+            if number:
+                years = plan_numbers.setdefault(unit_key(p), {})
+                years[str(p.get('year'))] = years.get(str(p.get('year')), 0) + number
+
+        # 预测年份：有招生计划时取计划的最新年份，此时当年没有计划的单位不再招生
+        plan_years = {y for years in plan_numbers.values() for y in years}
+        self.target_year = max(plan_years, key=int) if plan_years else None
+
+        # 按科类分组的单位数组
+        self.units = {}
+        for key, years in history.items():
+            plans_by_year = plan_numbers.get(key, {})
+            target_plan = plans_by_year.get(self.target_year) if self.target_year else None
+            if self.target_year and not target_plan:
+                continue
+            mu, sigma = self.estimate(years, plans_by_year, target_plan)
+            unit = dict(labels[key], type=key[1], history=dict(sorted(years.items())),
+                        plan_number=target_plan, mu=mu, sigma=sigma)
+            self.units.setdefault(key[1], []).append((key, unit))
+
+        # 默认效用：历年录取线越靠前的单位越好，u = ln(本科类最大位次 / 预期录取位次) + 1
+        for type_code, units in self.units.items():
+            top = max(u['mu'] for _, u in units)
+            for _, u in units:
+                u['utility'] = top - u['mu'] + 1.0
+
+    @staticmethod
+    def estimate(years, plans_by_year, target_plan):
+        """由历年位次估计预测年份录取线 ln(位次) 的均值和标准差"""
+        ordered = sorted(years.items(), key=lambda item: -int(item[0]))
+        values, weights = [], []
+        for age, (year, rank) in enumerate(ordered):
+            value = math.log(rank)
+            if target_plan and plans_by_year.get(year):
+                value += math.log(target_plan / plans_by_year[year])
+            values.append(value)
+            weights.append(RECENCY ** age)
+
+        mu = sum(w * v for w, v in zip(weights, values)) / sum(weights)
+        squares = sum((v - mu) ** 2 for v in values)
+        sigma = math.sqrt((PRIOR_WEIGHT * PRIOR_SIGMA ** 2 + squares) / (PRIOR_WEIGHT + len(values) - 1))
+        return mu, sigma
+
+    def candidates(self, type_code, rank, utility=None, slots=96, exclude=()):
+        """考生可选的单位列表 [(效用, 概率, 单位键, 单位)]，按效用从高到低排序
+
+        概率过低的单位去掉；每个概率区间只保留效用最高的 slots 个（其余单位被同区间内
+        效用更高、概率相近的单位支配，不会被选中）。
+        """
+        log_rank = math.log(max(int(rank), 1))
+        bins = {}
+        for key, unit in self.units.get(str(type_code), ()):
+            if key in exclude:
+                continue
+            probability = normal_cdf((unit['mu'] - log_rank) / unit['sigma'])
+            if probability < MIN_PROBABILITY:
+                continue
+            value = utility(unit) if utility else unit['utility']
+            bins.setdefault(min(int(probability * PROBABILITY_BINS), PROBABILITY_BINS - 1), []).append(
+                (value, probability, key, unit))
+
+        pool = []
+        for items in bins.values():
+            items.sort(key=lambda item: (-item[0], -item[1]))
+            pool.extend(items[:slots])
+        pool.sort(key=lambda item: (-item[0], -item[1]))
+        return pool
+
+    def recommend(self, type_code, rank, slots=96, tier_limits=None, utility=None, exclude=()):
+        """生成志愿表
+
+        tier_limits: 各档最多的志愿数，如 {'冲': 30, '稳': 40, '保': 26}，默认按 TIER_SHARES 分配
+        utility: 自定义效用函数 unit -> float，默认按历年录取线
+        exclude: 不可报考的单位键
+        """
+        if tier_limits is None:
+            tier_limits = {name: math.ceil(slots * share) for name, share in TIER_SHARES.items()}
+        pool = self.candidates(type_code, rank, utility, slots, exclude)
+        tiers = [tier_of(p) for _, p, _, _ in pool]
+
+        chosen = []          # 已选单位在 pool 中的下标，按效用从高到低
+        used = {name: 0 for name in tier_limits}
+        taken = [False] * len(pool)
+        expected = 0.0
+
+        while len(chosen) < slots:
+            # 已选志愿的前缀量：Q[k] 为前 k 个都未录取的概率，E[k] 为前 k 个的期望效用
+            Q, E = [1.0], [0.0]
+            for i in chosen:
+                value, probability = pool[i][0], pool[i][1]
+                E.append(E[-1] + Q[-1] * probability * value)
+                Q.append(Q[-1] * (1 - probability))
+
+            # 按效用位置插入时增量不会为负；录取概率已接近 1 时增量为 0，仍按效用顺序补满志愿
+            best, best_gain = None, -1.0
+            k = 0
+            for i, (value, probability, _, _) in enumerate(pool):
+                # pool 与 chosen 都按效用降序，插入位置随扫描单调后移
+                while k < len(chosen) and chosen[k] < i:
+                    k += 1
+                if taken[i] or used.get(tiers[i], 0) >= tier_limits.get(tiers[i], 0):
+                    continue
+                gain = probability * (Q[k] * value - (E[-1] - E[k]))
+                if gain > best_gain:
+                    best, best_gain = i, gain
+
+            if best is None:
+                break
+            taken[best] = True
+            used[tiers[best]] += 1
+            bisect.insort(chosen, best)
+            expected += best_gain
+
+        result = []
+        miss = 1.0
+        for order, i in enumerate(chosen, 1):
+            value, probability, key, unit = pool[i]
+            result.append({
+                'order': order,
+                'tier': tiers[i],
+                'probability': round(probability, 4),
+                # 平行志愿下落在本志愿的概率（前面的志愿都未录取）
+                'admit_here': round(miss * probability, 4),
+                'expected_rank': round(math.exp(unit['mu'])),
+                'school_id': unit['school_id'],
+                'school_name': unit['school_name'],
+                'major_group': unit['major_group'],
+                'major': unit['major'],
+                'batch': unit['batch'],
+                'plan_number': unit['plan_number'],
+                'history': unit['history'],
+                'utility': round(value, 4),
+                'key': key,
+            })
+            miss *= 1 - probability
+
+        return {
+            'province_id': self.province_id,
+            'type': str(type_code),
+            'rank': int(rank),
+            'target_year': self.target_year,
+            'choices': result,
+            'admit_probability': round(1 - miss, 4),
+            'expected_utility': round(expected, 4),
+            'pool': len(pool),
+        }
+
+
+def recommend_batch(model, candidates, slots=96, tier_limits=None, shared_capacity=False):
+    """批量生成志愿表
+
+    candidates: [{'id', 'type', 'rank'}]。shared_capacity=True 时按位次从高到低依次处理，
+    累计每个单位的预期录取人数，达到当年计划人数的单位不再推荐给后面的考生。
+    """
+    load = {}
+    full = set()
+    results = [None] * len(candidates)
+    order = range(len(candidates))
+    if shared_capacity:
+        order = sorted(order, key=lambda n: int(candidates[n]['rank']))
+
+    for n in order:
+        candidate = candidates[n]
+        plan = model.recommend(candidate['type'], candidate['rank'], slots, tier_limits, exclude=full)
+        if shared_capacity:
+            for choice in plan['choices']:
+                key = choice['key']
+                load[key] = load.get(key, 0.0) + choice['admit_here']
+                if choice['plan_number'] and load[key] >= choice['plan_number']:
+                    full.add(key)
+        results[n] = plan
+
+    return results
+
+
+def load_model(province_id, data_dir='data'):
+    """从 data/ 读取某省的分数线、招生计划和学校名称"""
+    return AdmissionModel(
+        province_id,
+        read_dataset('scores.json', data_dir, province_id=province_id),
+        read_dataset('plans.json', data_dir, province_id=province_id),
+        read_dataset('schools.json', data_dir),
+    )
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    import time
+
+    # 单个考生：python -m crawlers.volunteer --province=13 --type=2073 --rank=5000 [--slots=96]
+    # 批量：    python -m crawlers.volunteer --province=13 --batch=candidates.jsonl [--out=plans.jsonl] [--capacity]
+    #           candidates.jsonl 每行 {"id": ..., "type": "2073", "rank": 5000}
+    options = dict(a[2:].split('=', 1) if '=' in a else (a[2:], '1') for a in sys.argv[1:] if a.startswith('--'))
+    if 'province' not in options or not ('batch' in options or ('type' in options and 'rank' in options)):
+        print("用法: python -m crawlers.volunteer --province=ID (--type=科类 --rank=位次 | --batch=考生.jsonl [--out=结果.jsonl] [--capacity]) [--slots=96]")
+        sys.exit(1)
+
+    slots = int(options.get('slots', 96))
+    started = time.perf_counter()
+    model = load_model(options['province'])
+    print(f"✓ 模型已加载：{sum(len(u) for u in model.units.values())} 个志愿单位，"
+          f"耗时 {time.perf_counter() - started:.2f} 秒")
+
+    if 'batch' in options:
+        with open(options['batch'], 'r', encoding='utf-8') as f:
+            candidates = [json.loads(line) for line in f if line.strip()]
+        started = time.perf_counter()
+        plans = recommend_batch(model, candidates, slots, shared_capacity='capacity' in options)
+        elapsed = time.perf_counter() - started
+        out = options.get('out', 'data/volunteer_plans.jsonl')
+        with open(out, 'w', encoding='utf-8') as f:
+            for candidate, plan in zip(candidates, plans):
+                plan['choices'] = [{k: v for k, v in c.items() if k != 'key'} for c in plan['choices']]
+                f.write(json.dumps(dict(plan, id=candidate.get('id')), ensure_ascii=False) + '\n')
+        print(f"✓ {len(candidates)} 名考生，耗时 {elapsed:.2f} 秒（平均 {elapsed * 1000 / max(len(candidates), 1):.1f} 毫秒），已保存到 {out}")
+    else:
+        started = time.perf_counter()
+        plan = model.recommend(options['type'], options['rank'], slots)
+        elapsed = time.perf_counter() - started
+
+        print(f"\n{'='*60}")
+        print(f"省份 {plan['province_id']} 科类 {plan['type']} 位次 {plan['rank']}：{len(plan['choices'])} 个志愿"
+              f"（候选 {plan['pool']} 个，耗时 {elapsed * 1000:.0f} 毫秒）")
+        print(f"被录取概率 {plan['admit_probability']:.1%}，期望效用 {plan['expected_utility']}")
+        print(f"{'='*60}")
+        for c in plan['choices']:
+            name = c['school_name'] or f"学校{c['school_id']}"
+            unit = f"专业组{c['major_group']}" if c['major_group'] else c['major']
+            print(f"   {c['order']:>3} [{c['tier']}] {name} {unit}  概率 {c['probability']:.0%}  "
+                  f"预期位次 {c['expected_rank']}  历年 {c['history']}")
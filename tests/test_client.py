@@ -0,0 +1,100 @@
+"""按需查询客户端：同一文件的并发查询合并为一次请求，超时与内存缓存
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from crawlers.client import ClientTimeout, GaokaoClient
+
+
+def score_body(min_score):
+    data = {'普通类': {'item': [{'sp_name': '计算机', 'min': min_score, 'type': '物理类'}]}}
+    return json.dumps({'code': '0000', 'data': data}).encode('utf-8')
+
+
+class ClientTest(unittest.TestCase):
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {'CLIENT_DISK_CACHE': 'off'})
+        env.start()
+        self.addCleanup(env.stop)
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+        self.client = GaokaoClient(timeout=5, cache_dir=None)
+        self.release = threading.Event()
+        self.calls = []
+        self.client._crawler.transport.get = self.get
+
+    def tearDown(self):
+        self.release.set()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def get(self, url, timeout=None, headers=None):
+        # 请求在 release 之前一直挂起，模拟慢响应
+        self.calls.append(url)
+        self.release.wait(10)
+        return SimpleNamespace(status_code=200, content=score_body(600))
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('等待超时')
+            time.sleep(0.005)
+
+    def test_concurrent_lookups_share_one_request(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.client.scores(1, 2025, '11')))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        self.wait_for(lambda: self.client.counts['coalesced'] == 4)
+        self.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(results[0][0].min_score, 600)
+        self.assertEqual(self.client.stats()['fetch'], 1)
+
+        # 之后的查询命中内存缓存，不再请求
+        self.assertIs(self.client.scores(1, 2025, '11'), results[0])
+        self.assertEqual((len(self.calls), self.client.counts['memory']), (1, 1))
+
+    def test_different_files_are_not_coalesced(self):
+        self.release.set()
+        self.client.scores(1, 2025, '11')
+        self.client.scores(1, 2025, '13')
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.client.counts['coalesced'], 0)
+
+    def test_waiter_times_out_without_cancelling_owner(self):
+        owner = []
+        thread = threading.Thread(target=lambda: owner.append(self.client.scores(1, 2025, '11')))
+        thread.start()
+        self.wait_for(lambda: self.calls)
+
+        with self.assertRaises(ClientTimeout):
+            self.client.scores(1, 2025, '11', timeout=0.05)
+
+        self.release.set()
+        thread.join()
+        self.assertEqual(owner[0][0].min_score, 600)
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
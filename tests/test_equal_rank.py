@@ -0,0 +1,83 @@
+"""一分一段表查询与位次估计、等位分
+
+    python -m unittest discover tests
+"""
+import unittest
+
+from crawlers.equal_rank import RankTable, fill_ranks
+
+
+def table(scores, ranks):
+    return RankTable.from_record({'scores': scores, 'ranks': ranks})
+
+
+class RankTableTest(unittest.TestCase):
+
+    def setUp(self):
+        # 分数降序、累计位次升序（与 sections.json 相同）
+        self.table = table([700, 650, 600, 550], [10, 100, 500, 2000])
+
+    def test_ranks_at(self):
+        self.assertEqual(self.table.ranks_at([650, 640, 720, 500, 600]), [100, 100, 10, 2000, 500])
+
+    def test_scores_at(self):
+        self.assertEqual(self.table.scores_at([100, 150, 5, 5000, 2000]), [650, 600, 700, 550, 550])
+
+    def test_round_trip(self):
+        scores = [700, 650, 600, 550]
+        self.assertEqual(self.table.scores_at(self.table.ranks_at(scores)), scores)
+
+    def test_rejects_malformed_record(self):
+        self.assertIsNone(RankTable.from_record({'scores': [700, 650], 'ranks': [10]}))
+        self.assertIsNone(RankTable.from_record({'scores': [], 'ranks': []}))
+
+
+class FillRanksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tables = {
+            ('2024', '13', '1'): table([700, 650, 600, 550], [10, 100, 500, 2000]),
+            ('2025', '13', '1'): table([710, 660, 610, 560], [10, 100, 500, 2000]),
+        }
+
+    def record(self, **fields):
+        return dict({'year': '2024', 'province_id': '13', 'type': '1'}, **fields)
+
+    def test_estimates_go_to_min_rank_est(self):
+        records = [self.record(min_score=650)]
+        self.assertEqual(fill_ranks(records, self.tables), (1, 1))
+        self.assertIsNone(records[0].get('min_rank'))
+        self.assertEqual(records[0]['min_rank_est'], 100)
+        # 换算到最新一年（2025）同位次的分数
+        self.assertEqual(records[0]['equal_score'], 660)
+
+    def test_published_rank_is_kept_and_preferred(self):
+        records = [self.record(min_score=650, min_rank=500, min_rank_est=100)]
+        self.assertEqual(fill_ranks(records, self.tables), (0, 1))
+        self.assertEqual(records[0]['min_rank'], 500)
+        self.assertIsNone(records[0]['min_rank_est'])
+        self.assertEqual(records[0]['equal_score'], 610)
+
+    def test_zero_score_is_unknown(self):
+        records = [self.record(min_score=0), self.record(min_score=None, min_rank=0)]
+        self.assertEqual(fill_ranks(records, self.tables), (0, 0))
+        for record in records:
+            self.assertIsNone(record.get('min_rank_est'))
+            self.assertIsNone(record.get('equal_score'))
+
+    def test_rerun_recomputes_estimates(self):
+        records = [self.record(min_score=650)]
+        fill_ranks(records, self.tables)
+        records[0]['min_score'] = 600
+        fill_ranks(records, self.tables)
+        self.assertEqual((records[0]['min_rank_est'], records[0]['equal_score']), (500, 610))
+
+    def test_target_year_and_missing_table(self):
+        records = [self.record(min_score=600), self.record(province_id='11', min_score=600)]
+        self.assertEqual(fill_ranks(records, self.tables, target_year='2024'), (1, 1))
+        self.assertEqual(records[0]['equal_score'], 600)
+        self.assertNotIn('min_rank_est', records[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""分区输出：replace=True 写完整数据并删除多余分区，replace=False 只替换涉及的分区
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from crawlers.partitions import PartitionStore
+
+
+def score(school_id, year, province_id, min_score=600):
+    return {'school_id': school_id, 'year': year, 'province_id': province_id, 'min_score': min_score}
+
+
+class PartitionStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = PartitionStore('scores', self.tmp)
+        self.store.write([score(1, '2024', '11'), score(2, '2024', '11'), score(1, '2024', '13'),
+                          score(1, '2025', '11')])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def path(self, key):
+        return os.path.join(self.store.root, f'{key}.jsonl')
+
+    def test_replace_removes_missing_partitions(self):
+        written, removed = self.store.write([score(1, '2024', '11', 610)])
+
+        self.assertEqual((written, removed), (1, 2))
+        self.assertEqual(self.store.keys(), ['2024/11'])
+        self.assertFalse(os.path.exists(self.path('2024/13')))
+        # 分区目录清空后一并删除
+        self.assertFalse(os.path.exists(os.path.join(self.store.root, '2025')))
+        self.assertEqual([r['min_score'] for r in self.store.read()], [610])
+        self.assertEqual(self.store.manifest()['count'], 1)
+
+    def test_partial_write_keeps_other_partitions(self):
+        written, removed = self.store.write([score(3, '2024', '13')], replace=False)
+
+        self.assertEqual((written, removed), (1, 0))
+        self.assertEqual(sorted(self.store.keys()), ['2024/11', '2024/13', '2025/11'])
+        # 涉及的分区整体替换，不与原有记录合并
+        self.assertEqual([r['school_id'] for r in self.store.read(province_id='13')], [3])
+        self.assertEqual(len(list(self.store.read(year='2024', province_id='11'))), 2)
+        self.assertEqual(self.store.manifest()['count'], 4)
+
+    def test_unchanged_partitions_are_not_rewritten(self):
+        before = self.store.manifest()
+        mtime = os.path.getmtime(self.path('2024/11'))
+
+        # 顺序不同的同样数据
+        records = [score(1, '2025', '11'), score(1, '2024', '13'), score(2, '2024', '11'), score(1, '2024', '11')]
+        self.assertEqual(self.store.write(records), (0, 0))
+        self.assertEqual(os.path.getmtime(self.path('2024/11')), mtime)
+        self.assertEqual(self.store.manifest(), before)
+
+    def test_missing_partition_file_is_rewritten(self):
+        os.remove(self.path('2024/13'))
+        self.assertEqual(self.store.write([score(1, '2024', '13')], replace=False), (1, 0))
+        self.assertTrue(os.path.exists(self.path('2024/13')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""重试策略的退避时间、可重试状态码，以及熔断器的状态转换
+
+    python -m unittest discover tests
+"""
+import unittest
+from unittest import mock
+
+from crawlers.retry import CircuitBreaker, RetryBudget, RetryPolicy
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_backoff_doubles_up_to_max_delay(self):
+        policy = RetryPolicy(base_delay=2.0, max_delay=10.0, jitter=0)
+        self.assertEqual([policy.backoff(n) for n in range(5)], [2.0, 4.0, 8.0, 10.0, 10.0])
+
+    def test_backoff_jitter_and_floor(self):
+        policy = RetryPolicy(base_delay=2.0, max_delay=60.0, jitter=0.5)
+        with mock.patch('crawlers.retry.random.random', return_value=1.0):
+            self.assertEqual(policy.backoff(1), 2.0)
+            # 服务器要求的 Retry-After 等下限
+            self.assertEqual(policy.backoff(1, floor=5.0), 5.0)
+        with mock.patch('crawlers.retry.random.random', return_value=0.0):
+            self.assertEqual(policy.backoff(1), 4.0)
+
+    def test_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(all(policy.retryable(code) for code in (408, 429, 500, 502, 503, 504)))
+        self.assertFalse(any(policy.retryable(code) for code in (200, 304, 400, 403, 404)))
+
+
+class RetryBudgetTest(unittest.TestCase):
+
+    def test_withdraw_until_empty_then_refill(self):
+        budget = RetryBudget(ratio=0.5, min_tokens=2.0)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('crawlers.retry.time.monotonic', lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.breaker = CircuitBreaker('example.com', failure_threshold=3, cooldown=30.0, max_cooldown=100.0)
+
+    def trip(self):
+        for _ in range(self.breaker.failure_threshold):
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.ready())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.ready())
+
+    def test_success_resets_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_half_open_probe_success_closes(self):
+        self.trip()
+        self.now += 30.0
+        self.assertTrue(self.breaker.ready())
+
+        self.breaker.wait()  # 冷却结束，当前调用者作为试探请求
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.breaker.record_success()
+        self.assertEqual((self.breaker.state, self.breaker.failures), ('closed', 0))
+        self.assertEqual(self.breaker.cooldown, 30.0)
+
+    def test_half_open_probe_failure_reopens_with_longer_cooldown(self):
+        self.trip()
+        for expected in (60.0, 100.0, 100.0):
+            self.now += self.breaker.cooldown
+            self.breaker.wait()
+            self.breaker.record_failure()
+            self.assertEqual(self.breaker.state, 'open')
+            self.assertEqual(self.breaker.cooldown, expected)
+            self.assertFalse(self.breaker.ready())
+
+        # 恢复后冷却时间回到初始值
+        self.now += self.breaker.cooldown
+        self.breaker.wait()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.cooldown, 30.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""分数线监视模式：发布失败或最后一个请求异常时不能丢失已发现的更新
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from crawlers.scores import ScoreCrawler, load_watch_state, score_url
+
+YEAR = '2025'
+
+
+def score_body(min_score):
+    data = {'普通类': {'item': [{'sp_name': '计算机', 'min': min_score, 'type': '物理类'}]}}
+    return json.dumps({'code': '0000', 'data': data}).encode('utf-8')
+
+
+class FakeWatchCrawler(ScoreCrawler):
+    """按 URL 返回预设响应（异常实例则抛出），记录每次发布"""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = responses
+        self.published = []
+        self.fail_publish = False
+        self.probed = []
+        self.checked = []
+
+    def fetch_static(self, url, timeout=10):
+        # 省份发现的预探测：info.json 只列出北京
+        self.probed.append(url)
+        body = {'code': '0000', 'data': {'province_score_min': {'11': {'min': 600}}}}
+        return 200, json.dumps(body).encode('utf-8')
+
+    def fetch_conditional(self, url, validators=None):
+        self.checked.append(url)
+        response = self.responses[url]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def polite_sleep(self, *args, **kwargs):
+        pass
+
+    def publish_scores(self, updates):
+        if self.fail_publish:
+            raise OSError('disk full')
+        self.published.append(dict(updates))
+        return [r for records in updates.values() for r in records]
+
+
+class WatchTest(unittest.TestCase):
+
+    def setUp(self):
+        # 不做省份预探测（会发出真实请求）
+        env = mock.patch.dict(os.environ, {'PROVINCE_DISCOVERY': 'off'})
+        env.start()
+        self.addCleanup(env.stop)
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        self.state_path = f'data/state/score_watch_{YEAR}.json'
+        self.first = score_url(1, YEAR, '11')
+        self.last = score_url(2, YEAR, '11')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def watch(self, crawler):
+        return crawler.watch(year=YEAR, school_ids=[1, 2], province_ids=['11'], cycles=1, interval=0)
+
+    def test_final_unit_raising_still_publishes(self):
+        crawler = FakeWatchCrawler({
+            self.first: (200, score_body(600), {'etag': 'a'}),
+            self.last: ConnectionError('reset'),
+        })
+        published = self.watch(crawler)
+
+        self.assertEqual(len(published), 1)
+        self.assertEqual(list(crawler.published[0]), [('1', YEAR, '11')])
+        state = load_watch_state(self.state_path)
+        self.assertTrue(state[self.first]['has_data'])
+        self.assertEqual(state[self.first]['validators'], {'etag': 'a'})
+
+    def test_digest_recorded_only_after_publish(self):
+        crawler = FakeWatchCrawler({
+            self.first: (200, score_body(600), {'etag': 'a'}),
+            self.last: ConnectionError('reset'),
+        })
+        crawler.fail_publish = True
+        with self.assertRaises(OSError):
+            self.watch(crawler)
+        self.assertNotIn('digest', load_watch_state(self.state_path).get(self.first, {}))
+
+        # 下一次运行同样的内容仍然是新数据，会被发布
+        crawler.fail_publish = False
+        self.assertEqual(len(self.watch(crawler)), 1)
+
+
+
+class WatchDiscoveryTest(unittest.TestCase):
+    """开启省份发现时：预探测计入每轮请求数，发现的省份和运行次数写入状态"""
+
+    def setUp(self):
+        # 不轮到全量扫描
+        env = mock.patch.dict(os.environ, {'PROVINCE_DISCOVERY': 'on', 'PROVINCE_SWEEP_EVERY': '1000000'})
+        env.start()
+        self.addCleanup(env.stop)
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def test_probes_count_against_budget_and_state_is_saved(self):
+        school_ids = [1, 2, 3, 4]
+        crawler = FakeWatchCrawler({
+            score_url(sid, YEAR, pid): (200, score_body(600), {})
+            for sid in school_ids for pid in ('11', '13')
+        })
+
+        requests_per_cycle = []
+        sleep = lambda seconds: requests_per_cycle.append(len(crawler.probed) + len(crawler.checked))
+        with mock.patch('crawlers.scores.time.sleep', sleep):
+            crawler.watch(year=YEAR, school_ids=school_ids, province_ids=['11', '13'], cycles=3, interval=1,
+                          max_requests=4)
+        requests_per_cycle.append(len(crawler.probed) + len(crawler.checked))
+
+        per_cycle = [b - a for a, b in zip([0] + requests_per_cycle, requests_per_cycle)]
+        self.assertTrue(all(n <= 4 for n in per_cycle), per_cycle)
+        self.assertEqual(len(crawler.probed), len(school_ids))
+        # 只轮询探测到的省份
+        self.assertFalse([url for url in crawler.checked if url.endswith('/13.json')])
+
+        with open('data/state/provinces_scores.json', 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        self.assertEqual(saved['run'], 1)
+        self.assertEqual(saved['schools'], {str(sid): ['11'] for sid in school_ids})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""学校/专业检索：得分、分面过滤
+
+    python -m unittest discover tests
+"""
+import unittest
+
+from crawlers.search import build_school_index
+
+SCHOOLS = [
+    {'name': '北京协和医学院', 'province': '北京', 'type': '医药类', 'nature': '公办', 'f985': 2, 'f211': 1,
+     'content': '医学教育'},
+    {'name': '中国科学技术大学', 'province': '安徽', 'type': '理工类', 'nature': '公办', 'f985': 1, 'f211': 1,
+     'content': '设有生命科学与医学部'},
+    {'name': '浙江大学', 'province': '浙江', 'type': '综合类', 'nature': '公办', 'f985': 1, 'f211': 1,
+     'content': '综合性研究型大学'},
+    {'name': '北京城市学院', 'province': '北京', 'type': '综合类', 'nature': '民办', 'f985': 2, 'f211': 2,
+     'content': ''},
+]
+
+
+class SearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = build_school_index(SCHOOLS)
+
+    def names(self, results):
+        return [doc['name'] for _, doc in results]
+
+    def test_every_hit_scores_above_zero(self):
+        for query in ('医学', '北京', '大学', '研究'):
+            results = self.index.search(query)
+            self.assertTrue(results, query)
+            for score, doc in results:
+                self.assertGreater(score, 0, f"{query}: {doc['name']}")
+
+    def test_content_only_match_is_returned_below_name_match(self):
+        names = self.names(self.index.search('医学'))
+        self.assertEqual(names[0], '北京协和医学院')
+        self.assertIn('中国科学技术大学', names)
+        self.assertNotIn('浙江大学', names)
+
+    def test_exact_name_ranks_first(self):
+        self.assertEqual(self.names(self.index.search('浙江大学'))[0], '浙江大学')
+
+    def test_facets_and_within_or_across(self):
+        self.assertEqual(set(self.names(self.index.search(province='北京'))), {'北京协和医学院', '北京城市学院'})
+        self.assertEqual(self.names(self.index.search(province='北京', nature='民办')), ['北京城市学院'])
+        self.assertEqual(set(self.names(self.index.search(province=['北京', '浙江'], f985=1))), {'浙江大学'})
+        self.assertEqual(self.names(self.index.search('大学', f985=2)), [])
+
+    def test_facet_counts_within_mask(self):
+        mask = self.index.facet_mask({'nature': '公办'})
+        self.assertEqual(self.index.facet_counts('province', mask), {'北京': 1, '安徽': 1, '浙江': 1})
+
+    def test_unknown_facet_raises_value_error(self):
+        with self.assertRaises(ValueError) as ctx:
+            self.index.search('大学', nature_x='公办')
+        self.assertIn('nature_x', str(ctx.exception))
+        self.assertIn('province', str(ctx.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""志愿表：期望效用与边际增益一致、各档数量限制、公布位次优先于估计位次
+
+    python -m unittest discover tests
+"""
+import unittest
+
+from crawlers.volunteer import AdmissionModel, tier_of, unit_key
+
+PROVINCE = '13'
+TYPE = '2073'
+
+
+def score(school_id, year, min_rank=None, min_rank_est=None, **extra):
+    record = {'school_id': school_id, 'year': year, 'province_id': PROVINCE, 'type': TYPE,
+              'batch': '本科批', 'major_group': '01', 'min_rank': min_rank, 'min_rank_est': min_rank_est}
+    record.update(extra)
+    return record
+
+
+def scores(units=40):
+    # 学校 n 的录取线位次约为 n*500，逐年小幅波动
+    return [score(n, year, n * 500 + offset)
+            for n in range(1, units + 1)
+            for year, offset in (('2022', -100), ('2023', 50), ('2024', 0))]
+
+
+class RecommendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = AdmissionModel(PROVINCE, scores())
+
+    def expected_utility(self, choices):
+        total, miss = 0.0, 1.0
+        for choice in choices:
+            total += miss * choice['probability'] * choice['utility']
+            miss *= 1 - choice['probability']
+        return total
+
+    def test_expected_utility_matches_sum_of_gains(self):
+        plan = self.model.recommend(TYPE, 8000, slots=12, tier_limits={'冲': 12, '稳': 12, '保': 12})
+        choices = plan['choices']
+        self.assertEqual(len(choices), 12)
+        # 累加的边际增益等于按顺序投档的期望效用（概率、效用四舍五入到 4 位）
+        self.assertAlmostEqual(plan['expected_utility'], self.expected_utility(choices), places=2)
+        # 志愿按效用从高到低排列
+        utilities = [c['utility'] for c in choices]
+        self.assertEqual(utilities, sorted(utilities, reverse=True))
+
+    def test_greedy_is_not_worse_than_top_by_probability(self):
+        plan = self.model.recommend(TYPE, 8000, slots=6, tier_limits={'冲': 6, '稳': 6, '保': 6})
+        pool = self.model.candidates(TYPE, 8000)
+        safest = sorted(pool, key=lambda item: -item[1])[:6]
+        safest.sort(key=lambda item: -item[0])
+        baseline = self.expected_utility([{'probability': p, 'utility': u} for u, p, _, _ in safest])
+        self.assertGreaterEqual(plan['expected_utility'] + 1e-3, baseline)
+
+    def test_tier_limits(self):
+        limits = {'冲': 2, '稳': 3, '保': 1}
+        plan = self.model.recommend(TYPE, 8000, slots=20, tier_limits=limits)
+        counts = {}
+        for choice in plan['choices']:
+            self.assertEqual(choice['tier'], tier_of(choice['probability']))
+            counts[choice['tier']] = counts.get(choice['tier'], 0) + 1
+        self.assertTrue(all(counts.get(name, 0) <= limit for name, limit in limits.items()), counts)
+        self.assertEqual(len(plan['choices']), sum(limits.values()))
+
+    def test_missing_tier_gets_no_choices(self):
+        plan = self.model.recommend(TYPE, 8000, slots=10, tier_limits={'稳': 4, '保': 4})
+        self.assertNotIn('冲', [c['tier'] for c in plan['choices']])
+
+    def test_exclude(self):
+        first = self.model.recommend(TYPE, 8000, slots=5)['choices'][0]
+        plan = self.model.recommend(TYPE, 8000, slots=5, exclude={first['key']})
+        self.assertNotIn(first['key'], [c['key'] for c in plan['choices']])
+
+
+class RankSourceTest(unittest.TestCase):
+
+    def test_published_rank_preferred_over_estimate(self):
+        model = AdmissionModel(PROVINCE, [
+            score(1, '2024', 1000),
+            score(1, '2024', None, min_rank_est=5000, major='另一专业'),
+            score(1, '2023', None, min_rank_est=1200),
+            score(2, '2024', None, min_rank_est=3000),
+            score(3, '2024', 0, min_rank_est=0),
+        ])
+        units = {key: unit for key, unit in model.units[TYPE]}
+
+        key = unit_key(score(1, '2024'))
+        # 2024 年有公布位次，估计值不参与；2023 年只有估计值时才用估计值
+        self.assertEqual(units[key]['history'], {'2023': 1200, '2024': 1000})
+        self.assertEqual(units[unit_key(score(2, '2024'))]['history'], {'2024': 3000})
+        self.assertNotIn(unit_key(score(3, '2024')), units)
+
+
+if __name__ == '__main__':
+    unittest.main()